@@ -0,0 +1,119 @@
+"""
+Terminal + account state shared by the trade gate, the balance check and sizing.
+
+``can_trade`` used to call ``mt5.terminal_info`` and ``mt5.account_info`` (two IPC
+round trips) on every loop iteration, and ``initialize``/``calculate_volume_by_risk``
+read the account again. ``AccountStateCache`` keeps one ``AccountState`` snapshot:
+it is re-read when older than ``ttl`` seconds or after ``invalidate`` (trade
+results, positions closed by SL/TP, reconnects), so the per-iteration gate is a
+memory read. Subscribers are told when AutoTrading is toggled or the balance
+crosses ``min_balance``.
+"""
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+# نوع رویدادهای ارسالی به subscriberها: callback(event, old_state, new_state)
+AUTOTRADING_ON = 'autotrading_on'
+AUTOTRADING_OFF = 'autotrading_off'
+BALANCE_BELOW_MIN = 'balance_below_min'
+BALANCE_ABOVE_MIN = 'balance_above_min'
+
+
+@dataclass(frozen=True)
+class AccountState:
+    trade_allowed: Optional[bool]    # terminal AutoTrading (None = terminal info unavailable)
+    balance: Optional[float]         # None = account info unavailable
+    equity: Optional[float]
+    margin_free: Optional[float]
+    currency: str
+    fetched_at: float                # monotonic time of the read
+
+    @classmethod
+    def from_info(cls, terminal, account, fetched_at):
+        return cls(
+            trade_allowed=bool(terminal.trade_allowed) if terminal else None,
+            balance=float(account.balance) if account else None,
+            equity=float(getattr(account, 'equity', account.balance)) if account else None,
+            margin_free=getattr(account, 'margin_free', None) if account else None,
+            currency=getattr(account, 'currency', '') if account else '',
+            fetched_at=fetched_at,
+        )
+
+    @property
+    def terminal_ok(self):
+        return self.trade_allowed is not None
+
+    @property
+    def account_ok(self):
+        return self.balance is not None
+
+
+class AccountStateCache:
+    def __init__(self, terminal_loader, account_loader, ttl=5.0, min_balance=0.0, clock=None):
+        """
+        terminal_loader / account_loader: callables returning ``mt5.terminal_info()`` /
+        ``mt5.account_info()`` results (or None)
+        ttl: seconds a snapshot is served before it is re-read (0 = every call)
+        """
+        self._terminal_loader = terminal_loader
+        self._account_loader = account_loader
+        self.ttl = ttl
+        self.min_balance = min_balance
+        self._clock = clock or (lambda: time.monotonic())
+        self._state = None
+        self._stale = True
+        self._lock = Lock()
+        self._subscribers = []
+
+    def get(self):
+        """Current snapshot; re-read from the terminal when stale or invalidated."""
+        state = self._state
+        if state is None or self._stale or self._clock() - state.fetched_at >= self.ttl:
+            state = self.refresh()
+        return state
+
+    def peek(self):
+        """Last snapshot without touching the terminal (None before the first read)."""
+        return self._state
+
+    def refresh(self):
+        """Re-read terminal and account now and notify subscribers of changes."""
+        terminal = self._terminal_loader()
+        account = self._account_loader()
+        new = AccountState.from_info(terminal, account, self._clock())
+        with self._lock:
+            old, self._state, self._stale = self._state, new, False
+        for event in self._changes(old, new):
+            self._notify(event, old, new)
+        return new
+
+    def invalidate(self):
+        """Force a re-read on the next ``get`` (after a trade, a closed position or a reconnect)."""
+        self._stale = True
+
+    def subscribe(self, callback):
+        """callback(event, old_state, new_state) for AUTOTRADING_*/BALANCE_* events."""
+        self._subscribers.append(callback)
+        return callback
+
+    def _changes(self, old, new):
+        if old is None:
+            return []
+        events = []
+        if old.terminal_ok and new.terminal_ok and old.trade_allowed != new.trade_allowed:
+            events.append(AUTOTRADING_ON if new.trade_allowed else AUTOTRADING_OFF)
+        if old.account_ok and new.account_ok:
+            was_ok, is_ok = old.balance >= self.min_balance, new.balance >= self.min_balance
+            if was_ok != is_ok:
+                events.append(BALANCE_ABOVE_MIN if is_ok else BALANCE_BELOW_MIN)
+        return events
+
+    def _notify(self, event, old, new):
+        for callback in list(self._subscribers):
+            try:
+                callback(event, old, new)
+            except Exception as e:
+                # خطای یک subscriber نباید گیت معامله را بشکند
+                print(f"[account_state] subscriber failed on {event}: {e}")
@@ -47,6 +47,12 @@ def _iran_now_str():
 def _utc_now_str():
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
+def _ts_strs(ts: float):
+    """(dt_utc, dt_iran) strings for an epoch-seconds UTC timestamp."""
+    utc = datetime.fromtimestamp(ts, timezone.utc)
+    tehran = timezone(timedelta(hours=3, minutes=30))
+    return utc.strftime("%Y-%m-%d %H:%M:%S"), utc.astimezone(tehran).strftime("%Y-%m-%d %H:%M:%S")
+
 def _append_csv(fp: Path, headers: list[str], row: dict):
     file_exists = fp.exists()
     with fp.open("a", newline="", encoding="utf-8") as f:
@@ -55,21 +61,24 @@ def _append_csv(fp: Path, headers: list[str], row: dict):
             w.writeheader()
         w.writerow(row)
 
-def log_market(symbol: str, bid: float, ask: float, last: Optional[float], point: float, digits: int, source="mt5", session="bot"):
+def log_market(symbol: str, bid: float, ask: float, last: Optional[float], point: float, digits: int, source="mt5", session="bot",
+               ts: Optional[float] = None):
+    # ts: زمان UTC خود تیک (epoch ثانیه)؛ بدون آن زمان نوشتن سطر ثبت می‌شود
     # 1 pip = 0.01 for 2/3 digits, else 0.0001
     pip = 0.01 if digits in (2,3) else 0.0001
     spread_points = (ask - bid) / point if (ask and bid and point) else None
     spread_pips = (ask - bid) / pip if (ask and bid) else None
+    dt_utc, dt_iran = _ts_strs(ts) if ts is not None else (_utc_now_str(), _iran_now_str())
     row = {
-        "dt_utc": _utc_now_str(),
-        "dt_iran": _iran_now_str(),
+        "dt_utc": dt_utc,
+        "dt_iran": dt_iran,
         "symbol": symbol,
         "bid": bid, "ask": ask, "last": last,
         "spread_points": spread_points, "spread_pips": spread_pips,
         "point": point, "digits": digits,
         "source": source, "session": session
     }
-    fp = MARKET_DIR / f"{symbol}_ticks_{datetime.utcnow():%Y-%m-%d}.csv"
+    fp = MARKET_DIR / f"{symbol}_ticks_{dt_utc[:10]}.csv"
     _append_csv(fp, [
         "dt_utc","dt_iran","symbol","bid","ask","last",
         "spread_points","spread_pips","point","digits","source","session"
@@ -0,0 +1,232 @@
+"""
+Decision latency: M1 bar close -> ``mt5.order_send`` returned.
+
+The live loop opens a trace when ``scheduler.poll`` reports a new bar
+(``begin``); the strategy and the connector drop named marks on the active
+trace (``mark``: legs, swing, signal, stops, each filling-mode attempt, fill)
+and the loop closes it (``end``). ``mark`` is a no-op without an active trace,
+so the backtester and the strategy workers pay nothing.
+
+Bar times are broker server time, not UTC. The connector estimates the
+server's UTC offset from a fresh tick (``server_offset_from_tick``,
+``set_server_offset``); until it is known, traces carry only the spans between
+marks (from detection on) and no close-anchored ``bar_detected``/``total``.
+``end`` adds a summary stage per trace: ``total`` (close -> last mark) and
+``decision`` (detection -> last mark) for traces that reached ``order_send``,
+``total_no_order``/``decision_no_order`` for bars that produced no order.
+
+Each closed trace appends one CSV row per stage next to the analytics.hooks
+CSVs (``RAW_DIR/latency``), written as one batch on the side-effect
+dispatcher (LOW priority) so the trading thread never waits on disk; rolling
+per-stage windows give p50/p95/p99 via ``summary``/``dump``. ``python -m analytics.latency [date]`` prints the
+percentiles from the persisted spans.
+"""
+import csv
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+SPAN_HEADERS = ["dt_utc", "symbol", "bar_time", "stage", "ms", "since_close_ms"]
+SUMMARY_HEADERS = ["stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+ORDER_MARK = "fill_attempt_"            # marked right after each mt5.order_send
+OFFSET_STEP = 900                       # broker offsets are whole quarter hours
+MAX_TICK_AGE = 120                      # a tick older than this cannot date the offset
+
+
+def server_offset_from_tick(tick_time: int, now: Optional[float] = None) -> Optional[int]:
+    """Server time - UTC in seconds from a fresh tick's ``time``; None when the tick is too old to tell."""
+    raw = tick_time - (time.time() if now is None else now)
+    offset = int(round(raw / OFFSET_STEP)) * OFFSET_STEP
+    if abs(raw - offset) > MAX_TICK_AGE or abs(offset) > 14 * 3600:
+        return None
+    return offset
+
+
+class Trace:
+    """Marks of one bar's decision path; times from ``perf_counter``, anchored to the bar close when the offset is known."""
+
+    __slots__ = ("symbol", "bar_close", "detect_ms", "marks")
+
+    def __init__(self, symbol: str, bar_close: int, server_offset: Optional[int] = None):
+        self.symbol = symbol
+        self.bar_close = bar_close                                  # server epoch seconds (= open of the next bar)
+        self.detect_ms = None if server_offset is None else \
+            max(0.0, (time.time() + server_offset - bar_close) * 1000.0)
+        self.marks: List[Tuple[str, float]] = [("bar_detected", time.perf_counter())]
+
+    def mark(self, stage: str):
+        self.marks.append((stage, time.perf_counter()))
+
+    @property
+    def sent(self) -> bool:
+        """True when the trace reached ``mt5.order_send``."""
+        return any(stage.startswith(ORDER_MARK) for stage, _ in self.marks)
+
+    @property
+    def decision_ms(self) -> float:
+        return (self.marks[-1][1] - self.marks[0][1]) * 1000.0
+
+    def spans(self) -> List[Tuple[str, float, Optional[float]]]:
+        """
+        (stage, ms since the previous mark, ms since the bar close or None) per mark;
+        bar_detected (close -> poll) only when the server offset was known.
+        """
+        out = [] if self.detect_ms is None else [("bar_detected", self.detect_ms, self.detect_ms)]
+        t0 = self.marks[0][1]
+        prev = t0
+        for stage, t in self.marks[1:]:
+            since = None if self.detect_ms is None else self.detect_ms + (t - t0) * 1000.0
+            out.append((stage, (t - prev) * 1000.0, since))
+            prev = t
+        return out
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 2000, persist: bool = True):
+        """
+        window: samples kept per stage for the rolling percentiles
+        persist: append each closed trace to RAW_DIR/latency/latency_spans_<date>.csv (in the background)
+        """
+        self.window = window
+        self.persist = persist
+        self.server_offset: Optional[int] = None   # server time - UTC (s); see set_server_offset
+        self._hist: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---------- Tracing ----------
+    def set_server_offset(self, offset: Optional[int]):
+        """Broker server time - UTC in seconds (None = unknown: no close-anchored spans)."""
+        self.server_offset = offset
+
+    def begin(self, symbol: str, bar_close: int) -> Trace:
+        trace = Trace(symbol, int(bar_close), self.server_offset)
+        self._local.trace = trace
+        return trace
+
+    def mark(self, stage: str):
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.mark(stage)
+
+    @property
+    def active(self) -> Optional[Trace]:
+        return getattr(self._local, "trace", None)
+
+    def end(self) -> Optional[Trace]:
+        """Close the active trace: record its spans plus the total/decision summary stages and persist them."""
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return None
+        self._local.trace = None
+        spans = trace.spans()
+        suffix = "" if trace.sent else "_no_order"
+        since = spans[-1][2] if spans else trace.detect_ms
+        if since is not None:
+            spans.append(("total" + suffix, since, since))
+        spans.append(("decision" + suffix, trace.decision_ms, since))
+        with self._lock:
+            for stage, ms, _ in spans:
+                hist = self._hist.get(stage)
+                if hist is None:
+                    hist = self._hist[stage] = deque(maxlen=self.window)
+                hist.append(ms)
+        if self.persist:
+            from side_effects import effects, LOW
+            effects.submit(_write_spans, self._span_rows(trace, spans), priority=LOW)
+        return trace
+
+    # ---------- Aggregates ----------
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            samples = {stage: np.fromiter(h, dtype=float) for stage, h in self._hist.items() if h}
+        return {stage: _stats(v) for stage, v in samples.items()}
+
+    def dump(self, path: Optional[Path] = None) -> Path:
+        """Write the rolling percentiles to CSV (default RAW_DIR/latency/latency_summary_<date>.csv)."""
+        if path is None:
+            path = _latency_dir() / f"latency_summary_{datetime.utcnow():%Y-%m-%d}.csv"
+        _write_summary(path, self.summary())
+        return path
+
+    @staticmethod
+    def _span_rows(trace: Trace, spans) -> List[dict]:
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        bar_time = datetime.utcfromtimestamp(trace.bar_close).strftime("%Y-%m-%d %H:%M:%S")
+        return [{"dt_utc": now, "symbol": trace.symbol, "bar_time": bar_time, "stage": stage, "ms": round(ms, 3),
+                 "since_close_ms": "" if since is None else round(since, 3)} for stage, ms, since in spans]
+
+
+def _write_spans(rows: List[dict]):
+    """Append one trace's span rows (runs on the side-effect worker) with a single open."""
+    fp = _latency_dir() / f"latency_spans_{rows[0]['dt_utc'][:10]}.csv"
+    file_exists = fp.exists()
+    with fp.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SPAN_HEADERS)
+        if not file_exists:
+            w.writeheader()
+        w.writerows(rows)
+
+
+def _latency_dir() -> Path:
+    from analytics import hooks
+    path = hooks.RAW_DIR / "latency"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _stats(values: np.ndarray) -> dict:
+    p = np.percentile(values, PERCENTILES)
+    return {"count": int(values.size), "p50_ms": float(p[0]), "p95_ms": float(p[1]),
+            "p99_ms": float(p[2]), "max_ms": float(values.max())}
+
+
+def _write_summary(path: Path, summary: Dict[str, dict]):
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SUMMARY_HEADERS)
+        w.writeheader()
+        for stage, st in summary.items():
+            w.writerow({"stage": stage, **{k: round(v, 3) if isinstance(v, float) else v for k, v in st.items()}})
+
+
+def summarize_spans(path: Path) -> Dict[str, dict]:
+    """Percentiles per stage from a persisted latency_spans CSV."""
+    samples: Dict[str, list] = {}
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            samples.setdefault(row["stage"], []).append(float(row["ms"]))
+    return {stage: _stats(np.asarray(v)) for stage, v in samples.items()}
+
+
+# ماژول‌سطح: یک tracker مشترک برای حلقه زنده، strategy و connector
+tracker = LatencyTracker()
+begin = tracker.begin
+set_server_offset = tracker.set_server_offset
+mark = tracker.mark
+end = tracker.end
+summary = tracker.summary
+dump = tracker.dump
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    day = argv[0] if argv else f"{datetime.utcnow():%Y-%m-%d}"
+    fp = _latency_dir() / f"latency_spans_{day}.csv"
+    if not fp.exists():
+        print(f"no spans recorded for {day} ({fp})")
+        return 1
+    print(f"{'stage':<28}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for stage, st in summarize_spans(fp).items():
+        print(f"{stage:<28}{st['count']:>7}{st['p50_ms']:>10.2f}{st['p95_ms']:>10.2f}{st['p99_ms']:>10.2f}{st['max_ms']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
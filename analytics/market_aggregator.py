@@ -0,0 +1,150 @@
+"""
+Per-bucket market summaries instead of one CSV row per tick.
+
+``MT5Connector.tick`` (used by the live loop and ``get_live_price``) feeds
+every tick it reads into a ``MarketAggregator``. Ticks are folded in memory
+into fixed time buckets (``bucket_seconds``, by tick time in UTC) per symbol: bid/ask OHLC, spread
+min/max/mean in points and the tick count. When a tick opens a new bucket the
+finished one is handed to ``sink`` as one row (the connector queues it on the
+side-effect dispatcher; ``write_bucket`` appends it to
+``MARKET_DIR/<symbol>_market_<date>.csv``). Raw per-tick rows
+(``analytics.hooks.log_market``) stay available through ``raw_sample_rate``
+(0 = off, 1 = every tick, 0.1 = every 10th); a raw row the sink refuses
+(returns False, e.g. the dispatcher queue is full) is counted in
+``raw_dropped``. A quote polled again with the same ``tick_msc`` is skipped,
+so ``ticks`` and ``spread_mean`` count market ticks, not polls.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from analytics import hooks
+
+BUCKET_HEADERS = [
+    "dt_utc", "symbol", "seconds", "ticks",
+    "bid_open", "bid_high", "bid_low", "bid_close",
+    "ask_open", "ask_high", "ask_low", "ask_close",
+    "spread_min", "spread_max", "spread_mean", "point", "digits",
+]
+
+
+class _Bucket:
+    __slots__ = ("key", "ticks", "bid_open", "bid_high", "bid_low", "bid_close",
+                 "ask_open", "ask_high", "ask_low", "ask_close", "spread_min", "spread_max", "spread_sum")
+
+    def __init__(self, key: int, bid: float, ask: float, spread: float):
+        self.key = key
+        self.ticks = 1
+        self.bid_open = self.bid_high = self.bid_low = self.bid_close = bid
+        self.ask_open = self.ask_high = self.ask_low = self.ask_close = ask
+        self.spread_min = self.spread_max = self.spread_sum = spread
+
+    def add(self, bid: float, ask: float, spread: float):
+        self.ticks += 1
+        if bid > self.bid_high:
+            self.bid_high = bid
+        if bid < self.bid_low:
+            self.bid_low = bid
+        if ask > self.ask_high:
+            self.ask_high = ask
+        if ask < self.ask_low:
+            self.ask_low = ask
+        self.bid_close, self.ask_close = bid, ask
+        if spread < self.spread_min:
+            self.spread_min = spread
+        if spread > self.spread_max:
+            self.spread_max = spread
+        self.spread_sum += spread
+
+
+class MarketAggregator:
+    def __init__(self, sink: Callable[[dict], None], bucket_seconds: float = 1.0, raw_sample_rate: float = 0.0,
+                 raw_sink: Optional[Callable[..., None]] = None):
+        """
+        sink: called with one row dict (BUCKET_HEADERS) per finished bucket
+        raw_sink: called with (symbol, bid, ask, last, point, digits, ts) for the sampled
+                  raw ticks (``hooks.log_market`` fields); returning False counts the row as dropped
+        """
+        self.sink = sink
+        self.bucket_seconds = float(bucket_seconds)
+        self.raw_sample_rate = float(raw_sample_rate)
+        self.raw_sink = raw_sink
+        self._buckets: Dict[str, _Bucket] = {}
+        self._meta: Dict[str, tuple] = {}
+        self._raw_credit: Dict[str, float] = {}
+        self._last_msc: Dict[str, int] = {}
+        self.raw_dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, symbol: str, bid: float, ask: float, point: float, digits: int,
+            ts: Optional[float] = None, last: Optional[float] = None, tick_msc: Optional[int] = None):
+        """
+        Fold one tick (``ts``: UTC epoch seconds of the tick, default now) into its bucket.
+        ``tick_msc`` (the tick's time_msc) identifies it: the same value as the symbol's
+        previous tick is a repeated poll of the same quote and is ignored.
+        """
+        if not bid or not ask:
+            return
+        ts = time.time() if ts is None else ts
+        key = int(ts // self.bucket_seconds)
+        spread = (ask - bid) / point if point else ask - bid
+        finished = None
+        with self._lock:
+            if tick_msc is not None:
+                if self._last_msc.get(symbol) == tick_msc:
+                    return
+                self._last_msc[symbol] = tick_msc
+            self._meta[symbol] = (point, digits)
+            bucket = self._buckets.get(symbol)
+            if bucket is not None and bucket.key == key:
+                bucket.add(bid, ask, spread)
+            else:
+                if bucket is not None and key > bucket.key:
+                    finished = self._row(symbol, bucket)
+                if bucket is None or key > bucket.key:
+                    self._buckets[symbol] = _Bucket(key, bid, ask, spread)
+                else:
+                    bucket.add(bid, ask, spread)   # tick older than the open bucket: fold in, do not reopen
+            sample = self._sample(symbol)
+        if finished is not None:
+            self.sink(finished)
+        if sample and self.raw_sink is not None:
+            if self.raw_sink(symbol, bid, ask, last, point, digits, ts) is False:
+                self.raw_dropped += 1
+
+    def _sample(self, symbol: str) -> bool:
+        if self.raw_sample_rate <= 0:
+            return False
+        credit = self._raw_credit.get(symbol, 0.0) + self.raw_sample_rate
+        if credit >= 1.0:
+            self._raw_credit[symbol] = credit - 1.0
+            return True
+        self._raw_credit[symbol] = credit
+        return False
+
+    def _row(self, symbol: str, b: _Bucket) -> dict:
+        point, digits = self._meta[symbol]
+        start = datetime.fromtimestamp(b.key * self.bucket_seconds, timezone.utc)
+        return {
+            "dt_utc": start.strftime("%Y-%m-%d %H:%M:%S"), "symbol": symbol,
+            "seconds": self.bucket_seconds, "ticks": b.ticks,
+            "bid_open": b.bid_open, "bid_high": b.bid_high, "bid_low": b.bid_low, "bid_close": b.bid_close,
+            "ask_open": b.ask_open, "ask_high": b.ask_high, "ask_low": b.ask_low, "ask_close": b.ask_close,
+            "spread_min": round(b.spread_min, 2), "spread_max": round(b.spread_max, 2),
+            "spread_mean": round(b.spread_sum / b.ticks, 2), "point": point, "digits": digits,
+        }
+
+    def flush(self):
+        """Emit the open buckets (e.g. at shutdown)."""
+        with self._lock:
+            rows = [self._row(symbol, b) for symbol, b in self._buckets.items()]
+            self._buckets.clear()
+        for row in rows:
+            self.sink(row)
+
+
+def write_bucket(row: dict):
+    """Append one bucket row to the symbol's daily market summary CSV."""
+    fp = hooks.MARKET_DIR / f"{row['symbol']}_market_{row['dt_utc'][:10]}.csv"
+    hooks._append_csv(fp, BUCKET_HEADERS, row)
@@ -36,6 +36,7 @@ class BacktestConfig:
     fib_entry_min: float = 0.705         # min fib retracement (only for external logic)
     fib_entry_max: float = 0.9           # max fib retracement
     external_quiet: bool = False         # suppress stdout from external strategy functions
+    use_live_strategy: bool = False      # if True replay bars through strategy.SwingFibStrategy (live bot decisions)
 
 
 @dataclass
@@ -70,9 +71,11 @@ class BacktestEngine:
                 if root_dir not in sys.path:
                     sys.path.insert(0, root_dir)
                 from get_legs import get_legs as external_get_legs  # type: ignore
+                from get_legs import get_legs_multi as external_get_legs_multi  # type: ignore
                 from swing import get_swing_points  # type: ignore
                 from fibo_calculate import fibonacci_retracement  # type: ignore
                 self._external_get_legs = external_get_legs
+                self._external_get_legs_multi = external_get_legs_multi
                 self._external_get_swing_points = get_swing_points
                 self._external_fibo = fibonacci_retracement
                 self._external_available = True
@@ -80,6 +83,14 @@ class BacktestEngine:
                 # Fallback silently to internal logic
                 self._external_available = False
                 self._external_import_error = str(e)
+        if self.cfg.use_live_strategy:
+            import sys, os
+            root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+            if root_dir not in sys.path:
+                sys.path.insert(0, root_dir)
+            from strategy import SwingFibStrategy, plan_stops  # type: ignore
+            self._strategy_cls = SwingFibStrategy
+            self._plan_stops = plan_stops
 
     @staticmethod
     def _ensure_status(df: pd.DataFrame) -> pd.DataFrame:
@@ -97,44 +108,82 @@ class BacktestEngine:
             return self._detect_legs_external(data)
         if data.empty:
             return []
-        legs: List[Dict] = []
-        start_idx = data.index[0]
-        j = 0
-        i = 1
-        scale = self.cfg.price_scale
         th = self.cfg.threshold_points
-
-        while i < len(data):
-            close_i = float(data['close'].iloc[i])
-            if i == 1:
-                legs.append({
-                    'start': start_idx,
-                    'start_value': float(data['close'].iloc[0]),
-                    'direction': 'up' if close_i >= float(data['close'].iloc[0]) else 'down',
-                    'end': data.index[i],
-                    'end_value': close_i,
-                })
-                j += 1
-            else:
-                last_end = float(legs[j-1]['end_value'])
-                price_diff_pts = abs(close_i - last_end) * scale
-                if price_diff_pts >= th:
+        closes = data['close'].to_numpy(dtype=float).tolist()
+        return self._label_legs(self._simple_legs_multi(closes, [th])[th], data.index)
+
+    def _simple_legs_multi(self, closes: List[float], thresholds) -> Dict[int, List[Dict]]:
+        """Internal close-based leg detector for several thresholds in one pass over ``closes``.
+        Legs hold bar positions (start_pos/end_pos); ``_label_legs`` adds the timestamps."""
+        thresholds = list(dict.fromkeys(thresholds))
+        out: Dict[int, List[Dict]] = {th: [] for th in thresholds}
+        if len(closes) < 2:
+            return out
+        scale = self.cfg.price_scale
+        close0 = closes[0]
+        close1 = closes[1]
+        for th in thresholds:
+            out[th].append({
+                'start_pos': 0,
+                'start_value': close0,
+                'direction': 'up' if close1 >= close0 else 'down',
+                'end_pos': 1,
+                'end_value': close1,
+            })
+        per_th = [(th, out[th]) for th in thresholds]
+        for i in range(2, len(closes)):
+            close_i = closes[i]
+            for th, legs in per_th:
+                last = legs[-1]
+                last_end = last['end_value']
+                if abs(close_i - last_end) * scale >= th:
                     current_dir = 'up' if close_i > last_end else 'down'
-                    if legs[j-1]['direction'] != current_dir:
+                    if last['direction'] != current_dir:
                         legs.append({
-                            'start': legs[j-1]['end'],
-                            'start_value': legs[j-1]['end_value'],
+                            'start_pos': last['end_pos'],
+                            'start_value': last_end,
                             'direction': current_dir,
-                            'end': data.index[i],
+                            'end_pos': i,
                             'end_value': close_i,
                         })
-                        j += 1
                     else:
-                        legs[j-1]['end'] = data.index[i]
-                        legs[j-1]['end_value'] = close_i
-            i += 1
+                        last['end_pos'] = i
+                        last['end_value'] = close_i
+        return out
+
+    @staticmethod
+    def _label_legs(legs: List[Dict], index) -> List[Dict]:
+        for leg in legs:
+            leg['start'] = index[leg['start_pos']]
+            leg['end'] = index[leg['end_pos']]
         return legs
 
+    def _window_starts(self, n: int) -> List[int]:
+        step = max(1, self.cfg.window_size // 10)
+        return list(range(0, max(0, n - self.cfg.window_size - 1), step))
+
+    def precompute_window_legs(self, df: pd.DataFrame, thresholds) -> Dict[int, Dict[int, List[Dict]]]:
+        """Legs of every backtest window for several thresholds at once.
+
+        Each window is scanned a single time for the whole threshold vector.
+        Returns {threshold: {window_start: last 3 legs}} which ``run(df, window_legs=...)``
+        accepts for a config with that threshold (the signal builders only look at legs[-3:]).
+        """
+        thresholds = list(dict.fromkeys(thresholds))
+        out: Dict[int, Dict[int, List[Dict]]] = {th: {} for th in thresholds}
+        external = self.cfg.use_external_logic and self._external_available
+        closes = df['close'].to_numpy(dtype=float).tolist()
+        w = self.cfg.window_size
+        for i in self._window_starts(len(df)):
+            if external:
+                legs_by_th = self._external_get_legs_multi(df.iloc[i:i + w], thresholds)
+            else:
+                legs_by_th = self._simple_legs_multi(closes[i:i + w], thresholds)
+            for th in thresholds:
+                tail = legs_by_th[th][-3:]
+                out[th][i] = tail if external else self._label_legs(tail, df.index[i:i + w])
+        return out
+
     def _build_signal(self, window: pd.DataFrame, legs: List[Dict]) -> Optional[Dict]:
         """Very simple swing signal: require 3 last legs and a direction change.
         Entry = last close; Stop = previous leg end; Target = entry +/- rr*|entry-stop|.
@@ -230,28 +279,60 @@ class BacktestEngine:
             r_result=r_result,
         )
 
-    def run(self, df: pd.DataFrame) -> Tuple[List[Trade], Dict]:
+    def run(self, df: pd.DataFrame, window_legs: Optional[Dict[int, List[Dict]]] = None) -> Tuple[List[Trade], Dict]:
+        """Walk the windows of ``df``. ``window_legs`` (from ``precompute_window_legs`` for this
+        config's threshold) skips per-window leg detection."""
         df = self._ensure_status(df)
+        if self.cfg.use_live_strategy:
+            return self._run_live_strategy(df)
         trades: List[Trade] = []
-        n = len(df)
-        step = max(1, self.cfg.window_size // 10)
 
-        i = 0
-        while i + self.cfg.window_size + 1 < n:
+        for i in self._window_starts(len(df)):
             window = df.iloc[i:i + self.cfg.window_size]
-            legs = self._detect_legs(window)
+            legs = window_legs[i] if window_legs is not None else self._detect_legs(window)
             signal = self._build_signal(window, legs)
             if signal:
                 future = df.iloc[i + self.cfg.window_size: i + self.cfg.window_size + self.cfg.lookahead]
                 trade = self._simulate_trade(window.index[-1], future, signal)
                 trades.append(trade)
-            i += step
 
         # Simulate equity after collecting raw R outcomes
         self._apply_equity(trades)
         summary = self._summarize(trades)
         return trades, summary
 
+    def _run_live_strategy(self, df: pd.DataFrame) -> Tuple[List[Trade], Dict]:
+        """Feed ``df`` bar by bar to the live bot's SwingFibStrategy.
+        Entry = close of the signal bar; SL/TP via plan_stops (pip = 10 points, broker min = 3 points).
+        """
+        strategy = self._strategy_cls(threshold=self.cfg.threshold_points, window_size=self.cfg.window_size)
+        pip_size = 10.0 / self.cfg.price_scale
+        min_stop = 3.0 / self.cfg.price_scale
+        trades: List[Trade] = []
+
+        for pos, row in enumerate(df.itertuples(index=True)):
+            sig = strategy.on_bar(row)
+            if sig is None:
+                continue
+            entry = float(row.close)
+            stops = self._plan_stops(sig.direction, entry, sig.fib_levels, pip_size, min_stop, self.cfg.rr)
+            if stops is None:
+                continue
+            stop, target = stops
+            signal = {
+                'direction': 'bullish' if sig.direction == 'buy' else 'bearish',
+                'entry': entry,
+                'stop': stop,
+                'target': target,
+                'rr': self.cfg.rr,
+            }
+            future = df.iloc[pos + 1: pos + 1 + self.cfg.lookahead]
+            trades.append(self._simulate_trade(row.Index, future, signal))
+
+        self._apply_equity(trades)
+        summary = self._summarize(trades)
+        return trades, summary
+
     # ------------------- External strategy integration ------------------- #
     def _detect_legs_external(self, data: pd.DataFrame) -> List[Dict]:
         """Use user's real get_legs() implementation.
@@ -456,3 +537,41 @@ def load_ohlc_csv(path: str) -> pd.DataFrame:
         return df[['open','high','low','close']].sort_index()
 
     raise ValueError(f"Unsupported OHLC format for file: {path}")
+
+
+STORE_PREFIX = 'store:'
+
+
+def load_ohlc(source: str) -> pd.DataFrame:
+    """Load OHLC from a CSV path (see load_ohlc_csv) or from the local bar store.
+
+    Store sources look like ``store:EURUSD``, ``store:EURUSD/M5`` or
+    ``store:EURUSD/M1@2024-01-01..2024-06-30`` (UTC dates, end exclusive, either side optional).
+    """
+    if not source.startswith(STORE_PREFIX):
+        return load_ohlc_csv(source)
+    import sys, os
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if root_dir not in sys.path:
+        sys.path.insert(0, root_dir)
+    from bar_store import BarStore  # type: ignore
+
+    spec, _, period = source[len(STORE_PREFIX):].partition('@')
+    symbol, _, timeframe = spec.partition('/')
+    start, _, end = period.partition('..')
+    df = BarStore().read_frame(symbol, timeframe or 'M1', start or None, end or None)
+    if df.empty:
+        raise ValueError(f"No stored bars for {source}")
+    return df
+
+
+def source_stem(source: str) -> str:
+    """File-name stem for results of ``source`` (CSV stem, or SYMBOL_TF[_period] for the store)."""
+    if not source.startswith(STORE_PREFIX):
+        return Path(source).stem
+    spec, _, period = source[len(STORE_PREFIX):].partition('@')
+    stem = spec.replace('/', '_')
+    start, _, end = period.partition('..')
+    if start or end:
+        stem += f"_{start or 'begin'}-{end or 'now'}".replace(' ', 'T').replace(':', '')
+    return stem
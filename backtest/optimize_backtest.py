@@ -30,7 +30,7 @@ import time
 
 import pandas as pd
 
-from engine import BacktestConfig, BacktestEngine, load_ohlc_csv
+from engine import BacktestConfig, BacktestEngine, load_ohlc
 
 
 def _parse_list(s: str, cast=float):
@@ -122,7 +122,7 @@ def infer_timeframe_minutes(df):
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--csv', nargs='+', required=True, help='One or more OHLC CSV paths')
+    ap.add_argument('--csv', nargs='+', required=True, help='One or more OHLC CSV paths or bar store sources (store:EURUSD/M1@2024-01-01..)')
     ap.add_argument('--symbol', default='EURUSD')
     ap.add_argument('--thresholds', default='6', help='Comma list')
     ap.add_argument('--windows', default='100')
@@ -148,7 +148,7 @@ def main():
     datasets = []
     for p in args.csv:
         try:
-            df = load_ohlc_csv(p)
+            df = load_ohlc(p)
             datasets.append((p, df))
         except Exception as e:
             print(f"⚠️ Skipping {p}: {e}")
@@ -173,6 +173,15 @@ def main():
     if not args.quiet:
         print(f"Parameter configs to test: {len(grid)} (original grid size {total_grid})")
 
+    # Legs depend only on (dataset, window, threshold): scan each window once for every threshold
+    # of the sweep and share the result across all configs with that window size.
+    thresholds_by_window: Dict[int, List[int]] = {}
+    for params in grid:
+        thresholds_by_window.setdefault(params['window_size'], []).append(params['threshold_points'])
+    grid.sort(key=lambda p: p['window_size'])
+    leg_cache_window = None
+    leg_cache: Dict[str, Dict] = {}
+
     results = []
     start = time.time()
     last_print_len = 0
@@ -192,10 +201,16 @@ def main():
             fib_entry_max=params.get('fib_entry_max') if args.use_external else 0.9,
             external_quiet=args.quiet,
         )
+        if params['window_size'] != leg_cache_window:
+            leg_cache_window = params['window_size']
+            leg_cache = {
+                path: BacktestEngine(cfg).precompute_window_legs(df, thresholds_by_window[leg_cache_window])
+                for path, df in datasets
+            }
         per_file_summaries = []
         for path, df in datasets:
             engine = BacktestEngine(cfg)
-            trades, summary = engine.run(df)
+            trades, summary = engine.run(df, window_legs=leg_cache[path][params['threshold_points']])
             per_file_summaries.append(summary)
         agg = aggregate_results(per_file_summaries)
         agg.update({
@@ -5,12 +5,13 @@ from pathlib import Path
 import json
 import pandas as pd
 
-from engine import BacktestEngine, BacktestConfig, load_ohlc_csv
+from engine import BacktestEngine, BacktestConfig, load_ohlc, source_stem
 
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("csv", help="Path to OHLC CSV with columns timestamp,open,high,low,close")
+    ap.add_argument("csv", help="Path to OHLC CSV with columns timestamp,open,high,low,close, "
+                                "or a bar store source such as store:EURUSD/M1@2024-01-01..2024-07-01")
     ap.add_argument("--symbol", default="EURUSD")
     ap.add_argument("--threshold", type=int, default=6, help="leg threshold in points")
     ap.add_argument("--window", type=int, default=100)
@@ -25,6 +26,7 @@ def main():
     ap.add_argument("--fib-entry-min", type=float, default=0.705, help="Min fib retracement ratio for entry (external logic)")
     ap.add_argument("--fib-entry-max", type=float, default=0.9, help="Max fib retracement ratio for entry (external logic)")
     ap.add_argument("--quiet-ext", action="store_true", help="Suppress prints from external strategy functions")
+    ap.add_argument("--live-strategy", action="store_true", help="Replay bars through the live bot's SwingFibStrategy")
     args = ap.parse_args()
 
     cfg = BacktestConfig(
@@ -41,16 +43,17 @@ def main():
     fib_entry_min=args.fib_entry_min,
     fib_entry_max=args.fib_entry_max,
     external_quiet=args.quiet_ext,
+    use_live_strategy=args.live_strategy,
     )
 
-    df = load_ohlc_csv(args.csv)
+    df = load_ohlc(args.csv)
     engine = BacktestEngine(cfg)
     trades, summary = engine.run(df)
     trades_df = engine.to_dataframe(trades)
 
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
-    stem = Path(args.csv).stem
+    stem = source_stem(args.csv)
     trades_path = outdir / f"{stem}_trades.csv"
     summary_path = outdir / f"{stem}_summary.json"
 
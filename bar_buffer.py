@@ -0,0 +1,117 @@
+"""
+Fixed-capacity OHLC ring buffer for the live bot.
+
+Bars live in preallocated parallel numpy arrays (time as int64 epoch seconds,
+open/high/low/close/volume as float64 and an int8 bullish flag). Appends are
+O(1) and memory stays flat no matter how long the bot runs.
+
+Every value is written twice (at ``i`` and ``i + capacity``), so the last N
+bars are always one contiguous slice: ``view(n)`` returns zero-copy numpy views
+and a DataFrame is only built when ``to_frame`` is called.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume', 'bullish')
+DTYPES = {
+    'time': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+    'bullish': np.int8,
+}
+
+BarView = namedtuple('BarView', COLUMNS)
+
+
+class OHLCRingBuffer:
+    def __init__(self, capacity, buffers=None):
+        """
+        capacity: number of bars kept.
+        buffers: optional {column: array of length 2*capacity} to use as storage
+                 (e.g. arrays over shared memory); allocated here when omitted.
+        """
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        if buffers is None:
+            buffers = {col: np.zeros(2 * capacity, dtype=DTYPES[col]) for col in COLUMNS}
+        self._cols = buffers
+        self.count = 0  # total bars ever appended (monotonic)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def last_time(self):
+        if self.count == 0:
+            return None
+        return int(self._cols['time'][(self.count - 1) % self.capacity])
+
+    # ---------- Writes ----------
+    def append(self, time, open_, high, low, close, volume=0.0):
+        self._write(self.count % self.capacity, time, open_, high, low, close, volume)
+        self.count += 1
+
+    def replace_last(self, time, open_, high, low, close, volume=0.0):
+        """Overwrite the newest bar (e.g. the forming bar once it has closed)."""
+        if self.count == 0:
+            raise IndexError('buffer is empty')
+        self._write((self.count - 1) % self.capacity, time, open_, high, low, close, volume)
+
+    def _write(self, slot, time, open_, high, low, close, volume):
+        bullish = 1 if open_ <= close else 0
+        for col, value in (('time', time), ('open', open_), ('high', high), ('low', low),
+                           ('close', close), ('volume', volume), ('bullish', bullish)):
+            arr = self._cols[col]
+            arr[slot] = value
+            arr[slot + self.capacity] = value
+
+    def extend_rates(self, rates):
+        """Append rows of an MT5 rates array (fields time/open/high/low/close/tick_volume)."""
+        volumes = rates['tick_volume'] if 'tick_volume' in rates.dtype.names else np.zeros(len(rates))
+        for r, vol in zip(rates, volumes):
+            self.append(int(r['time']), float(r['open']), float(r['high']),
+                        float(r['low']), float(r['close']), float(vol))
+
+    def clear(self):
+        self.count = 0
+
+    # ---------- Reads ----------
+    def view(self, n=None):
+        """Zero-copy views of the last ``n`` bars (oldest first) as a BarView of arrays."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = (self.count - 1) % self.capacity + 1 if self.count else 0
+        if end < n:
+            end += self.capacity
+        return BarView(*(self._cols[col][end - n:end] for col in COLUMNS))
+
+    def bar(self, k=-1):
+        """Single bar as a dict; ``k`` counts like a list index over the last len(self) bars."""
+        size = len(self)
+        if not -size <= k < size:
+            raise IndexError('bar index out of range')
+        pos = (self.count + k if k < 0 else self.count - size + k) % self.capacity
+        return {col: self._cols[col][pos].item() for col in COLUMNS}
+
+    def to_frame(self, n=None, tz=None):
+        """DataFrame of the last ``n`` bars, indexed by tz-aware time, with a status column."""
+        v = self.view(n)
+        index = pd.to_datetime(v.time, unit='s', utc=True)
+        if tz is not None:
+            index = index.tz_convert(tz)
+        df = pd.DataFrame({
+            'open': v.open,
+            'high': v.high,
+            'low': v.low,
+            'close': v.close,
+            'volume': v.volume,
+            'status': np.where(v.bullish == 1, 'bullish', 'bearish'),
+        }, index=pd.Index(index, name='time'))
+        df['timestamp'] = df.index
+        return df
@@ -0,0 +1,164 @@
+"""
+Local columnar store of historical bars, partitioned by symbol, timeframe and UTC day.
+
+    <root>/EURUSD/M1/2024/2024-03-05.npz    one array per rates field (time, open, ...)
+
+Partitions are only ever added or merged: ``write`` merges new rates into the
+day files they belong to, dropping duplicate bar times (the newer copy wins,
+so a bar stored while still forming is replaced by its final values), and
+replaces each file atomically. ``download`` pages through
+``copy_rates_range`` in ``chunk_days`` windows, starting from the last stored
+bar, so pulling years of history is an incremental job that can be re-run
+(``download_history.py``). Backtests read the store through
+``backtest.engine.load_ohlc('store:EURUSD/M1@2024-01-01..2024-06-30')``.
+"""
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metatrader5_config import HISTORY_CONFIG
+
+ROOT = Path(__file__).resolve().parent
+DAY = 86400
+
+
+def _epoch(value):
+    """datetime / date string / epoch seconds -> epoch seconds (naive values are UTC)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.timestamp())
+
+
+class BarStore:
+    def __init__(self, root=None):
+        """root: store directory (default HISTORY_CONFIG['store_dir'], relative to the repo)."""
+        root = Path(root or HISTORY_CONFIG.get('store_dir') or 'data/bars')
+        self.root = root if root.is_absolute() else ROOT / root
+
+    # ---------- Layout ----------
+    def _dir(self, symbol, timeframe):
+        return self.root / symbol / timeframe
+
+    def _path(self, symbol, timeframe, day):
+        name = datetime.fromtimestamp(day * DAY, timezone.utc).strftime('%Y-%m-%d')
+        return self._dir(symbol, timeframe) / name[:4] / f"{name}.npz"
+
+    def partitions(self, symbol, timeframe):
+        """Sorted [(day number, path)] of the stored partitions."""
+        out = []
+        for path in self._dir(symbol, timeframe).glob('*/*.npz'):
+            day = int(datetime.strptime(path.stem, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()) // DAY
+            out.append((day, path))
+        return sorted(out)
+
+    # ---------- Read ----------
+    @staticmethod
+    def _load(path):
+        with np.load(path) as data:
+            names = list(data.files)
+            rates = np.empty(len(data['time']), dtype=[(n, data[n].dtype) for n in names])
+            for n in names:
+                rates[n] = data[n]
+        return rates
+
+    def last_time(self, symbol, timeframe):
+        """Open time (epoch seconds) of the newest stored bar, or None."""
+        parts = self.partitions(symbol, timeframe)
+        if not parts:
+            return None
+        return int(self._load(parts[-1][1])['time'][-1])
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        """Structured rates array (same fields as copy_rates_*) with start <= time < end."""
+        t0, t1 = _epoch(start), _epoch(end)
+        chunks = []
+        for day, path in self.partitions(symbol, timeframe):
+            if (t0 is not None and (day + 1) * DAY <= t0) or (t1 is not None and day * DAY >= t1):
+                continue
+            rates = self._load(path)
+            if t0 is not None:
+                rates = rates[rates['time'] >= t0]
+            if t1 is not None:
+                rates = rates[rates['time'] < t1]
+            chunks.append(rates)
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+
+    def read_frame(self, symbol, timeframe, start=None, end=None):
+        """OHLC DataFrame indexed by naive UTC ``timestamp`` (the shape of load_ohlc_csv)."""
+        rates = self.read(symbol, timeframe, start, end)
+        if rates is None:
+            return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'],
+                                index=pd.DatetimeIndex([], name='timestamp'))
+        df = pd.DataFrame({
+            'open': rates['open'], 'high': rates['high'], 'low': rates['low'], 'close': rates['close'],
+            'volume': rates['tick_volume'] if 'tick_volume' in rates.dtype.names else 0,
+        }, index=pd.DatetimeIndex(pd.to_datetime(rates['time'], unit='s'), name='timestamp'))
+        return df
+
+    # ---------- Write ----------
+    def write(self, symbol, timeframe, rates):
+        """Merge ``rates`` into their day partitions; returns the number of bars not stored before."""
+        if rates is None or len(rates) == 0:
+            return 0
+        rates = np.sort(np.asarray(rates), order='time')
+        days = rates['time'] // DAY
+        added = 0
+        for day in np.unique(days):
+            chunk = rates[days == day]
+            path = self._path(symbol, timeframe, int(day))
+            old = self._load(path) if path.exists() else None
+            if old is not None:
+                merged = np.concatenate([old.astype(chunk.dtype), chunk])
+                # برای زمان تکراری نسخه جدیدتر (آخرین) نگه داشته می‌شود
+                _, first_of_reversed = np.unique(merged['time'][::-1], return_index=True)
+                chunk = merged[::-1][first_of_reversed]
+            added += len(chunk) - (0 if old is None else len(old))
+            self._save(path, chunk)
+        return added
+
+    @staticmethod
+    def _save(path, rates):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.bars-', suffix='.tmp', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.savez(fh, **{n: rates[n] for n in rates.dtype.names})
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # ---------- Download ----------
+    def download(self, symbol, timeframe, fetch, start, end=None, chunk_days=30, log=print):
+        """
+        Page ``fetch(date_from, date_to)`` (normally ``mt5.copy_rates_range`` bound to
+        symbol/timeframe) from max(start, last stored bar) to ``end`` (default now)
+        in ``chunk_days`` windows. Stops at the first failed chunk (None), so the
+        next run resumes there. Returns the number of new bars.
+        """
+        last = self.last_time(symbol, timeframe)
+        begin = max(_epoch(start), last) if last is not None else _epoch(start)
+        stop_at = _epoch(end) if end is not None else int(datetime.now(timezone.utc).timestamp())
+        added = 0
+        while begin < stop_at:
+            stop = min(begin + chunk_days * DAY, stop_at)
+            rates = fetch(datetime.fromtimestamp(begin, timezone.utc), datetime.fromtimestamp(stop, timezone.utc))
+            if rates is None:
+                log(f"❌ {symbol} {timeframe}: fetch failed for chunk starting "
+                    f"{datetime.fromtimestamp(begin, timezone.utc):%Y-%m-%d %H:%M}")
+                break
+            added += self.write(symbol, timeframe, rates)
+            begin = stop
+        return added
@@ -0,0 +1,52 @@
+"""
+Incremental tick capture into the local tick store.
+
+    python capture_ticks.py                       # MT5_CONFIG symbols, resume each from its last tick
+    python capture_ticks.py EURUSD --start 2024-06-01 --chunk-minutes 30
+
+Each symbol resumes from its last stored tick (the first run starts
+HISTORY_CONFIG['tick_days'] back) and pages through ``mt5.copy_ticks_range``
+(COPY_TICKS_ALL) in ``chunk_minutes`` windows; see tick_store.TickStore.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import MetaTrader5 as mt5
+
+from metatrader5_config import HISTORY_CONFIG, MT5_CONFIG
+from tick_store import TickStore
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Capture tick history into the local tick store")
+    ap.add_argument('symbols', nargs='*', help="default: MT5_CONFIG['symbols']")
+    ap.add_argument('--start', default=None, help="first date when nothing is stored yet (UTC, default tick_days back)")
+    ap.add_argument('--end', default=None, help='last date (UTC, default now)')
+    ap.add_argument('--chunk-minutes', type=int, default=HISTORY_CONFIG['tick_chunk_minutes'])
+    ap.add_argument('--store', default=None, help="store directory (default HISTORY_CONFIG['tick_dir'])")
+    args = ap.parse_args(argv)
+
+    symbols = args.symbols or MT5_CONFIG.get('symbols') or [MT5_CONFIG['symbol']]
+    start = args.start or datetime.now(timezone.utc) - timedelta(days=HISTORY_CONFIG['tick_days'])
+
+    if not mt5.initialize():
+        print("❌ MT5 initialize failed:", mt5.last_error())
+        return 1
+    store = TickStore(args.store)
+    try:
+        for symbol in symbols:
+            mt5.symbol_select(symbol, True)
+            info = mt5.symbol_info(symbol)
+            if not info:
+                print(f"❌ {symbol}: symbol info not available")
+                continue
+            fetch = lambda date_from, date_to: mt5.copy_ticks_range(symbol, date_from, date_to, mt5.COPY_TICKS_ALL)
+            added = store.download(symbol, fetch, info.point, start, args.end, chunk_minutes=args.chunk_minutes)
+            print(f"✅ {symbol}: +{added} ticks (last stored tick time_msc={store.last_time_msc(symbol)})")
+    finally:
+        mt5.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
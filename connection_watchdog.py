@@ -0,0 +1,227 @@
+"""
+Terminal connection health and automatic re-initialization.
+
+``ConnectionWatchdog`` is fed by the connector and the main loop: failed API
+calls are classified from ``mt5.last_error()`` (IPC/connection codes count,
+request errors such as bad parameters do not), blocking calls can be run
+through ``call`` with a timeout, and ``ensure_connected`` re-runs
+``initialize`` with exponential backoff and jitter once the connection is
+considered down. ``state`` is CONNECTED, DEGRADED (recent connection-class
+failures) or DOWN (waiting to reconnect); the loop skips its work while DOWN.
+
+A call that times out cannot be cancelled: its thread stays inside the
+MetaTrader5 extension. Until it returns, ``call`` refuses new calls and
+``ensure_connected`` does not reconnect, so the terminal IPC is never entered
+from two threads. After ``max_stuck`` timeouts without a completed call in
+between, or one call stuck for ``max_stuck * call_timeout``, ``on_stuck`` is
+called (default: ``restart_process``).
+"""
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+CONNECTED = 'connected'
+DEGRADED = 'degraded'
+DOWN = 'down'
+
+RES_S_OK = 1
+RES_E_AUTH_FAILED = -6
+# RES_E_INTERNAL_FAIL, _SEND, _RECEIVE, _INIT, _CONNECT, _TIMEOUT: ارتباط IPC با terminal قطع است
+IPC_ERRORS = {-10000, -10001, -10002, -10003, -10004, -10005}
+
+
+def classify(error):
+    """'ok', 'connection' or 'request' for an ``mt5.last_error()`` tuple."""
+    code = error[0] if error else None
+    if code is None or code == RES_S_OK:
+        return 'ok'
+    if code in IPC_ERRORS or code == RES_E_AUTH_FAILED:
+        return 'connection'
+    return 'request'
+
+
+def restart_process():
+    """Replace this process with a fresh run of the same command (a stuck MT5 call cannot be cancelled)."""
+    sys.stdout.flush()
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+class ConnectionWatchdog:
+    def __init__(self, reconnect, last_error, call_timeout=10.0, down_after=3, backoff_base=1.0,
+                 backoff_max=60.0, jitter=0.5, max_stuck=3, on_stuck=restart_process, clock=None,
+                 rand=random.random, log=print):
+        """
+        reconnect: callable() -> bool, re-runs the terminal initialization
+        last_error: callable() -> (code, message), normally ``mt5.last_error``
+        call_timeout: seconds ``call`` waits for a blocking API call (0 = no guard)
+        down_after: consecutive connection failures before the state goes DOWN
+        jitter: fraction of each backoff delay that is randomized away (0..1)
+        max_stuck: timed-out calls before ``on_stuck`` is called (see module docstring)
+        """
+        self._reconnect = reconnect
+        self._last_error = last_error
+        self.call_timeout = call_timeout
+        self.down_after = down_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._clock = clock or (lambda: time.monotonic())
+        self._rand = rand
+        self._log = log
+        self.state = CONNECTED
+        self.failures = 0          # consecutive connection-class failures
+        self.attempts = 0          # reconnect attempts since the state went DOWN
+        self.next_attempt = 0.0
+        self.last_reason = None
+        self.max_stuck = max_stuck
+        self._on_stuck = on_stuck
+        self.timeouts = 0          # timed-out calls since the last completed one
+        self._lock = threading.Lock()
+        self._call_lock = threading.Lock()
+        self._jobs = None          # queue of the worker thread that runs guarded calls
+        self._stuck = []           # (done event, name, since) of timed-out calls still inside MT5
+
+    # ---------- Guarded calls ----------
+    def call(self, fn, *args, **kwargs):
+        """
+        ``fn(*args, **kwargs)`` with the timeout guard. Calls run one at a time on a
+        daemon worker thread. On timeout that worker is abandoned, the state goes
+        DOWN and None is returned, like a failed MT5 call; while an abandoned call
+        is still running, further calls return None without entering MT5.
+        """
+        if not self.call_timeout:
+            return fn(*args, **kwargs)
+        name = getattr(fn, '__name__', fn)
+        self._check_stuck()
+        with self._call_lock:
+            if self.stuck():
+                return None
+            jobs = self._jobs
+            if jobs is None:
+                jobs = self._jobs = queue.SimpleQueue()
+                threading.Thread(target=self._work, args=(jobs,), name='mt5-call', daemon=True).start()
+        box = {}
+        done = threading.Event()
+        jobs.put((fn, args, kwargs, box, done))
+        if not done.wait(self.call_timeout):
+            box['abandoned'] = True
+            with self._call_lock:
+                running = not done.is_set() and self._jobs is jobs
+                if running:
+                    # thread گیرکرده کنار گذاشته می‌شود؛ بعد از برگشتن، None صف خودش را می‌بیند و تمام می‌شود
+                    self._jobs = None
+                    jobs.put(None)
+                if not done.is_set():
+                    self._stuck.append((done, name, self._clock()))
+                    self.timeouts += 1
+            if 'value' not in box and 'error' not in box:
+                self._failed(f"{name} timed out after {self.call_timeout}s", hard=True)
+                if self.timeouts >= self.max_stuck:
+                    self._escalate(f"{self.timeouts} MT5 calls timed out")
+                return None
+        self.timeouts = 0
+        if 'error' in box:
+            raise box['error']
+        return box.get('value')
+
+    @staticmethod
+    def _work(jobs):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            fn, args, kwargs, box, done = job
+            if not box.get('abandoned'):    # caller gave up while queued: never send it late
+                try:
+                    box['value'] = fn(*args, **kwargs)
+                except BaseException as e:
+                    box['error'] = e
+            done.set()
+
+    def stuck(self):
+        """Number of timed-out calls still running inside MT5."""
+        self._stuck = [s for s in self._stuck if not s[0].is_set()]
+        return len(self._stuck)
+
+    def _check_stuck(self):
+        if self.stuck() and self._clock() - self._stuck[0][2] >= self.max_stuck * self.call_timeout:
+            self._escalate(f"{self._stuck[0][1]} stuck for {self._clock() - self._stuck[0][2]:.0f}s")
+
+    def _escalate(self, reason):
+        self._log(f"🛑 MT5 calls are not returning ({reason}); restarting")
+        self._on_stuck()
+
+    # ---------- Reports ----------
+    def report_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == DEGRADED:
+                self._set(CONNECTED)
+
+    def report_failure(self, error=None):
+        """Classify a failed call (``mt5.last_error()`` when ``error`` is None); returns the class."""
+        if error is None:
+            error = self._last_error()
+        kind = classify(error)
+        if kind == 'connection':
+            self._failed(f"last_error={error}")
+        return kind
+
+    def _failed(self, reason, hard=False):
+        with self._lock:
+            self.failures += 1
+            self.last_reason = reason
+            if self.state == DOWN:
+                return
+            if hard or self.failures >= self.down_after:
+                self.attempts = 0
+                self.next_attempt = self._clock()
+                self._set(DOWN)
+            else:
+                self._set(DEGRADED)
+
+    def _set(self, state):
+        if state != self.state:
+            self._log(f"🩺 MT5 connection {self.state} -> {state} ({self.last_reason})")
+            self.state = state
+
+    # ---------- Recovery ----------
+    def ensure_connected(self):
+        """True when the loop may do its work. While DOWN, re-initializes once the backoff has passed."""
+        if self.state != DOWN:
+            return True
+        now = self._clock()
+        if now < self.next_attempt:
+            return False
+        self._check_stuck()
+        if self.stuck():
+            return False    # shutdown/initialize while a call is still inside MT5 = concurrent IPC
+        self.attempts += 1
+        try:
+            ok = bool(self._reconnect())
+        except Exception as e:
+            self.last_reason = f"reconnect raised {e}"
+            ok = False
+        with self._lock:
+            if ok:
+                self._log(f"✅ MT5 re-initialized after {self.attempts} attempt(s)")
+                self.failures = 0
+                self.attempts = 0
+                self._set(CONNECTED)
+                return True
+            self.next_attempt = now + self.backoff()
+        return False
+
+    def backoff(self):
+        """Delay before the next attempt: base * 2^(attempts-1), capped, minus up to ``jitter`` of it."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(self.attempts - 1, 0))
+        return delay * (1.0 - self.jitter * self._rand())
+
+    def retry_in(self):
+        """Seconds until the next reconnect attempt (0 when not DOWN or already due)."""
+        if self.state != DOWN:
+            return 0.0
+        return max(0.0, self.next_attempt - self._clock())
@@ -0,0 +1,54 @@
+"""
+Incremental bulk download of historical bars into the local bar store.
+
+    python download_history.py                       # HISTORY_CONFIG symbols/timeframes, resume each
+    python download_history.py EURUSD GBPUSD --timeframes M1,M5 --start 2018-01-01
+
+Each (symbol, timeframe) resumes from its last stored bar and pages through
+``mt5.copy_rates_range`` in ``chunk_days`` windows (see bar_store.BarStore),
+so the job can be re-run at any time, e.g. from a scheduler.
+"""
+import argparse
+
+import MetaTrader5 as mt5
+
+from bar_store import BarStore
+from metatrader5_config import HISTORY_CONFIG, MT5_CONFIG
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Download historical bars into the local bar store")
+    ap.add_argument('symbols', nargs='*', help="default: MT5_CONFIG['symbols']")
+    ap.add_argument('--timeframes', default=','.join(HISTORY_CONFIG['timeframes']), help='comma list, e.g. M1,M5,H1')
+    ap.add_argument('--start', default=HISTORY_CONFIG['start'], help='first date when nothing is stored yet (UTC)')
+    ap.add_argument('--end', default=None, help='last date (UTC, default now)')
+    ap.add_argument('--chunk-days', type=int, default=HISTORY_CONFIG['chunk_days'])
+    ap.add_argument('--store', default=None, help="store directory (default HISTORY_CONFIG['store_dir'])")
+    args = ap.parse_args(argv)
+
+    symbols = args.symbols or MT5_CONFIG.get('symbols') or [MT5_CONFIG['symbol']]
+    timeframes = [tf.strip().upper() for tf in args.timeframes.split(',') if tf.strip()]
+    for tf in timeframes:
+        if not hasattr(mt5, f'TIMEFRAME_{tf}'):
+            ap.error(f"unknown timeframe {tf}")
+
+    if not mt5.initialize():
+        print("❌ MT5 initialize failed:", mt5.last_error())
+        return 1
+    store = BarStore(args.store)
+    try:
+        for symbol in symbols:
+            mt5.symbol_select(symbol, True)
+            for tf in timeframes:
+                code = getattr(mt5, f'TIMEFRAME_{tf}')
+                fetch = lambda date_from, date_to: mt5.copy_rates_range(symbol, code, date_from, date_to)
+                added = store.download(symbol, tf, fetch, args.start, args.end, chunk_days=args.chunk_days)
+                last = store.last_time(symbol, tf)
+                print(f"✅ {symbol} {tf}: +{added} bars (last stored bar epoch={last})")
+    finally:
+        mt5.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -9,6 +9,7 @@ _executor = ThreadPoolExecutor(max_workers=2)
 SENDER = EMAIL_HOST_USER_NAME
 PASSWORD = EMAIL_HOST_PASSWORD_KEY
 RECIPIENT = EMAIL_RECIPIENT_USER_NAME  # می‌توان چند گیرنده با جداکردن با کاما گذاشت
+SMTP_TIMEOUT = 20  # ثانیه؛ اتصال یا پاسخ کند SMTP بیش از این منتظر نمی‌ماند
 
 def _build_message(subject: str, body: str) -> EmailMessage:
     msg = EmailMessage()
@@ -25,11 +26,15 @@ def _send(subject: str, body: str):
     try:
         msg = _build_message(subject, body)
         context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
+        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context, timeout=SMTP_TIMEOUT) as smtp:
             smtp.login(SENDER, PASSWORD)
             smtp.send_message(msg)
     except Exception as e:
         print(f"Email send error: {e}")
 
+def send_trade_email(subject: str, body: str):
+    """Send on the calling thread (at most SMTP_TIMEOUT per socket operation); errors are printed, not raised."""
+    _send(subject, body)
+
 def send_trade_email_async(subject: str, body: str):
     _executor.submit(_send, subject, body)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Learned ``type_filling`` per (symbol, trade action).
+
+``MT5Connector.try_all_filling_modes`` tries the learned mode first, so a
+known symbol costs one ``order_send``. A mode is learned when an order is
+accepted with it and forgotten when the broker rejects it with
+TRADE_RETCODE_INVALID_FILL (the broker changed what it accepts). The table is
+written atomically (temp file + ``os.replace``) whenever it changes, so it
+survives restarts.
+"""
+import json
+import os
+import tempfile
+import threading
+
+AUTO = 'auto'   # request sent without type_filling
+
+
+class FillingModeCache:
+    def __init__(self, path=None):
+        """path: JSON file to persist to (None = memory only)."""
+        self.path = path
+        self._modes = {}
+        self._lock = threading.Lock()
+        if path:
+            self._modes = self._load()
+
+    @staticmethod
+    def _key(symbol, action):
+        return f"{symbol}|{action}"
+
+    def get(self, symbol, action):
+        """Learned mode (int or AUTO) or None."""
+        with self._lock:
+            return self._modes.get(self._key(symbol, action))
+
+    def learn(self, symbol, action, mode):
+        key = self._key(symbol, action)
+        with self._lock:
+            if self._modes.get(key) == mode:
+                return
+            self._modes[key] = mode
+            snapshot = dict(self._modes)
+        self._save(snapshot)
+
+    def forget(self, symbol, action):
+        key = self._key(symbol, action)
+        with self._lock:
+            if self._modes.pop(key, None) is None:
+                return
+            snapshot = dict(self._modes)
+        self._save(snapshot)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[filling_cache] ignoring unreadable {self.path}: {e}")
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, int) or v == AUTO}
+
+    def _save(self, modes):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp = tempfile.mkstemp(prefix='.filling-', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                json.dump(modes, fh, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            # جدول فقط بهینه‌سازی است؛ خطای دیسک نباید سفارش را متوقف کند
+            print(f"[filling_cache] could not save {self.path}: {e}")
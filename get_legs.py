@@ -1,128 +1,279 @@
+import numpy as np
+
 from metatrader5_config import TRADING_CONFIG
 
+
 def get_legs(data, custom_threshold=None):
     threshold = custom_threshold if custom_threshold else TRADING_CONFIG['threshold']
-    print(f'Using threshold: {threshold}')
-    print('len(data): ', len(data))
+    if len(data) == 0:
+        return []
+
+    open_, high, low, close = ohlc_arrays(data)
+    raw_legs = detect_legs(open_, high, low, close, threshold)
+    return _label_legs(raw_legs, data.index)
+
+
+def get_legs_multi(data, thresholds):
+    """``get_legs`` for several thresholds at once -> {threshold: legs}, one scan of ``data``."""
+    if len(data) == 0:
+        return {th: [] for th in thresholds}
+    raw = detect_legs_multi(*ohlc_arrays(data), thresholds=thresholds)
+    return {th: _label_legs(legs, data.index) for th, legs in raw.items()}
+
+
+def _label_legs(raw_legs, index, offset=0):
+    """Leg dicts in get_legs format: positions -> index labels (``offset`` = position of bar 0 in ``index``)."""
     legs = []
-    start_index = data.index[0]
-    j = 0
-    last_start_price = None
-    i = 1
-
-    while i < len(data):
-        
-
-    ##################          Current Price      ###############################################################   
-        
-        current_is_bullish = data['close'].iloc[i] >= data['open'].iloc[i]
-        if j>0 and legs[j-1]['direction'] == 'up' and data['high'].iloc[i] >= data['high'].iloc[i-1]:
-            current_price = data['high'].iloc[i]
-        elif j>0 and legs[j-1]['direction'] == 'down' and data['low'].iloc[i] <= data['low'].iloc[i-1]:
-            current_price = data['low'].iloc[i]
-            
-        else:
-            current_price = data['high'].iloc[i] if current_is_bullish else data['low'].iloc[i]
+    for leg in raw_legs:
+        legs.append({
+            'start': index[leg['start_pos'] + offset],
+            'start_value': leg['start_value'],
+            'end': index[leg['end_pos'] + offset],
+            'end_value': leg['end_value'],
+            'length': leg['length'],
+            'direction': leg['direction'],
+            'start_pos': leg['start_pos'],
+            'end_pos': leg['end_pos'],
+        })
+    return legs
+
+
+def ohlc_arrays(data):
+    """Pull open/high/low/close out of ``data`` once as contiguous float64 arrays."""
+    return tuple(
+        np.ascontiguousarray(data[col].to_numpy(dtype=np.float64))
+        for col in ('open', 'high', 'low', 'close')
+    )
+
+
+def detect_legs(open_, high, low, close, threshold, price_scale=10000):
+    """
+    Leg state machine of ``get_legs`` over plain price arrays.
+
+    Bars are addressed by integer position, so there are no pandas lookups inside
+    the loop. Returned legs carry ``start_pos``/``end_pos`` (positions in the arrays);
+    their ``start``/``end`` are the same positions.
+    """
+    if len(close) < 2:
+        return []
+    detector = LegDetector(threshold=threshold, price_scale=price_scale)
+    # Python floats index much faster than numpy scalars in a sequential loop
+    step = detector.step
+    for pos, bar in enumerate(zip(_as_list(open_), _as_list(high), _as_list(low), _as_list(close))):
+        step(pos, pos, *bar)
+    return detector.legs
+
+
+def detect_legs_multi(open_, high, low, close, thresholds, price_scale=10000):
+    """
+    ``detect_legs`` for a vector of thresholds in a single pass over the arrays.
+
+    Every bar is unpacked once and pushed through one state machine per
+    threshold, so a sweep of N thresholds costs about one scan instead of N.
+    Returns {threshold: legs}.
+    """
+    thresholds = list(dict.fromkeys(thresholds))
+    detectors = [LegDetector(threshold=th, price_scale=price_scale) for th in thresholds]
+    steps = [d.step for d in detectors]
+    for pos, bar in enumerate(zip(_as_list(open_), _as_list(high), _as_list(low), _as_list(close))):
+        for step in steps:
+            step(pos, pos, *bar)
+    return {th: d.legs for th, d in zip(thresholds, detectors)}
+
+
+def _as_list(values):
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+class LegDetector:
+    """
+    Streaming version of ``get_legs``: consumes one bar at a time.
+
+    Feeding bars ``b0..bn`` through ``update`` yields the same legs as
+    ``get_legs`` over a DataFrame of those bars, but each new bar costs O(1)
+    instead of a rebuild of the whole window. ``replace_last`` re-applies the most
+    recent bar with new prices (e.g. when a still-forming M1 bar closes).
+    """
 
-    ##################          Start Price      ############################################################### 
-        
-        start_is_bullish = data['close'].loc[start_index] >= data['open'].loc[start_index]
+    def __init__(self, threshold=None, price_scale=10000, max_legs=None):
+        self.threshold = threshold if threshold else TRADING_CONFIG['threshold']
+        self.price_scale = price_scale
+        self.max_legs = max_legs
+        self.reset()
 
-        start_price = data['high'].loc[start_index] if start_is_bullish else data['low'].loc[start_index]
+    def reset(self):
+        self.legs = []
+        self._end_hl = []         # (high, low) of each leg's end bar, parallel to self.legs
+        self.bar_count = 0
+        self.last_time = None
+        self._start = None        # (pos, time, open, high, low, close) of the current start bar
+        self._prev_hl = None      # (high, low) of the previous bar
+        self._direction = None    # last direction computed in the threshold branch (sticky, as in get_legs)
+        self._checkpoint = None
 
-    ##################                ###############################################################   
+    # ---------- Public API ----------
+    def update(self, bar):
+        """Consume the next bar (Series, dict or namedtuple with open/high/low/close)."""
+        self._trim()
+        self._checkpoint = self._save()
+        self.step(self.bar_count, *_bar_fields(bar))
 
-        price_diff = abs(current_price - start_price) * 10000
-        
-        if j>0:
-            timestamp_value = legs[j-1]['start']
-            row = data.loc[timestamp_value]
+    def replace_last(self, bar):
+        """Re-apply the most recent bar with updated prices."""
+        if self._checkpoint is None:
+            raise ValueError('no bar to replace')
+        self._restore(self._checkpoint)
+        self.step(self.bar_count, *_bar_fields(bar))
+
+    def seed(self, data):
+        """Reset and consume every row of ``data`` (DataFrame with open/high/low/close)."""
+        if len(data) == 0:
+            self.reset()
+            return self
+        return self.seed_arrays(data.index, *ohlc_arrays(data))
+
+    def seed_arrays(self, times, open_, high, low, close):
+        """Reset and consume bars given as parallel arrays (``times`` become the legs' start/end)."""
+        self.reset()
+        times = _as_list(times) if isinstance(times, np.ndarray) else times
+        open_, high, low, close = (_as_list(a) for a in (open_, high, low, close))
+        last = len(close) - 1
+        for k in range(len(close)):
+            if k == last:
+                self._trim()
+                self._checkpoint = self._save()
+            self.step(k, times[k], open_[k], high[k], low[k], close[k])
+        return self
+
+    def last_legs(self, n=3):
+        """Current ``legs[-n:]`` without a recompute."""
+        return self.legs[-n:]
+
+    # ---------- State machine ----------
+    def step(self, pos, time, open_, high, low, close):
+        """Advance the state machine by one bar. ``pos`` must be ``bar_count``."""
+        self.bar_count = pos + 1
+        self.last_time = time
+        if self._start is None:
+            self._start = (pos, time, open_, high, low, close)
+            self._prev_hl = (high, low)
+            return
+
+        threshold = self.threshold
+        scale = self.price_scale
+        legs = self.legs
+        last = legs[-1] if legs else None
+        prev_high, prev_low = self._prev_hl
+        s_pos, s_time, s_open, s_high, s_low, s_close = self._start
+
+        ##################          Current Price      ###############################################################
+        if last is not None and last['direction'] == 'up' and high >= prev_high:
+            current_price = high
+        elif last is not None and last['direction'] == 'down' and low <= prev_low:
+            current_price = low
+        else:
+            current_price = high if close >= open_ else low
+
+        ##################          Start Price      ###############################################################
+        start_price = s_high if s_close >= s_open else s_low
+
+        price_diff = abs(current_price - start_price) * scale
+        move_start = False
 
-        if data['close'].iloc[i] >= data['close'].loc[start_index] or data['high'].iloc[i] > data['high'].iloc[i-1] and data['close'].iloc[i] >= data['close'].iloc[i-1]:
-            mydirection = 'up'
-        elif data['close'].iloc[i] < data['close'].loc[start_index] or data['low'].iloc[i] < data['low'].iloc[i-1] and data['close'].iloc[i] < data['close'].iloc[i-1]:
-            mydirection = 'down'
-            
-        
         if price_diff >= threshold and price_diff < threshold * 5:
-            
-            direction = 'up' if data['close'].iloc[i] > data['close'].loc[start_index] or data['high'].iloc[i] > data['high'].iloc[i-1] else 'down'
-            if j > 0 and legs[j-1]['direction'] == direction:
-                    price_diff += legs[j-1]['length']
-                    legs[j-1]['end'] = data.index[i]
-                    legs[j-1]['end_value'] = current_price
-                    legs[j-1]['length'] = price_diff
-                    legs[j-1]['direction'] = direction
-                    start_index = data.index[i]
-                    
-
-            elif len(data.loc[start_index:data.index[i]]) >= 3:
-                if legs and len(legs) > 0:
-                    timestamp_value = legs[-1]['end']
-                    row = data.loc[timestamp_value]
-            
-                    if legs[-1]['direction'] == 'up':
-                        start_price = row['high']
-                    else:
-                        start_price = row['low']
-                price_diff = abs(current_price - start_price) * 10000
+
+            direction = 'up' if close > s_close or high > prev_high else 'down'
+            self._direction = direction
+            if last is not None and last['direction'] == direction:
+                price_diff += last['length']
+                self._extend(last, pos, time, current_price, price_diff, high, low)
+                last['direction'] = direction
+                move_start = True
+
+            elif pos - s_pos + 1 >= 3:
+                if last is not None:
+                    end_high, end_low = self._end_hl[-1]
+                    start_price = end_high if last['direction'] == 'up' else end_low
+                price_diff = abs(current_price - start_price) * scale
                 legs.append({
-                    'start': start_index,
+                    'start': s_time,
                     'start_value': start_price,
-                    'end': data.index[i],
+                    'end': time,
                     'end_value': current_price,
                     'length': price_diff,
                     'direction': direction,
-                            })
-                
-                j += 1
-                
-                start_index = data.index[i]
-            
-        elif j>0 and legs[j-1]['direction'] == 'up' and data['high'].iloc[i] >= data['high'].loc[start_index] and price_diff < threshold:
-            
-            if j > 1 :
-                price_diff = custom_price_diff(data=data, j=j, current_price=current_price, legs=legs)
-                
-            else:
-                price_diff += legs[j-1]['length']
-            
-            
-            start_index = data.index[i]
-            legs[j-1]['end'] = data.index[i]
-            legs[j-1]['end_value'] = current_price
-            legs[j-1]['length'] = price_diff
-            legs[j-1]['direction'] = direction
-            
-        elif j>0 and legs[j-1]['direction'] == 'down' and data['low'].iloc[i] <= data['low'].loc[start_index] and price_diff < threshold:
-            
-            if j > 1 :
-                price_diff = custom_price_diff(data=data, j=j, current_price=current_price, legs=legs)
-                
-            else:
-                price_diff += legs[j-1]['length']
-            
-            
-            start_index = data.index[i]
-            legs[j-1]['end'] = data.index[i]
-            legs[j-1]['end_value'] = current_price
-            legs[j-1]['length'] = price_diff
-            
-        
-        last_start_price = start_price
-        i += 1
-    
-    return legs
+                    'start_pos': s_pos,
+                    'end_pos': pos,
+                })
+                self._end_hl.append((high, low))
+                move_start = True
+
+        elif last is not None and last['direction'] == 'up' and high >= s_high and price_diff < threshold:
+
+            price_diff = self._pullback_length(current_price, price_diff)
+            self._extend(last, pos, time, current_price, price_diff, high, low)
+            last['direction'] = self._direction
+            move_start = True
+
+        elif last is not None and last['direction'] == 'down' and low <= s_low and price_diff < threshold:
+
+            price_diff = self._pullback_length(current_price, price_diff)
+            self._extend(last, pos, time, current_price, price_diff, high, low)
+            move_start = True
+
+        if move_start:
+            self._start = (pos, time, open_, high, low, close)
+        self._prev_hl = (high, low)
+
+    def _extend(self, leg, pos, time, current_price, length, high, low):
+        leg['end'] = time
+        leg['end_pos'] = pos
+        leg['end_value'] = current_price
+        leg['length'] = length
+        self._end_hl[-1] = (high, low)
+
+    def _pullback_length(self, current_price, price_diff):
+        """Length of the last leg after a pullback continuation (measured from the high/low two legs back)."""
+        if len(self.legs) > 1:
+            prev_high, prev_low = self._end_hl[-2]
+            ref = prev_high if self.legs[-2]['direction'] == 'up' else prev_low
+            return abs(current_price - ref) * self.price_scale
+        return price_diff + self.legs[-1]['length']
+
+    # ---------- Checkpoint (for replace_last) ----------
+    def _save(self):
+        last = dict(self.legs[-1]) if self.legs else None
+        last_hl = self._end_hl[-1] if self._end_hl else None
+        return (len(self.legs), last, last_hl, self.bar_count, self.last_time,
+                self._start, self._prev_hl, self._direction)
+
+    def _restore(self, cp):
+        n_legs, last, last_hl, self.bar_count, self.last_time, self._start, self._prev_hl, self._direction = cp
+        del self.legs[n_legs:]
+        del self._end_hl[n_legs:]
+        if last is not None:
+            self.legs[-1].clear()
+            self.legs[-1].update(last)
+            self._end_hl[-1] = last_hl
+
+    def _trim(self):
+        # Only the last two legs feed the state machine; drop old ones in batches
+        if self.max_legs and len(self.legs) > 2 * self.max_legs:
+            cut = len(self.legs) - self.max_legs
+            del self.legs[:cut]
+            del self._end_hl[:cut]
 
 
-def custom_price_diff(data, j, current_price=0, legs=[]):
-    
-    timestamp_value = legs[j-2]['end']
-    row = data.loc[timestamp_value]
-    
-    if legs[j-2]['direction'] == 'up':
-        price_diff = abs(current_price - row['high']) * 10000
-        return price_diff
-    else:
-        price_diff = abs(current_price - row['low']) * 10000
-        return price_diff
+def _bar_fields(bar):
+    """(time, open, high, low, close) from a Series row, a dict or a namedtuple."""
+    if hasattr(bar, 'index') and hasattr(bar, 'name') and not isinstance(bar, tuple):
+        # pandas Series row: the timestamp is the row label
+        time = bar.name
+        return time, float(bar['open']), float(bar['high']), float(bar['low']), float(bar['close'])
+    if isinstance(bar, dict):
+        time = bar.get('time', bar.get('timestamp'))
+        return time, float(bar['open']), float(bar['high']), float(bar['low']), float(bar['close'])
+    time = getattr(bar, 'Index', None)
+    if time is None:
+        time = getattr(bar, 'time', None)
+    return time, float(bar.open), float(bar.high), float(bar.low), float(bar.close)
@@ -49,6 +49,8 @@ class TestCloseAllPositions(unittest.TestCase):
         mock_mt5.ORDER_TYPE_BUY = mt5.ORDER_TYPE_BUY
         mock_mt5.ORDER_TIME_GTC = mt5.ORDER_TIME_GTC
         mock_mt5.ORDER_FILLING_IOC = mt5.ORDER_FILLING_IOC
+        mock_mt5.POSITION_TYPE_BUY = mt5.POSITION_TYPE_BUY
+        mock_mt5.order_send.return_value = MagicMock(retcode=10009)  # closes are checked (and retried) now
         
         # Execute
         self.connector.close_all_positions()
@@ -95,6 +97,8 @@ class TestCloseAllPositions(unittest.TestCase):
         mock_mt5.ORDER_TYPE_BUY = mt5.ORDER_TYPE_BUY
         mock_mt5.ORDER_TIME_GTC = mt5.ORDER_TIME_GTC
         mock_mt5.ORDER_FILLING_IOC = mt5.ORDER_FILLING_IOC
+        mock_mt5.POSITION_TYPE_BUY = mt5.POSITION_TYPE_BUY
+        mock_mt5.order_send.return_value = MagicMock(retcode=10009)  # closes are checked (and retried) now
         
         # Execute
         self.connector.close_all_positions()
@@ -147,13 +151,15 @@ class TestCloseAllPositions(unittest.TestCase):
         mock_mt5.ORDER_TYPE_BUY = mt5.ORDER_TYPE_BUY
         mock_mt5.ORDER_TIME_GTC = mt5.ORDER_TIME_GTC
         mock_mt5.ORDER_FILLING_IOC = mt5.ORDER_FILLING_IOC
+        mock_mt5.POSITION_TYPE_BUY = mt5.POSITION_TYPE_BUY
+        mock_mt5.order_send.return_value = MagicMock(retcode=10009)  # closes are checked (and retried) now
         
         # Execute
         self.connector.close_all_positions()
         
         # Verify
         mock_mt5.positions_get.assert_called_once_with(symbol=self.connector.symbol)
-        self.assertEqual(mock_mt5.symbol_info_tick.call_count, 2)
+        self.assertEqual(mock_mt5.symbol_info_tick.call_count, 1)  # one price snapshot per symbol
         self.assertEqual(mock_mt5.order_send.call_count, 2)
         
         # Get all order_send calls
@@ -177,5 +183,21 @@ class TestCloseAllPositions(unittest.TestCase):
         self.assertEqual(sell_close_request["type"], mock_mt5.ORDER_TYPE_BUY)
         self.assertEqual(sell_close_request["price"], mock_tick.ask)
 
+    @patch('mt5_connector.mt5')
+    def test_close_all_positions_retries_requote_with_fresh_price(self, mock_mt5):
+        """A requoted close is sent again at the refreshed price and reported per ticket"""
+        position = MagicMock(type=1, volume=0.1, ticket=555)
+        mock_mt5.positions_get.return_value = [position]
+        mock_mt5.symbol_info_tick.side_effect = [MagicMock(bid=1.1, ask=1.2), MagicMock(bid=1.3, ask=1.4)]
+        mock_mt5.order_send.side_effect = [MagicMock(retcode=10004), MagicMock(retcode=10009, price=1.4)]
+        mock_mt5.POSITION_TYPE_BUY = mt5.POSITION_TYPE_BUY
+
+        report = self.connector.close_all_positions()
+
+        prices = [call[0][0]["price"] for call in mock_mt5.order_send.call_args_list]
+        self.assertEqual(prices, [1.2, 1.4])
+        self.assertTrue(report[555].ok)
+        self.assertEqual(report[555].attempts, 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,17 +1,21 @@
 import MetaTrader5 as mt5
 from datetime import datetime
-from fibo_calculate import fibonacci_retracement
 import numpy as np
 import pandas as pd
 from time import sleep
 from colorama import init, Fore
-from get_legs import get_legs
 from mt5_connector import MT5Connector
-from swing import get_swing_points
-from utils import BotState
+from strategy import plan_stops
+from scheduler import StrategyScheduler
+from sharding import ShardedScheduler
+from risk_ladder import StageLadder
+from position_store import PositionStore
+from connection_watchdog import CONNECTED
+from account_state import AUTOTRADING_ON, AUTOTRADING_OFF, BALANCE_BELOW_MIN, BALANCE_ABOVE_MIN
 from save_file import log
-from metatrader5_config import MT5_CONFIG, TRADING_CONFIG, DYNAMIC_RISK_CONFIG
-from email_notifier import send_trade_email_async
+from metatrader5_config import MT5_CONFIG, TRADING_CONFIG, DYNAMIC_RISK_CONFIG, MARKET_LOG_CONFIG
+from side_effects import effects, email_effects, email_new_order, email_order_result, HIGH, NORMAL, LOW, BLOCK
+from analytics import latency
 from analytics.hooks import log_signal, log_position_event
 
 
@@ -24,36 +28,29 @@ def main():
         print("❌ Failed to connect to MT5")
         return
 
-    # Initial state با تنظیمات - مطابق main_saver_copy2.py
-    state = BotState()
-    state.reset()
-
-    start_index = 0
     win_ratio = MT5_CONFIG['win_ratio']
     threshold = TRADING_CONFIG['threshold']
     window_size = TRADING_CONFIG['window_size']
     min_swing_size = TRADING_CONFIG['min_swing_size']
 
+    # همه نمادها روی یک اتصال MT5؛ هر نماد strategy و بافر کندل خودش را دارد
+    symbols = MT5_CONFIG.get('symbols') or [MT5_CONFIG['symbol']]
+
     i = 1
-    f = 1
     position_open = False
-    last_swing_type = None
-    fib_index = None
-    fib0_point = None
-    last_leg1_value = None
-    end_price = None
-    start_price = None
 
     print(f"🚀 MT5 Trading Bot Started...")
-    print(f"📊 Config: Symbol={MT5_CONFIG['symbol']}, Lot={MT5_CONFIG['lot_size']}, Win Ratio={win_ratio}")
+    print(f"📊 Config: Symbols={','.join(symbols)}, Lot={MT5_CONFIG['lot_size']}, Win Ratio={win_ratio}")
     print(f"⏰ Trading Hours (Iran): {MT5_CONFIG['trading_hours']['start']} - {MT5_CONFIG['trading_hours']['end']}")
     print(f"🇮🇷 Current Iran Time: {mt5_conn.get_iran_time().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # در ابتدای main loop بعد از initialize
     print("🔍 Checking symbol properties...")
-    mt5_conn.check_symbol_properties()
+    for symbol in symbols:
+        mt5_conn.check_symbol_properties(symbol)
     print("🔍 Testing broker filling modes...")
-    mt5_conn.test_filling_modes()
+    for symbol in symbols:
+        mt5_conn.test_filling_modes(symbol)
     mt5_conn.check_trading_limits()
     print("🔍 Checking account permissions...")
     mt5_conn.check_account_trading_permissions()
@@ -61,641 +58,397 @@ def main():
     mt5_conn.check_market_state()
     print("-" * 50)
 
-    # اضافه کردن متغیر برای ذخیره آخرین داده
-    last_data_time = None
-    wait_count = 0
-    max_wait_cycles = 120  # پس از 60 ثانیه (120 * 0.5) اجبار به پردازش
-
-    # بعد از تعریف متغیرها در main()
-    def reset_state_and_window():
-        nonlocal start_index
-        state.reset()
-        start_index = max(0, len(cache_data) - window_size)
-        log(f'Reset state -> new start_index={start_index} (slice len={len(cache_data.iloc[start_index:])})', color='magenta')
+    # اعلان تغییر AutoTrading یا عبور موجودی از min_balance (از cache وضعیت حساب)
+    account_messages = {
+        AUTOTRADING_ON: ("▶️ Terminal AutoTrading enabled", 'green'),
+        AUTOTRADING_OFF: ("⏸️ Terminal AutoTrading disabled", 'red'),
+        BALANCE_BELOW_MIN: ("❌ Balance {balance} fell below min {min_balance}", 'red'),
+        BALANCE_ABOVE_MIN: ("✅ Balance {balance} is back above min {min_balance}", 'green'),
+    }
+
+    def on_account_change(event, old, new):
+        text, color = account_messages[event]
+        log(text.format(balance=new.balance, min_balance=mt5_conn.min_balance), color=color)
+
+    mt5_conn.account.subscribe(on_account_change)
+
+    # منطق swing/fib (state، legها و پنجره) داخل strategy است؛ این حلقه فقط کندل می‌دهد و سیگنال اجرا می‌کند
+    # پس از 60 ثانیه (120 * 0.5) بدون کندل جدید، پردازش اجباری
+    workers = MT5_CONFIG.get('strategy_workers', 0)
+    collect_timeout = MT5_CONFIG.get('strategy_collect_timeout', 2.0)
+    poll_ticks = MARKET_LOG_CONFIG.get('poll_ticks', True)
+    if workers and len(symbols) > 1:
+        # استراتژی هر گروه از نمادها در یک پروسه جدا؛ اتصال MT5 و اجرای سفارش فقط در همین پروسه
+        scheduler = ShardedScheduler(mt5_conn, symbols, workers=workers, threshold=threshold,
+                                     window_size=window_size, max_wait_cycles=120, log=log)
+    else:
+        scheduler = StrategyScheduler(mt5_conn, symbols, threshold=threshold, window_size=window_size,
+                                      max_wait_cycles=120, log=log)
 
     # حالت‌های مدیریت پوزیشن
-    position_states = {}  # ticket -> {'entry':..., 'risk':..., 'direction':..., 'done_stages':set(), 'base_tp_R':float, 'commission_locked':False}
+    position_states = {}  # ticket -> {'entry':..., 'risk':..., 'direction':..., 'ladder':StageLadder, 'base_tp_R':float, 'commission_locked':False}
+
+    def _digits(symbol=None):
+        spec = mt5_conn.spec(symbol)
+        return spec.digits if spec else 5
+
+    def _round(p, symbol=None):
+        return float(f"{p:.{_digits(symbol)}f}")
+
+    def _position_state(symbol, direction, entry, risk, volume, done_stages=()):
+        # قیمت‌های trigger و SL/TP هر مرحله یک بار محاسبه و مرتب می‌شوند
+        ladder = StageLadder.build(
+            direction, entry, risk, volume,
+            DYNAMIC_RISK_CONFIG.get('stages', []),
+            commission_per_lot=DYNAMIC_RISK_CONFIG.get('commission_per_lot', 0.0),
+            round_price=lambda p: _round(p, symbol),
+        )
+        ladder.mark_done(done_stages)
+        return {
+            'entry': entry,
+            'risk': risk,
+            'direction': direction,
+            'ladder': ladder,
+            'base_tp_R': DYNAMIC_RISK_CONFIG.get('base_tp_R', 1.2),
+            'commission_locked': False
+        }
 
-    def _digits():
-        info = mt5.symbol_info(MT5_CONFIG['symbol'])
-        return info.digits if info else 5
+    def _restore_position(rec, pos):
+        # risk از snapshot می‌آید چون SL فعلی پوزیشن ممکن است جابه‌جا شده باشد
+        return _position_state(pos.symbol, rec['direction'], rec['entry'], rec['risk'], pos.volume, rec.get('done_stages', ()))
 
-    def _round(p):
-        return float(f"{p:.{_digits()}f}")
+    def save_position_states():
+        if position_store is None:
+            return
+        try:
+            position_store.save(position_states)
+        except Exception as e:
+            log(f'position snapshot write failed: {e}', color='red')
+
+    # بازیابی وضعیت پوزیشن‌های باز از snapshot قبلی (بدون تکرار modify مراحل انجام‌شده)
+    state_file = DYNAMIC_RISK_CONFIG.get('state_file')
+    position_store = PositionStore(state_file) if state_file else None
+    if position_store is not None:
+        open_positions = mt5_conn.get_positions_for(symbols)
+        if open_positions is not None:
+            position_states.update(position_store.reconcile(open_positions, _restore_position))
+            save_position_states()
+            log(f'Restored {len(position_states)} position state(s) from {state_file}', color='cyan')
 
     def register_position(pos):
         # محاسبه R (ریسک اولیه)
         risk = abs(pos.price_open - pos.sl) if pos.sl else None
         if not risk or risk == 0:
             return
-        position_states[pos.ticket] = {
-            'entry': pos.price_open,
-            'risk': risk,
-            'direction': 'buy' if pos.type == mt5.POSITION_TYPE_BUY else 'sell',
-            'done_stages': set(),
-            'base_tp_R': DYNAMIC_RISK_CONFIG.get('base_tp_R', 1.2),
-            'commission_locked': False
-        }
+        direction = 'buy' if pos.type == mt5.POSITION_TYPE_BUY else 'sell'
+        position_states[pos.ticket] = _position_state(pos.symbol, direction, pos.price_open, risk, pos.volume)
+        save_position_states()
         # رویداد ثبت پوزیشن
-        try:
-            log_position_event(
-                symbol=MT5_CONFIG['symbol'],
-                ticket=pos.ticket,
-                event='open',
-                direction=position_states[pos.ticket]['direction'],
-                entry=pos.price_open,
-                current_price=pos.price_open,
-                sl=pos.sl,
-                tp=pos.tp,
-                profit_R=0.0,
-                stage=0,
-                risk_abs=risk,
-                locked_R=None,
-                volume=pos.volume,
-                note='position registered'
-            )
-        except Exception:
-            pass
-
-    def manage_open_positions():
+        effects.submit(
+            log_position_event,
+            symbol=pos.symbol,
+            ticket=pos.ticket,
+            event='open',
+            direction=position_states[pos.ticket]['direction'],
+            entry=pos.price_open,
+            current_price=pos.price_open,
+            sl=pos.sl,
+            tp=pos.tp,
+            profit_R=0.0,
+            stage=0,
+            risk_abs=risk,
+            locked_R=None,
+            volume=pos.volume,
+            note='position registered',
+            priority=HIGH, policy=BLOCK,
+        )
+
+    def manage_open_positions(ticks):
         if not DYNAMIC_RISK_CONFIG.get('enable'):
             return
-        positions = mt5_conn.get_positions()
+        positions = mt5_conn.get_positions_for(symbols)
+        if positions is not None:
+            # حذف تیکت‌های بسته‌شده
+            open_tickets = {p.ticket for p in positions}
+            closed = [t for t in position_states if t not in open_tickets]
+            for t in closed:
+                del position_states[t]
+            if closed:
+                save_position_states()
+                mt5_conn.account.invalidate()  # بسته شدن با SL/TP موجودی را عوض کرده است
         if not positions:
             return
-        tick = mt5.symbol_info_tick(MT5_CONFIG['symbol'])
-        if not tick:
-            return
-        stages_cfg = DYNAMIC_RISK_CONFIG.get('stages', [])
-        commission_per_lot = DYNAMIC_RISK_CONFIG.get('commission_per_lot', 0.0)
+        # یک tick برای هر نماد در هر دور (ticks از poll همین دور، اگر فعال باشد)
         for pos in positions:
+            if pos.symbol not in ticks:
+                ticks[pos.symbol] = mt5_conn.tick(pos.symbol)
+            tick = ticks[pos.symbol]
+            if not tick:
+                continue
             if pos.ticket not in position_states:
                 register_position(pos)
             st = position_states.get(pos.ticket)
             if not st:
                 continue
-            entry = st['entry']
-            risk = st['risk']
+            ladder = st['ladder']
             direction = st['direction']
             cur_price = tick.bid if direction == 'buy' else tick.ask
-            # profit in price
-            if direction == 'buy':
-                price_profit = cur_price - entry
+            # در حالت عادی فقط یک مقایسه با trigger بعدی
+            crossed = ladder.crossed(cur_price)
+            if not crossed:
+                continue
+            # چند مرحله در یک جهش قیمت -> یک درخواست modify با بهترین SL
+            rung = ladder.collapse(crossed, pos.sl)
+            if rung is None:
+                continue
+            new_sl_r = rung.sl
+            new_tp_r = rung.tp if rung.tp is not None else pos.tp
+            res = mt5_conn.modify_sl_tp(pos.ticket, new_sl=new_sl_r, new_tp=new_tp_r, symbol=pos.symbol)
+            if res and getattr(res, 'retcode', None) == 10009:
+                ladder.advance(len(crossed))
+                save_position_states()
+                stage_ids = '+'.join(r.stage_id for r in crossed)
+                log(f'⚙️ Stage {stage_ids} applied ticket={pos.ticket} SL->{new_sl_r} TP->{new_tp_r}', color='cyan')
+                effects.submit(
+                    log_position_event,
+                    symbol=pos.symbol,
+                    ticket=pos.ticket,
+                    event=rung.stage_id,
+                    direction=direction,
+                    entry=st['entry'],
+                    current_price=cur_price,
+                    sl=new_sl_r,
+                    tp=new_tp_r,
+                    profit_R=ladder.profit_R(cur_price),
+                    stage=None,
+                    risk_abs=st['risk'],
+                    locked_R=rung.locked_R,
+                    volume=pos.volume,
+                    note=f'stage {stage_ids} trigger',
+                    priority=HIGH, policy=BLOCK,
+                )
+
+    def execute_signal(symbol, signal, bar_time):
+        # بخش معاملات - buy statement (مطابق منطق main_saver_copy2.py)
+        if signal.direction == 'buy':
+            last_tick = mt5_conn.tick(symbol)
+            buy_entry_price = last_tick.ask
+            fib_levels = signal.fib_levels
+            pip_size = _pip_size_for(mt5_conn.spec(symbol))
+            # لاگ سیگنال (قبل از ارسال سفارش): فقط یک رکورد صف می‌شود، CSV در پس‌زمینه
+            effects.submit(
+                log_signal,
+                symbol=symbol,
+                strategy="swing_fib_v1",
+                direction="buy",
+                rr=win_ratio,
+                entry=buy_entry_price,
+                sl=float(fib_levels['1.0'] if abs(fib_levels['0.9']-buy_entry_price) <= pip_size*2 else fib_levels['0.9']),
+                tp=None,
+                fib=fib_levels,
+                confidence=None,
+                features_json=None,
+                note="triggered_by_pullback",
+                priority=LOW,
+            )
+            # دریافت قیمت لحظه‌ای بازار از MT5
+            log(f'Start long position income {bar_time}', color='blue')
+            log(f'current_open_point (market ask): {buy_entry_price}', color='blue')
+
+            # حداقل 2 پیپ واقعی یا فاصله مجاز بروکر؛ گارد جهت و برگشت به 1.0 داخل plan_stops
+            stops = plan_stops('buy', buy_entry_price, fib_levels, pip_size,
+                               _min_stop_distance(mt5_conn.spec(symbol)), win_ratio)
+            if stops is None:
+                # state و پنجره هنگام صدور سیگنال ریست شده‌اند
+                log("🚫 Skip BUY: invalid SL distance", color='red')
+                return
+            stop, reward_end = stops
+            log(f'stop = {stop}', color='green')
+            log(f'reward_end = {reward_end}', color='green')
+
+            # ارسال سفارش BUY با هر stop و reward
+            result = mt5_conn.open_buy_position(
+                tick=last_tick,
+                sl=stop,
+                tp=reward_end,
+                comment=f"Bullish Swing {signal.swing_type}",
+                risk_pct=0.01,  # مثلا 1% ریسک
+                symbol=symbol
+            )
+            # ارسال ایمیل غیرمسدودکننده
+            email_effects.submit(email_new_order, symbol, 'BUY', 'Bullish', buy_entry_price, stop, reward_end,
+                                 datetime.now(), priority=NORMAL)
+
+            if result and getattr(result, 'retcode', None) == 10009:
+                log(f'✅ BUY order executed successfully', color='green')
+                log(f'📊 Ticket={result.order} Price={result.price} Volume={result.volume}', color='cyan')
+                # ارسال ایمیل غیرمسدودکننده
+                email_effects.submit(email_order_result, result.order, result.price, result.volume, priority=NORMAL)
             else:
-                price_profit = entry - cur_price
-            profit_R = price_profit / risk if risk else 0.0
-            modified_any = False
-
-            # محاسبه ارزش پولی 1R تقریبی (بدون اسپرد) برای تبدیل کامیشن به R:
-            # risk_abs_price = risk (فاصله قیمتی) * volume * contract ارزش واقعی - ساده‌سازی: فقط نسبت بر اساس فاصله قیمتی.
-            # برای دقت بیشتر باید tick_value استفاده شود؛ اینجا ساده نگه می‌داریم.
-            # کمیسیون بر اساس حجم پوزیشن جاری:
-            commission_total = commission_per_lot * pos.volume if commission_per_lot else 0.0
-
-            # عبور از مراحل
-            for stage_cfg in stages_cfg:
-                sid = stage_cfg.get('id')
-                if sid in st['done_stages']:
-                    continue
-                new_sl = None
-                new_tp = None
-                event_name = None
-                locked_R = None
-
-                # Stage type commission
-                if stage_cfg.get('type') == 'commission' and commission_total > 0:
-                    # نیاز به تخمین سود دلاری جاری: تقریباً profit_R * (risk_value)؛ اینجا ساده: اگر profit_R * risk >= commission_value/point_value => پیچیده.
-                    # راه ساده: وقتی profit_R * 1R_cash >= commission_total.
-                    # ما 1R_cash را تخمینی با (risk * مخصوص ارزش هر پوینت * حجم) باید داشته باشیم؛ چون نداریم، این مرحله را موقتاً بر اساس profit_R >= commission_total / (risk * 100000) (تقریبی) نمی‌کنیم.
-                    # ساده‌تر: اگر سود قیمتی * حجم >= کمیسیون (بسیار ساده و تقریبی)
-                    if price_profit * pos.volume >= commission_total:
-                        # قفل کردن SL روی نقطه ورود + (commission_locked نقطه‌ای)؟ طبق تعریف: «SL روی نقطه پوشش کمیسیون» = entry + offset معادل سود کمیسیون.
-                        # offset تقریبی: کمیسیون / (volume)
-                        price_offset = commission_total / pos.volume if pos.volume else 0.0
-                        if direction == 'buy':
-                            new_sl = entry + price_offset
-                        else:
-                            new_sl = entry - price_offset
-                        new_tp = pos.tp  # بدون تغییر
-                        event_name = 'commission_cover'
-                        locked_R = None
+                if result:
+                    log(f'❌ BUY failed retcode={result.retcode} comment={result.comment}', color='red')
                 else:
-                    # R-based stage
-                    trigger_R = stage_cfg.get('trigger_R')
-                    if trigger_R is not None and profit_R >= trigger_R:
-                        sl_lock_R = stage_cfg.get('sl_lock_R', trigger_R)
-                        tp_R = stage_cfg.get('tp_R')
-                        # SL placement
-                        if direction == 'buy':
-                            new_sl = entry + sl_lock_R * risk
-                            if tp_R:
-                                new_tp = entry + tp_R * risk
-                        else:
-                            new_sl = entry - sl_lock_R * risk
-                            if tp_R:
-                                new_tp = entry - tp_R * risk
-                        event_name = sid
-                        locked_R = sl_lock_R
-
-                if new_sl is not None:
-                    # Round
-                    new_sl_r = _round(new_sl)
-                    new_tp_r = _round(new_tp) if new_tp is not None else pos.tp
-                    # Apply only if improves
-                    apply = False
-                    if direction == 'buy' and new_sl_r > pos.sl:
-                        apply = True
-                    if direction == 'sell' and new_sl_r < pos.sl:
-                        apply = True
-                    if apply:
-                        res = mt5_conn.modify_sl_tp(pos.ticket, new_sl=new_sl_r, new_tp=new_tp_r)
-                        if res and getattr(res, 'retcode', None) == 10009:
-                            st['done_stages'].add(sid)
-                            modified_any = True
-                            log(f'⚙️ Stage {sid} applied ticket={pos.ticket} SL->{new_sl_r} TP->{new_tp_r}', color='cyan')
-                            try:
-                                log_position_event(
-                                    symbol=MT5_CONFIG['symbol'],
-                                    ticket=pos.ticket,
-                                    event=event_name or sid,
-                                    direction=direction,
-                                    entry=entry,
-                                    current_price=cur_price,
-                                    sl=new_sl_r,
-                                    tp=new_tp_r,
-                                    profit_R=profit_R,
-                                    stage=None,
-                                    risk_abs=risk,
-                                    locked_R=locked_R,
-                                    volume=pos.volume,
-                                    note=f'stage {sid} trigger'
-                                )
-                            except Exception:
-                                pass
-            if modified_any:
-                position_states[pos.ticket] = st
+                    log(f'❌ BUY failed (no result object)', color='red')
+
+        # بخش معاملات - sell statement (مطابق منطق main_saver_copy2.py)
+        if signal.direction == 'sell':
+            last_tick = mt5_conn.tick(symbol)
+            sell_entry_price = last_tick.bid
+            fib_levels = signal.fib_levels
+            pip_size = _pip_size_for(mt5_conn.spec(symbol))
+            # لاگ سیگنال: فقط یک رکورد صف می‌شود، CSV در پس‌زمینه
+            effects.submit(
+                log_signal,
+                symbol=symbol,
+                strategy="swing_fib_v1",
+                direction="sell",
+                rr=win_ratio,
+                entry=sell_entry_price,
+                sl=float(fib_levels['1.0'] if abs(fib_levels['0.9']-sell_entry_price) <= pip_size*2 else fib_levels['0.9']),
+                tp=None,
+                fib=fib_levels,
+                confidence=None,
+                features_json=None,
+                note="triggered_by_pullback",
+                priority=LOW,
+            )
+            log(f'Start short position income {bar_time}', color='red')
+            log(f'current_open_point (market bid): {sell_entry_price}', color='red')
+
+            stops = plan_stops('sell', sell_entry_price, fib_levels, pip_size,
+                               _min_stop_distance(mt5_conn.spec(symbol)), win_ratio)
+            if stops is None:
+                log("🚫 Skip SELL: SL still <= entry after adjust", color='red')
+                return
+            stop, reward_end = stops
+            log(f'stop = {stop}', color='red')
+            log(f'reward_end = {reward_end}', color='red')
+
+            # ارسال سفارش SELL با هر stop و reward
+            result = mt5_conn.open_sell_position(
+                tick=last_tick,
+                sl=stop,
+                tp=reward_end,
+                comment=f"Bearish Swing {signal.swing_type}",
+                risk_pct=0.01,  # مثلا 1% ریسک
+                symbol=symbol
+            )
+
+            # ارسال ایمیل غیرمسدودکننده
+            email_effects.submit(email_new_order, symbol, 'SELL', 'Bearish', sell_entry_price, stop, reward_end,
+                                 datetime.now(), priority=NORMAL)
+
+            if result and getattr(result, 'retcode', None) == 10009:
+                log(f'✅ SELL order executed successfully', color='green')
+                log(f'📊 Ticket={result.order} Price={result.price} Volume={result.volume}', color='cyan')
+                # ارسال ایمیل غیرمسدودکننده
+                email_effects.submit(email_order_result, result.order, result.price, result.volume, priority=NORMAL)
+            else:
+                if result:
+                    log(f'❌ SELL failed retcode={result.retcode} comment={result.comment}', color='red')
+                else:
+                    log(f'❌ SELL failed (no result object)', color='red')
+
+    watchdog = mt5_conn.watchdog
+
+    def failure_pause():
+        # با اتصال سالم مثل قبل 5 ثانیه؛ وقتی اتصال مشکوک است زود برمی‌گردیم تا watchdog دوباره وصل کند
+        return 5 if watchdog.state == CONNECTED else 1
 
     while True:
         try:
+            # اتصال قطع است: تا initialize دوباره (با backoff و jitter) کاری انجام نمی‌شود
+            if not watchdog.ensure_connected():
+                sleep(min(max(watchdog.retry_in(), 0.5), 5))
+                continue
+
             # بررسی ساعات معاملاتی
             can_trade, trade_message = mt5_conn.can_trade()
             
             if not can_trade:
-                log(f"⏰ {trade_message}", color='yellow', save_to_file=False)
-                sleep(60)
+                log(lambda: f"⏰ {trade_message}", color='yellow', save_to_file=False)
+                sleep(60 if watchdog.state == CONNECTED else failure_pause())
                 continue
-            
-            # دریافت داده از MT5
-            cache_data = mt5_conn.get_historical_data(count=window_size * 2)
-            
-            if cache_data is None:
+            # موجودی/مشخصات نماد برای حجم‌دهی، قبل از این‌که سیگنالی برسد
+            mt5_conn.refresh_sizing(symbols)
+
+            # دریافت داده از MT5 برای همه نمادها: فقط کندل‌های جدید به تاریخچه درون‌حافظه‌ای اضافه می‌شوند
+            events = scheduler.poll()
+            if events is None:
                 log("❌ Failed to get data from MT5", color='red')
-                sleep(5)
+                watchdog.report_failure()
+                sleep(failure_pause())
                 continue
-                
-            cache_data['status'] = np.where(cache_data['open'] > cache_data['close'], 'bearish', 'bullish')
-            
-            # بررسی تغییر داده - مشابه main_saver_copy2.py
-            current_time = cache_data.index[-1]
-            if last_data_time is None:
-                log(f"🔄 First run - processing data from {current_time}", color='cyan')
-                last_data_time = current_time
-                process_data = True
-                wait_count = 0
-            elif current_time != last_data_time:
-                log(f"📊 New data received: {current_time} (previous: {last_data_time})", color='cyan')
-                last_data_time = current_time
-                process_data = True
-                wait_count = 0
-            else:
-                wait_count += 1
-                if wait_count % 20 == 0:  # هر 10 ثانیه یک بار لاگ
-                    log(f"⏳ Waiting for new data... Current: {current_time} (wait cycles: {wait_count})", color='yellow')
-                
-                # اگر خیلی زیاد انتظار کشیدیم، اجبار به پردازش (در صورت تست)
-                if wait_count >= max_wait_cycles:
-                    log(f"⚠️ Force processing after {wait_count} cycles without new data", color='magenta')
-                    process_data = True
-                    wait_count = 0
-                else:
-                    process_data = False
-            
-            if process_data:
-                log((' ' * 80 + '\n') * 3)
-                log(f'Log number {i}:', color='lightred_ex')
-                log(f' ' * 80)
+            watchdog.report_success()
+
+            for event in events:
+                # پیام‌ها lazy هستند: زیر log_level هیچ رشته‌ای ساخته نمی‌شود
+                log(lambda: f'Log number {i}: {event.symbol}', color='lightred_ex')
                 i += 1
-                
-                legs = get_legs(cache_data.iloc[start_index:])
-                log(f'First len legs: {len(legs)}', color='green')
-                log(f' ' * 80)
-
-                if len(legs) > 2:
-                    legs = legs[-3:]
-                    swing_type, is_swing = get_swing_points(data=cache_data, legs=legs)
-
-                    if is_swing == False and state.fib_levels is None:
-                        log(f'No swing or fib levels and legs>2', color='blue')
-                        log(f"{cache_data.loc[legs[0]['start']].name} {cache_data.loc[legs[0]['end']].name} "
-                            f"{cache_data.loc[legs[1]['start']].name} {cache_data.loc[legs[1]['end']].name} "
-                            f"{cache_data.loc[legs[2]['start']].name} {cache_data.loc[legs[2]['end']].name}", color='yellow')
-
-                    if is_swing or state.fib_levels:
-                        log(f'1- is_swing or fib_levels is not None code:411112', color='blue')
-                        log(f"{swing_type} | {cache_data.loc[legs[0]['start']].name} {cache_data.loc[legs[0]['end']].name} "
-                            f"{cache_data.loc[legs[1]['start']].name} {cache_data.loc[legs[1]['end']].name} "
-                            f"{cache_data.loc[legs[2]['start']].name} {cache_data.loc[legs[2]['end']].name}", color='yellow')
-
-                        log(f' ' * 80)
-                        
-                        # فاز 1: تشخیص اولیه swing
-                        if is_swing and state.fib_levels is None:
-                            log(f'is_swing and fib_levels is None code:4113312', color='yellow')
-                            last_swing_type = swing_type
-                            if swing_type == 'bullish':
-                                if cache_data.iloc[-1]['close'] >= legs[0]['end_value']:
-                                    # دقیقا مثل main_saver_copy2.py
-                                    start_price = cache_data.iloc[-1]['high']
-                                    end_price = legs[1]['end_value']
-                                    if cache_data.iloc[-1]['high'] >= legs[1]['end_value']:
-                                        log(f'The {f} of fib_levels value code:4116455 {cache_data.iloc[-1].name}', color='green')
-                                        state.fib_levels = fibonacci_retracement(end_price=end_price, start_price=start_price)
-                                        fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                        fib_index = cache_data.iloc[-1].name
-                                        last_leg1_value = cache_data.index.tolist().index(legs[1]['end'])
-                                        legs = legs[-2:]
-                                        f += 1
-                                    elif state.fib_levels and cache_data.iloc[-1]['low'] < state.fib_levels['1.0']:
-                                        reset_state_and_window()
-                                        legs = []
-                                    if state.fib_levels:
-                                        log(f'fib_levels: {state.fib_levels}', color='yellow')
-                                        log(f'fib_index: {fib_index}', color='yellow')
-                            elif swing_type == 'bearish':
-                                if cache_data.iloc[-1]['close'] <= legs[0]['end_value']:
-                                    start_price = cache_data.iloc[-1]['low']
-                                    end_price = legs[1]['end_value']
-                                    if cache_data.iloc[-1]['low'] <= legs[1]['end_value']:
-                                        log(f'The {f} of fib_levels value code:4126455 {cache_data.iloc[-1].name}', color='green')
-                                        state.fib_levels = fibonacci_retracement(start_price=start_price, end_price=end_price)
-                                        fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                        fib_index = cache_data.iloc[-1].name
-                                        last_leg1_value = cache_data.index.tolist().index(legs[1]['end'])
-                                        legs = legs[-2:]
-                                        f += 1
-                                    elif state.fib_levels and cache_data.iloc[-1]['high'] > state.fib_levels['1.0']:
-                                        reset_state_and_window()
-                                        legs = []
-                                    if state.fib_levels:
-                                        log(f'fib_levels: {state.fib_levels}', color='yellow')
-                                        log(f'fib_index: {fib_index}', color='yellow')
-
-                        # فاز 2: به‌روزرسانی در swing مشابه - تنها در صورت یکسان بودن جهت
-                        elif is_swing and state.fib_levels and last_swing_type == swing_type: 
-                            log(f'is_swing and state.fib_levels and last_swing_type == swing_type code:4213312', color='yellow')
-                            if swing_type == 'bullish': 
-                                if cache_data.iloc[-1]['high'] >= legs[1]['end_value']:
-                                    log(f'The {f} of fib_levels value update code:9916455 {cache_data.iloc[-1].name}', color='green')
-                                    start_price = cache_data.iloc[-1]['high']
-                                    end_price = legs[1]['end_value']
-                                    state.fib_levels = fibonacci_retracement(start_price=start_price, end_price=end_price)
-                                    fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                    fib_index = cache_data.iloc[-1].name
-                                    last_leg1_value = cache_data.index.tolist().index(legs[1]['end'])
-                                    legs = legs[-2:]
-                                    f += 1
-                                elif cache_data.iloc[-1]['low'] <= state.fib_levels['0.705']:
-                                    if state.last_touched_705_point_up is None:
-                                        log(f'first touch 705 point code:7318455', color='green')
-                                        state.last_touched_705_point_up = cache_data.iloc[-1]
-                                    elif cache_data.iloc[-1]['status'] != state.last_touched_705_point_up['status']:
-                                        log(f'Second touch 705 point code:7218455 {cache_data.iloc[-1].name}', color='green')
-                                        state.true_position = True      
-                                elif state.fib_levels and cache_data.iloc[-1]['low'] < state.fib_levels['1.0']:
-                                    reset_state_and_window()
-                                    legs = []
-                            elif swing_type == 'bearish':
-                                if cache_data.iloc[-1]['low'] <= legs[1]['end_value']:
-                                    log(f'The {f} of fib_levels value update code:9916455 {cache_data.iloc[-1].name}', color='green')
-                                    start_price = cache_data.iloc[-1]['low']
-                                    end_price = legs[1]['end_value']
-                                    state.fib_levels = fibonacci_retracement(start_price=start_price, end_price=end_price)
-                                    fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                    fib_index = cache_data.iloc[-1].name
-                                    last_leg1_value = cache_data.index.tolist().index(legs[1]['end'])
-                                    legs = legs[-2:]
-                                    f += 1
-                                elif cache_data.iloc[-1]['high'] >= state.fib_levels['0.705']:
-                                    if state.last_touched_705_point_down is None:
-                                        log(f'first touch 705 point code:6328455', color='red')
-                                        state.last_touched_705_point_down = cache_data.iloc[-1]
-                                    elif cache_data.iloc[-1]['status'] != state.last_touched_705_point_down['status']:
-                                        log(f'Second touch 705 point code:6228455 {cache_data.iloc[-1].name}', color='green')
-                                        state.true_position = True
-                                elif state.fib_levels and cache_data.iloc[-1]['high'] > state.fib_levels['1.0']:
-                                    reset_state_and_window()
-                                    legs = []
-
-                        last_swing_type = swing_type
-
-                elif len(legs) < 3:
-                    if state.fib_levels:
-                        if last_swing_type == 'bullish' or swing_type == 'bullish':
-                            if state.fib_levels['0.0'] < cache_data.iloc[-1]['high']:
-                                log(f'update fib_levels value code:5117455 {cache_data.iloc[-1].name}', color='green')
-                                start_price = cache_data.iloc[-1]['high']
-                                state.fib_levels = fibonacci_retracement(start_price=start_price, end_price=end_price)
-                                fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                fib_index = cache_data.iloc[-1].name
-                            elif cache_data.iloc[-1]['low'] <= state.fib_levels['0.705']:
-                                if state.last_touched_705_point_up is None:
-                                    log(f'first touch 705 point', color='green')
-                                    state.last_touched_705_point_up = cache_data.iloc[-1]
-                                elif cache_data.iloc[-1]['status'] != state.last_touched_705_point_up['status']:
-                                    log(f'Second touch 705 point code:4118455 {cache_data.iloc[-1].name}', color='green')
-                                    state.true_position = True                               
-                        if last_swing_type == 'bearish' or swing_type == 'bearish':
-                            if state.fib_levels['0.0'] > cache_data.iloc[-1]['low']:
-                                log(f'update fib_levels value code:5127455 {cache_data.iloc[-1].name}', color='green')
-                                start_price = cache_data.iloc[-1]['low']
-                                state.fib_levels = fibonacci_retracement(start_price=start_price, end_price=end_price)
-                                fib0_point = cache_data.index.tolist().index(cache_data.iloc[-1].name)
-                                fib_index = cache_data.iloc[-1].name
-                            elif cache_data.iloc[-1]['high'] >= state.fib_levels['0.705']:
-                                if state.last_touched_705_point_down is None:
-                                    log(f'first touch 705 point', color='red')
-                                    state.last_touched_705_point_down = cache_data.iloc[-1]
-                                elif cache_data.iloc[-1]['status'] != state.last_touched_705_point_down['status']:
-                                    log(f'Second touch 705 point code:5128455 {cache_data.iloc[-1].name}', color='green')
-                                    state.true_position = True
-                    if len(legs) == 2:
-                        log(f'leg0: {legs[0]["start"]}, {legs[0]["end"]}, leg1: {legs[1]["start"]}, {legs[1]["end"]}', color='lightcyan_ex')
-                    if len(legs) == 1:
-                        log(f'leg0: {legs[0]["start"]}, {legs[0]["end"]}', color='lightcyan_ex')
-                
-                # بخش معاملات - buy statement (مطابق منطق main_saver_copy2.py)
-                if state.true_position and (last_swing_type == 'bullish' or swing_type == 'bullish'):
-                    last_tick = mt5.symbol_info_tick(MT5_CONFIG['symbol'])
-                    buy_entry_price = last_tick.ask
-                    # لاگ سیگنال (قبل از ارسال سفارش)
-                    try:
-                        log_signal(
-                            symbol=MT5_CONFIG['symbol'],
-                            strategy="swing_fib_v1",
-                            direction="buy",
-                            rr=win_ratio,
-                            entry=buy_entry_price,
-                            sl=float(state.fib_levels['1.0'] if abs(state.fib_levels['0.9']-buy_entry_price) <= _pip_size_for(MT5_CONFIG['symbol'])*2 else state.fib_levels['0.9']),
-                            tp=None,
-                            fib=state.fib_levels,
-                            confidence=None,
-                            features_json=None,
-                            note="triggered_by_pullback"
-                        )
-                    except Exception:
-                        pass
-                    # دریافت قیمت لحظه‌ای بازار از MT5
-                    # current_open_point = cache_data.iloc[-1]['close']
-                    log(f'Start long position income {cache_data.iloc[-1].name}', color='blue')
-                    log(f'current_open_point (market ask): {buy_entry_price}', color='blue')
-
-                    pip_size = _pip_size_for(MT5_CONFIG['symbol'])
-                    two_pips = 2.0 * pip_size
-                    min_dist = _min_stop_distance(MT5_CONFIG['symbol'])
-
-                    # معیار درستِ 2 پیپ
-                    is_close_to_09 = abs(state.fib_levels['0.9'] - buy_entry_price) <= two_pips
-
-                    candidate_sl = state.fib_levels['1.0'] if is_close_to_09 else state.fib_levels['0.9']
-
-                    min_pip_dist = 2  # حداقل 2 پیپ واقعی
-                    pip_size = _pip_size_for(MT5_CONFIG['symbol'])
-                    min_abs_dist = max(min_pip_dist * pip_size, min_dist)
-
-                    # گارد جهت
-                    if candidate_sl >= buy_entry_price:
-                        # برگرداندن به 1.0 اگر 0.9 بالاتر بود
-                        candidate_sl = float(state.fib_levels['1.0'])
-                    # اطمینان از فاصله
-                    if (buy_entry_price - candidate_sl) < min_abs_dist:
-                        # اگر فاصله خیلی کم است، یا SL را جابه‌جا کن یا معامله را لغو کن
-                        adj = buy_entry_price - min_abs_dist
-                        if adj <= 0:
-                            log("🚫 Skip BUY: invalid SL distance", color='red')
-                            state.reset()
-                            reset_state_and_window()
-                            continue
-                        candidate_sl = float(adj)
-
-                    stop = float(candidate_sl)
-                    if stop >= buy_entry_price:
-                        log("🚫 Skip BUY: SL still >= entry after adjust", color='red')
-                        state.reset()
-                        reset_state_and_window()
-                        continue
-
-                    stop_distance = abs(buy_entry_price - stop)
-                    reward_end = buy_entry_price + (stop_distance * win_ratio)
-                    log(f'stop = {stop}', color='green')
-                    log(f'reward_end = {reward_end}', color='green')
-
-                    # ارسال سفارش BUY با هر stop و reward
-                    result = mt5_conn.open_buy_position(
-                        tick=last_tick,
-                        sl=stop,
-                        tp=reward_end,
-                        comment=f"Bullish Swing {swing_type}",
-                        risk_pct=0.01  # مثلا 1% ریسک
-                    )
-                    # ارسال ایمیل غیرمسدودکننده
-                    try:
-                        send_trade_email_async(
-                            subject=f"Ver2: NEW BUY ORDER {MT5_CONFIG['symbol']}",
-                            body=(
-                                f"Time: {datetime.now()}\n"
-                                f"Symbol: {MT5_CONFIG['symbol']}\n"
-                                f"Type: BUY (Bullish Swing)\n"
-                                f"Entry: {buy_entry_price}\n"
-                                f"SL: {stop}\n"
-                                f"TP: {reward_end}\n"
-                            )
-                        )
-                    except Exception as _e:
-                        log(f'Email dispatch failed: {_e}', color='red')
-
-                    if result and getattr(result, 'retcode', None) == 10009:
-                        log(f'✅ BUY order executed successfully', color='green')
-                        log(f'📊 Ticket={result.order} Price={result.price} Volume={result.volume}', color='cyan')
-                        # ارسال ایمیل غیرمسدودکننده
-                        try:
-                            send_trade_email_async(
-                                subject = f"Ver2: Last order result",
-                                body=(
-                                    f"Ticket={result.order}\n"
-                                    f"Price={result.price}\n"
-                                    f"Volume={result.volume}\n"
-                                )
-                            )
-                        except Exception as _e:
-                            log(f'Email dispatch failed: {_e}', color='red')
-                    else:
-                        if result:
-                            log(f'❌ BUY failed retcode={result.retcode} comment={result.comment}', color='red')
-                        else:
-                            log(f'❌ BUY failed (no result object)', color='red')
-                    state.reset()
-
-                    reset_state_and_window()
-                    legs = []
-
-                # بخش معاملات - sell statement (مطابق منطق main_saver_copy2.py)
-                if state.true_position and (last_swing_type == 'bearish' or swing_type == 'bearish'):
-                    last_tick = mt5.symbol_info_tick(MT5_CONFIG['symbol'])
-                    sell_entry_price = last_tick.bid
-                    try:
-                        log_signal(
-                            symbol=MT5_CONFIG['symbol'],
-                            strategy="swing_fib_v1",
-                            direction="sell",
-                            rr=win_ratio,
-                            entry=sell_entry_price,
-                            sl=float(state.fib_levels['1.0'] if abs(state.fib_levels['0.9']-sell_entry_price) <= _pip_size_for(MT5_CONFIG['symbol'])*2 else state.fib_levels['0.9']),
-                            tp=None,
-                            fib=state.fib_levels,
-                            confidence=None,
-                            features_json=None,
-                            note="triggered_by_pullback"
-                        )
-                    except Exception:
-                        pass
-                    log(f'Start short position income {cache_data.iloc[-1].name}', color='red')
-                    log(f'current_open_point (market bid): {sell_entry_price}', color='red')
-
-                    pip_size = _pip_size_for(MT5_CONFIG['symbol'])
-                    two_pips = 2.0 * pip_size
-                    min_dist = _min_stop_distance(MT5_CONFIG['symbol'])
-
-                    is_close_to_09 = abs(state.fib_levels['0.9'] - sell_entry_price) <= two_pips
-                    candidate_sl = state.fib_levels['1.0'] if is_close_to_09 else state.fib_levels['0.9']
-
-                    min_pip_dist = 2.0
-                    pip_size = _pip_size_for(MT5_CONFIG['symbol'])
-                    min_abs_dist = max(min_pip_dist * pip_size, min_dist)
-
-                    if candidate_sl <= sell_entry_price:
-                        candidate_sl = float(state.fib_levels['1.0'])
-                    if (candidate_sl - sell_entry_price) < min_abs_dist:
-                        adj = sell_entry_price + min_abs_dist
-                        candidate_sl = float(adj)
-
-                    stop = float(candidate_sl)
-                    if stop <= sell_entry_price:
-                        log("🚫 Skip SELL: SL still <= entry after adjust", color='red')
-                        state.reset()
-                        reset_state_and_window()
-                        continue
-
-                    stop_distance = abs(sell_entry_price - stop)
-                    reward_end = sell_entry_price - (stop_distance * win_ratio)
-                    log(f'stop = {stop}', color='red')
-                    log(f'reward_end = {reward_end}', color='red')
-
-                    # ارسال سفارش SELL با هر stop و reward
-                    result = mt5_conn.open_sell_position(
-                        tick=last_tick,
-                        sl=stop,
-                        tp=reward_end,
-                        comment=f"Bearish Swing {swing_type}",
-                        risk_pct=0.01  # مثلا 1% ریسک
-                    )
-                    
-                    # ارسال ایمیل غیرمسدودکننده
-                    try:
-                        send_trade_email_async(
-                            subject=f"Ver2: NEW SELL ORDER {MT5_CONFIG['symbol']}",
-                            body=(
-                                f"Time: {datetime.now()}\n"
-                                f"Symbol: {MT5_CONFIG['symbol']}\n"
-                                f"Type: SELL (Bearish Swing)\n"
-                                f"Entry: {sell_entry_price}\n"
-                                f"SL: {stop}\n"
-                                f"TP: {reward_end}\n"
-                            )
-                        )
-                    except Exception as _e:
-                        log(f'Email dispatch failed: {_e}', color='red')
-                    
-                    if result and getattr(result, 'retcode', None) == 10009:
-                        log(f'✅ SELL order executed successfully', color='green')
-                        log(f'📊 Ticket={result.order} Price={result.price} Volume={result.volume}', color='cyan')
-                        # ارسال ایمیل غیرمسدودکننده
-                        try:
-                            send_trade_email_async(
-                                subject = f"Ver2: Last order result",
-                                body=(
-                                    f"Ticket={result.order}\n"
-                                    f"Price={result.price}\n"
-                                    f"Volume={result.volume}\n"
-                                )
-                            )
-                        except Exception as _e:
-                            log(f'Email dispatch failed: {_e}', color='red')
-                    else:
-                        if result:
-                            log(f'❌ SELL failed retcode={result.retcode} comment={result.comment}', color='red')
-                        else:
-                            log(f'❌ SELL failed (no result object)', color='red')
-                    state.reset()
-
-                    reset_state_and_window()
-                    legs = []
-                
-                log(f'cache_data.iloc[-1].name: {cache_data.iloc[-1].name}', color='lightblue_ex')
-                log(f'len(legs): {len(legs)} | start_index: {start_index} | {cache_data.iloc[start_index].name}', color='lightred_ex')
-                log(f' ' * 80)
-                log(f'-'* 80)
-                log(f' ' * 80)
-
-                # ذخیره آخرین زمان داده
-                # last_data_time = cache_data.index[-1]  # این خط حذف شد چون بالا انجام شد
+
+                # span از بسته شدن کندل (= باز شدن کندل جدید) تا برگشت order_send؛ first/forced اندازه‌گیری نمی‌شوند
+                if event.reason == 'new':
+                    latency.begin(event.symbol, event.epoch)
+                signal = scheduler.dispatch(event)
+                if signal is not None:
+                    execute_signal(event.symbol, signal, event.time)
+                latency.end()
+
+                log(lambda: f'last bar: {event.time}', color='lightblue_ex')
+
+            # منتظر جواب همه کندل‌های ارسال‌شده به پروسه‌های استراتژی (حداکثر strategy_collect_timeout)
+            # تا سیگنال همین دور اجرا شود، نه 0.5 ثانیه بعد؛ در حالت تک‌پروسه فوراً خالی برمی‌گردد
+            for intent in scheduler.collect(timeout=collect_timeout):
+                latency.begin(intent.symbol, intent.epoch)
+                latency.mark('signal')
+                execute_signal(intent.symbol, intent.signal, scheduler.bar_time(intent.epoch))
+                latency.end()
 
             # بررسی وضعیت پوزیشن‌های باز
-            positions = mt5_conn.get_positions()
+            positions = mt5_conn.get_positions_for(symbols)
             if positions is None or len(positions) == 0:
                 if position_open:
                     log("🏁 Position closed", color='yellow')
                     position_open = False
 
-            manage_open_positions()
+            # یک tick برای هر نماد در هر دور: ورودی خلاصه بازار (market_aggregator) و مدیریت پوزیشن‌ها
+            ticks = {s: mt5_conn.tick(s) for s in symbols} if poll_ticks else {}
+            manage_open_positions(ticks)
 
             sleep(0.5)  # مطابق main_saver_copy2.py
 
         except KeyboardInterrupt:
             log("🛑 Bot stopped by user", color='yellow')
-            mt5_conn.close_all_positions()
+            # بستن هم‌زمان همه پوزیشن‌ها با یک snapshot قیمت
+            report = mt5_conn.close_positions(mt5_conn.get_positions_for(symbols))
+            for r in report.values():
+                log(f"{'✅' if r.ok else '❌'} Close ticket={r.ticket} {r.symbol} retcode={r.retcode} "
+                    f"price={r.price} attempts={r.attempts}", color='green' if r.ok else 'red')
             break
         except Exception as e:
-            log(f' ' * 80)
             log(f"❌ Error: {e}", color='red')
-            sleep(5)
-
+            watchdog.report_failure()
+            sleep(failure_pause())
+
+    scheduler.close()
+    print(f"⏱️ Latency summary: {latency.dump()}")
+    mt5_conn.market.flush()  # bucketهای باز بازار
+    effects.close(timeout=10)  # CSVهای باقیمانده در صف
+    email_effects.close(timeout=10)  # ایمیل‌های باقیمانده
     mt5_conn.shutdown()
     print("🔌 MT5 connection closed")
 
-def _pip_size_for(symbol: str) -> float:
-    info = mt5.symbol_info(symbol)
-    if not info:
+def _pip_size_for(spec) -> float:
+    if not spec:
         return 0.0001
     # برای 5/3 رقمی: 1 pip = 10 * point
-    return info.point * (10.0 if info.digits in (3, 5) else 1.0)
+    return spec.pip_size
 
-def _min_stop_distance(symbol: str) -> float:
-    info = mt5.symbol_info(symbol)
-    if not info:
+def _min_stop_distance(spec) -> float:
+    if not spec:
         return 0.0003
-    point = info.point
-    # حداقل فاصله مجاز بروکر (stops_level) یا 3 پوینت به‌عنوان فfallback
-    return max((getattr(info, 'trade_stops_level', 0) or 0) * point, 3 * point)
+    # حداقل فاصله مجاز بروکر (stops_level) یا 3 پوینت به‌عنوان fallback
+    return spec.min_stop_distance
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -45,14 +45,19 @@ FULL_TIME_IRAN = {
 # تنظیمات MT5
 MT5_CONFIG = {
     'symbol': 'EURUSD',
+    'symbols': ['EURUSD'],          # نمادهایی که هم‌زمان روی یک اتصال معامله می‌شوند (پیش‌فرض: فقط symbol)
+    'strategy_workers': 0,          # تعداد پروسه‌های استراتژی (0 = همه نمادها در همین پروسه)
+    'strategy_collect_timeout': 2.0,  # حداکثر انتظار (ثانیه) برای جواب پروسه‌های استراتژی پس از ارسال کندل‌ها
     'lot_size': 0.01,
     'win_ratio': 1.2,
     'magic_number': 234000,
     'deviation': 20,
     'max_spread': 3.0,
     'min_balance': 1,
+    'account_cache_ttl': 5.0,       # ثانیه؛ وضعیت terminal/حساب بین دو خواندن (بعد از معامله زودتر تازه می‌شود)
     'max_daily_trades': 10,
     'trading_hours': FULL_TIME_IRAN,
+    'filling_cache_file': 'filling_modes.json',  # مد filling یادگرفته‌شده برای هر نماد/action
 }
 
 # تنظیمات استراتژی
@@ -78,6 +83,7 @@ DYNAMIC_RISK_CONFIG = {
     'commission_mode': 'per_lot',       # per_lot (کل)، per_side (نیمی از رفت و برگشت) در صورت نیاز توسعه
     'round_trip': False,                # اگر True و per_side باشد دو برابر می‌کند
     'base_tp_R': 1.2,                   # TP اولیه تنظیم‌شده هنگام ورود (برای مرجع)
+    'state_file': 'position_states.json',  # snapshot وضعیت پوزیشن‌ها برای ادامه بعد از ری‌استارت (None = غیرفعال)
     'stages': [
         {  # پوشش کمیسیون
             'id': 'commission_cover',
@@ -110,5 +116,36 @@ DYNAMIC_RISK_CONFIG = {
 LOG_CONFIG = {
     'log_level': 'INFO',        # DEBUG, INFO, WARNING, ERROR
     'save_to_file': True,       # ذخیره در فایل
-    'max_log_size': 10,         # حداکثر حجم فایل لاگ (MB)
-}
\ No newline at end of file
+    'max_log_size': 10,         # حداکثر حجم فایل لاگ (MB)، بعد از آن فایل rotate می‌شود
+    'backup_count': 5,          # تعداد فایل‌های rotate شده نگه‌داشته‌شده (.1 ... .5)
+    'format': 'text',           # 'text' یا 'json' (JSON lines)
+    'flush_interval': 0.5,      # فاصله نوشتن بافر لاگ روی دیسک در thread پس‌زمینه (ثانیه)
+}
+
+# لاگ داده بازار در get_live_price (analytics/market_aggregator.py)
+MARKET_LOG_CONFIG = {
+    'bucket_seconds': 1.0,      # طول هر bucket خلاصه (OHLC bid/ask، اسپرد min/max/mean، تعداد تیک)
+    'raw_sample_rate': 0.0,     # سهم تیک‌های خام که جداگانه در *_ticks_*.csv نوشته شوند (0 = خاموش، 1 = همه)
+    'poll_ticks': True,         # حلقه اصلی هر دور یک tick از هر نماد می‌خواند (بدون آن فقط تیک‌های مدیریت پوزیشن/سفارش)
+}
+
+# نگهبان اتصال به terminal (reconnect خودکار)
+WATCHDOG_CONFIG = {
+    'call_timeout': 10.0,       # حداکثر انتظار برای هر فراخوانی مسدودکننده MT5 (ثانیه، 0 = بدون گارد)
+    'down_after': 3,            # تعداد خطای اتصال پشت سر هم تا وضعیت down و initialize دوباره
+    'backoff_base': 1.0,        # فاصله اولین تلاش دوباره (ثانیه)، هر بار دو برابر
+    'backoff_max': 60.0,        # سقف فاصله تلاش‌ها (ثانیه)
+    'jitter': 0.5,              # بخشی از هر فاصله که تصادفی کم می‌شود (0 تا 1)
+    'max_stuck': 3,             # فراخوانی گیرکرده داخل MT5 (timeout پشت سر هم) تا اجرای دوباره پروسه
+}
+
+# دانلود و ذخیره تاریخچه کندل‌ها (bar_store.py / download_history.py)
+HISTORY_CONFIG = {
+    'store_dir': 'data/bars',   # نسبت به ریشه پروژه؛ <symbol>/<timeframe>/<year>/<YYYY-MM-DD>.npz
+    'timeframes': ['M1'],
+    'start': '2020-01-01',      # شروع اولین دانلود؛ اجراهای بعدی از آخرین کندل ذخیره‌شده ادامه می‌دهند
+    'chunk_days': 30,           # طول هر درخواست copy_rates_range (روز)
+    'tick_dir': 'data/ticks',   # تیک‌ها (tick_store.py / capture_ticks.py)؛ <symbol>/<year>/<YYYY-MM-DD>.ticks
+    'tick_days': 7,             # اولین capture از چند روز قبل شروع شود
+    'tick_chunk_minutes': 60,   # طول هر درخواست copy_ticks_range (دقیقه)
+}
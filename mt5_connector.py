@@ -1,11 +1,67 @@
 import MetaTrader5 as mt5
 import pandas as pd
+from dataclasses import dataclass
+from typing import Optional
 import pytz
 from datetime import datetime, time
-from metatrader5_config import MT5_CONFIG
+from metatrader5_config import MT5_CONFIG, WATCHDOG_CONFIG, MARKET_LOG_CONFIG
+from bar_buffer import OHLCRingBuffer
+from symbol_spec import SymbolSpecCache
+from account_state import AccountStateCache
+from sizing import SizingContext
+from connection_watchdog import ConnectionWatchdog
+from filling_cache import AUTO, FillingModeCache
+from analytics import latency
 from analytics.hooks import log_market, log_trade, log_position_event
+from analytics.market_aggregator import MarketAggregator, write_bucket
+from side_effects import effects, HIGH, LOW, BLOCK
 
 RET_OK = 10009  # mt5.TRADE_RETCODE_DONE
+# REQUOTE, TIMEOUT, PRICE_CHANGED, PRICE_OFF, INVALID_FILL, CONNECTION: ارزش ارسال دوباره با قیمت تازه
+RETRYABLE_CLOSE = {10004, 10012, 10020, 10021, 10030, 10031}
+
+# طول هر کندل (ثانیه) برای تخمین تعداد کندل‌های جدید
+TIMEFRAME_SECONDS = {
+    mt5.TIMEFRAME_M1: 60,
+    mt5.TIMEFRAME_M5: 300,
+    mt5.TIMEFRAME_M15: 900,
+    mt5.TIMEFRAME_M30: 1800,
+    mt5.TIMEFRAME_H1: 3600,
+    mt5.TIMEFRAME_H4: 14400,
+    mt5.TIMEFRAME_D1: 86400,
+}
+
+# نام مد filling برای spanهای latency
+FILLING_NAMES = {
+    mt5.ORDER_FILLING_FOK: 'fok',
+    mt5.ORDER_FILLING_IOC: 'ioc',
+    mt5.ORDER_FILLING_RETURN: 'return',
+}
+
+@dataclass
+class CloseResult:
+    ticket: int
+    symbol: str
+    volume: float
+    retcode: Optional[int]      # None = no tick or no result from order_send
+    price: Optional[float]
+    attempts: int
+    comment: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.retcode == RET_OK
+
+
+class _History:
+    """Bar buffer of one symbol plus its fetch settings."""
+    __slots__ = ('bars', 'timeframe', 'max_bars')
+
+    def __init__(self, timeframe, max_bars):
+        self.bars = OHLCRingBuffer(max_bars)
+        self.timeframe = timeframe
+        self.max_bars = max_bars
+
 
 class MT5Connector:
     def __init__(self):
@@ -21,6 +77,32 @@ class MT5Connector:
         # self.commission_per_lot_side = cfg.get('commission_per_lot_side', 0.0)  # removed
         self.iran_tz = pytz.timezone('Asia/Tehran')
         self.utc_tz = pytz.UTC
+        # تاریخچه درون‌حافظه‌ای کندل‌ها به تفکیک نماد (ring buffer با ظرفیت ثابت، به‌روزرسانی افزایشی)
+        self._histories = {}
+        # مشخصات نماد (digits/point/stops/volume/tick) یک بار خوانده و تا reconnect نگه داشته می‌شود
+        self.specs = SymbolSpecCache(lambda symbol: self.watchdog.call(mt5.symbol_info, symbol))
+        # مد filling پذیرفته‌شده به تفکیک (نماد، نوع action)، ماندگار بین اجراها
+        self.filling = FillingModeCache(cfg.get('filling_cache_file'))
+        # وضعیت terminal/حساب با TTL؛ بعد از معامله و reconnect باطل می‌شود
+        # همه فراخوانی‌های مسدودکننده MT5 از گارد timeout واچ‌داگ (یک thread، یکی‌یکی) رد می‌شوند
+        self.account = AccountStateCache(lambda: self.watchdog.call(mt5.terminal_info),
+                                         lambda: self.watchdog.call(mt5.account_info),
+                                         ttl=cfg.get('account_cache_ttl', 5.0), min_balance=self.min_balance)
+        # ورودی‌های حجم‌دهی به تفکیک نماد، خارج از مسیر سفارش ساخته می‌شوند (refresh_sizing)
+        self._sizing = {}
+        self._offset_at = None
+        # سلامت اتصال: طبقه‌بندی خطا، timeout فراخوانی‌ها و initialize دوباره با backoff
+        self.watchdog = ConnectionWatchdog(self.reconnect, lambda: mt5.last_error(), **WATCHDOG_CONFIG)
+        # خلاصه بازار (OHLC و اسپرد) در bucketهای زمانی؛ تیک خام فقط با نرخ نمونه‌برداری
+        self.market = MarketAggregator(
+            lambda row: effects.submit(write_bucket, row, priority=LOW),
+            bucket_seconds=MARKET_LOG_CONFIG['bucket_seconds'],
+            raw_sample_rate=MARKET_LOG_CONFIG['raw_sample_rate'],
+            # تیک خام: DROP (نه COALESCE) تا با صف پر، سطرها بی‌صدا جایگزین نشوند؛ شمارش در market.raw_dropped
+            raw_sink=lambda symbol, bid, ask, last, point, digits, ts: effects.submit(
+                log_market, symbol, bid, ask, last, point, digits, source="mt5", session="bot", ts=ts, priority=LOW),
+        )
+        self.server_offset = None   # زمان سرور بروکر - UTC (ثانیه)؛ measure_server_offset
 
     # ---------- Time / Session ----------
     def get_iran_time(self):
@@ -45,46 +127,101 @@ class MT5Connector:
             return False, "Weekend - trading disabled"
         if not self.is_trading_time():
             return False, "Outside configured trading hours"
-        ti = mt5.terminal_info()
-        if not ti:
+        state = self.account.get()
+        if not state.terminal_ok:
+            self.watchdog.report_failure()
             return False, "Terminal info unavailable"
-        if not ti.trade_allowed:
+        if not state.trade_allowed:
             return False, "Terminal AutoTrading disabled"
-        acc = mt5.account_info()
-        if not acc:
+        if not state.account_ok:
             return False, "Account info unavailable"
-        if acc.balance < self.min_balance:
+        if not self.balance_ok():
             return False, f"Insufficient balance < {self.min_balance}"
         return True, "Trading is allowed"
 
     # ---------- Initialization ----------
     def initialize(self):
+        """Connect and refuse to start on a balance below ``min_balance`` (startup only)."""
+        if not self.connect():
+            return False
+        if not self.balance_ok():
+            print(f"❌ Balance {self.account.get().balance} < min {self.min_balance}")
+            return False
+        return True
+
+    def connect(self):
+        """mt5.initialize plus a terminal_info check; connectivity only, no account/balance rules."""
+        self.specs.invalidate()
+        self.account.invalidate()
+        self._sizing.clear()
         if not mt5.initialize():
             print("❌ MT5 initialize failed:", mt5.last_error())
             return False
-        acc = mt5.account_info()
-        if acc and acc.balance < self.min_balance:
-            print(f"❌ Balance {acc.balance} < min {self.min_balance}")
+        if not self.account.get().terminal_ok:
+            print("❌ MT5 terminal info unavailable:", mt5.last_error())
             return False
+        self.measure_server_offset()
         print("✅ MT5 connection established")
         return True
 
-    def shutdown(self):
+    def measure_server_offset(self):
+        """Estimate broker server time - UTC from a fresh tick (bar times are server time; see analytics.latency)."""
+        tick = self.watchdog.call(mt5.symbol_info_tick, self.symbol)
+        offset = latency.server_offset_from_tick(tick.time) if tick else None
+        if offset is not None:
+            self.server_offset = offset
+            latency.set_server_offset(offset)
+        return offset
+
+    def balance_ok(self):
+        """Trading-halt check: False when the account balance is below ``min_balance``."""
+        state = self.account.get()
+        return not state.account_ok or state.balance >= self.min_balance
+
+    def reconnect(self):
+        """Drop the terminal connection and connect again (used by the watchdog)."""
         mt5.shutdown()
+        return self.connect()
+
+    def shutdown(self):
+        if self.watchdog.stuck():
+            # یک فراخوانی هنوز داخل MT5 است؛ shutdown هم‌زمان از thread دیگر انجام نمی‌شود
+            print("⚠️ MT5 call still running; skipping mt5.shutdown()")
+        else:
+            mt5.shutdown()
+        self.specs.invalidate()
+        self.account.invalidate()
+
+    def spec(self, symbol=None):
+        """Cached SymbolSpec of ``symbol`` (default: the configured symbol), or None."""
+        return self.specs.get(symbol or self.symbol)
 
     # ---------- Data ----------
-    def get_live_price(self):
-        tick = mt5.symbol_info_tick(self.symbol)
+    def tick(self, symbol=None):
+        """mt5.symbol_info_tick, with the quote folded into the market aggregator (all live tick reads go here)."""
+        symbol = symbol or self.symbol
+        tick = self.watchdog.call(mt5.symbol_info_tick, symbol)
+        if not tick:
+            return tick
+        # تجمیع تیک در bucket زمانی (یک سطر برای هر bucket، در پس‌زمینه نوشته می‌شود)
+        spec = self.spec(symbol)
+        if spec:
+            time_msc = getattr(tick, "time_msc", 0) or None
+            self.market.add(symbol, tick.bid, tick.ask, spec.point, spec.digits, ts=self.tick_utc(tick),
+                            last=getattr(tick, "last", None), tick_msc=time_msc)
+        return tick
+
+    def tick_utc(self, tick):
+        """UTC epoch seconds of ``tick`` (its time_msc is server time); now when the server offset is unknown."""
+        time_msc = getattr(tick, "time_msc", 0)
+        if time_msc and self.server_offset is not None:
+            return time_msc / 1000.0 - self.server_offset
+        return datetime.now(self.utc_tz).timestamp()
+
+    def get_live_price(self, symbol=None):
+        tick = self.tick(symbol)
         if not tick:
             return None
-        # try logging market tick
-        try:
-            info = mt5.symbol_info(self.symbol)
-            if info:
-                log_market(self.symbol, getattr(tick, "bid", None), getattr(tick, "ask", None),
-                           getattr(tick, "last", None), info.point, info.digits, source="mt5", session="bot")
-        except Exception:
-            pass
         spread = (tick.ask - tick.bid) * 10000
         if spread > self.max_spread:
             print(f"⚠️ Spread {spread:.1f} > max {self.max_spread}")
@@ -97,10 +234,14 @@ class MT5Connector:
             'utc_time': utc_time
         }
 
-    def get_historical_data(self, timeframe=mt5.TIMEFRAME_M1, count=500):
-        rates = mt5.copy_rates_from_pos(self.symbol, timeframe, 0, count)
+    def get_historical_data(self, timeframe=mt5.TIMEFRAME_M1, count=500, symbol=None):
+        symbol = symbol or self.symbol
+        rates = self.watchdog.call(mt5.copy_rates_from_pos, symbol, timeframe, 0, count)
         if rates is None:
             return None
+        return self._rates_to_frame(rates)
+
+    def _rates_to_frame(self, rates):
         df = pd.DataFrame(rates)
         df['time'] = pd.to_datetime(df['time'], unit='s', utc=True).dt.tz_convert(self.iran_tz)
         df.set_index('time', inplace=True)
@@ -108,20 +249,94 @@ class MT5Connector:
         df['timestamp'] = df.index
         return df
 
+    # ---------- Incremental history ----------
+    def init_history(self, timeframe=mt5.TIMEFRAME_M1, count=500, symbol=None):
+        """Load the last ``count`` bars once; later calls to update_history only fetch what is new.
+        Returns the number of bars loaded, or None on failure."""
+        symbol = symbol or self.symbol
+        rates = self.watchdog.call(mt5.copy_rates_from_pos, symbol, timeframe, 0, count)
+        if rates is None or len(rates) == 0:
+            return None
+        h = _History(timeframe, count)
+        h.bars.extend_rates(rates)
+        self._histories[symbol] = h
+        return len(h.bars)
+
+    @property
+    def bars(self):
+        """Ring buffer of the configured symbol (None before init_history)."""
+        return self.bars_of(self.symbol)
+
+    def bars_of(self, symbol):
+        h = self._histories.get(symbol)
+        return h.bars if h is not None else None
+
+    def latest_bar_time(self, timeframe=None, symbol=None):
+        """Cheap probe: open time (epoch seconds) of the newest bar, or None."""
+        symbol = symbol or self.symbol
+        if timeframe is None:
+            h = self._histories.get(symbol)
+            timeframe = h.timeframe if h is not None else mt5.TIMEFRAME_M1
+        rates = self.watchdog.call(mt5.copy_rates_from_pos, symbol, timeframe, 0, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates[0]['time'])
+
+    def update_history(self, force=False, symbol=None):
+        """
+        Append bars newer than the last stored one to the symbol's buffer.
+
+        The last stored bar was still forming when it was fetched, so it is
+        re-read together with the new bars and overwritten with its final values.
+        With no new bar only the 1-bar probe is made (``force`` re-reads the
+        forming bar anyway). Returns the number of new bars (0 = none), or None on failure.
+        """
+        symbol = symbol or self.symbol
+        h = self._histories.get(symbol)
+        if h is None:
+            return None
+        last_epoch = h.bars.last_time
+        latest = self.latest_bar_time(h.timeframe, symbol=symbol)
+        if latest is None:
+            return None
+        if latest == last_epoch and not force:
+            return 0
+
+        tf_seconds = TIMEFRAME_SECONDS.get(h.timeframe, 60)
+        gap = max(0, (latest - last_epoch) // tf_seconds)
+        count = int(min(gap + 1, h.max_bars))
+        rates = self.watchdog.call(mt5.copy_rates_from_pos, symbol, h.timeframe, 0, count)
+        if rates is None or len(rates) == 0:
+            return None
+        rates = rates[rates['time'] >= last_epoch]
+        if len(rates) == 0:
+            # nothing at/after the stored bar (history changed on the server) -> full reload
+            return self.init_history(h.timeframe, h.max_bars, symbol=symbol)
+
+        first = rates[0]
+        if int(first['time']) == last_epoch:
+            h.bars.replace_last(last_epoch, float(first['open']), float(first['high']),
+                                float(first['low']), float(first['close']), float(first['tick_volume']))
+            rates = rates[1:]
+        h.bars.extend_rates(rates)
+        return len(rates)
+
     # ---------- Broker capability helpers ----------
-    def test_filling_modes(self):
-        info = mt5.symbol_info(self.symbol)
-        if not info:
+    def test_filling_modes(self, symbol=None):
+        symbol = symbol or self.symbol
+        spec = self.specs.refresh(symbol)
+        if not spec:
             print("Symbol info not available")
             return None
-        print(f"Filling mode raw: {info.filling_mode}")
-        return info.filling_mode
+        print(f"Filling mode raw: {spec.filling_mode}")
+        return spec.filling_mode
 
-    def get_supported_filling_modes(self):
-        info = mt5.symbol_info(self.symbol)
-        if not info:
+    def get_supported_filling_modes(self, symbol=None):
+        symbol = symbol or self.symbol
+        spec = self.spec(symbol)
+        if not spec:
             return []
-        fm = getattr(info, 'filling_mode', 0)
+        fm = spec.filling_mode
         modes = []
         for m in (mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN):
             try:
@@ -134,55 +349,19 @@ class MT5Connector:
                     modes.append(m)
         return modes
 
-    def try_all_filling_modes(self, request):
-        tried = []
-        modes = self.get_supported_filling_modes()
-
-        # 1) اول مدهای اعلام‌شده‌ی بروکر
-        for m in modes:
-            req = dict(request)
-            req["type_filling"] = m
-            res = mt5.order_send(req)
-            tried.append((m, getattr(res, 'retcode', None)))
-            if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
-                return res
-
-        # 2) یک بار بدون type_filling (auto)
-        req = dict(request)
-        req.pop("type_filling", None)
-        res = mt5.order_send(req)
-        tried.append(("auto", getattr(res, 'retcode', None)))
-        if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
-            return res
-
-        # 3) در نهایت brute-force برای حالتی که flags نادرست گزارش شده
-        for m in (mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN):
-            if m in modes:
-                continue
-            req = dict(request)
-            req["type_filling"] = m
-            res = mt5.order_send(req)
-            tried.append((m, getattr(res, 'retcode', None)))
-            if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
-                return res
-
-        print(f"[order_send] filling mode attempts: {tried}")
-        return res  # آخرین نتیجه
-
-    # ---------- Stop validation ----------
-    def calculate_valid_stops(self, entry_price, sl_price, tp_price, order_type):
+    def calculate_valid_stops(self, entry_price, sl_price, tp_price, order_type, symbol=None):
         """
         Validate stops:
         - حداقل فاصله استاپ از نقطه ورود: دقیقا >= 1 pip (اگر کمتر باشد سفارش رد می‌شود)
         - 1 pip = 10 * point برای نمادهای 5 یا 3 رقمی، در غیر این صورت = point
         - هیچ تغییری روی SL/TP اعمال نمی‌شود؛ فقط در صورت نامعتبر بودن None برمی‌گرداند.
         """
-        info = mt5.symbol_info(self.symbol)
-        if not info:
+        symbol = symbol or self.symbol
+        spec = self.spec(symbol)
+        if not spec:
             print("Symbol info unavailable")
             return None, None
-        point = info.point
-        pip_size = 10 * point if info.digits in (3, 5) else point
+        pip_size = spec.pip_size
 
         # اعتبار جهت SL
         if order_type == mt5.ORDER_TYPE_BUY and sl_price >= entry_price:
@@ -194,7 +373,7 @@ class MT5Connector:
 
         distance = abs(entry_price - sl_price)
         if distance + 1e-12 <= pip_size:
-            print(f"❌ فاصله SL ({distance:.{info.digits}f}) < 1 pip ({pip_size}) — سفارش ارسال نمی‌شود")
+            print(f"❌ فاصله SL ({distance:.{spec.digits}f}) < 1 pip ({pip_size}) — سفارش ارسال نمی‌شود")
             return None, None
 
         # اعتبار ساده جهت TP (اختیاری: فقط اگر خلاف جهت باشد رد می‌کنیم)
@@ -206,60 +385,60 @@ class MT5Connector:
                 print("❌ TP برای SELL باید پایین‌تر از ورود باشد")
                 return None, None
 
-        def norm(p):
-            return float(f"{p:.{info.digits}f}")
-
-        return norm(sl_price), norm(tp_price)
+        return spec.round_price(sl_price), spec.round_price(tp_price)
 
     # ---------- Order sending core ----------
+    def _filling_candidates(self, symbol, learned):
+        """Learned mode, then broker-declared modes, auto, and brute force for misreported flags."""
+        modes = self.get_supported_filling_modes(symbol)
+        order = [learned] if learned is not None else []
+        order += modes                                                      # 1) مدهای اعلام‌شده‌ی بروکر
+        order.append(AUTO)                                                  # 2) بدون type_filling (auto)
+        order += [mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN]  # 3) brute-force
+        return list(dict.fromkeys(order))
+
     def try_all_filling_modes(self, request):
         tried = []
-        modes = self.get_supported_filling_modes()
-
-        # 1) اول مدهای اعلام‌شده‌ی بروکر
-        for m in modes:
-            req = dict(request)
-            req["type_filling"] = m
-            res = mt5.order_send(req)
-            tried.append((m, getattr(res, 'retcode', None)))
-            if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
-                return res
-
-        # 2) یک بار بدون type_filling (auto)
-        req = dict(request)
-        req.pop("type_filling", None)
-        res = mt5.order_send(req)
-        tried.append(("auto", getattr(res, 'retcode', None)))
-        if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
-            return res
-
-        # 3) در نهایت brute-force برای حالتی که flags نادرست گزارش شده
-        for m in (mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN):
-            if m in modes:
-                continue
+        symbol = request.get("symbol") or self.symbol
+        action = request.get("action")
+        learned = self.filling.get(symbol, action)
+        res = None
+        for m in self._filling_candidates(symbol, learned):
             req = dict(request)
-            req["type_filling"] = m
-            res = mt5.order_send(req)
-            tried.append((m, getattr(res, 'retcode', None)))
-            if res and res.retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
+            if m == AUTO:
+                req.pop("type_filling", None)
+            else:
+                req["type_filling"] = m
+            res = self.watchdog.call(mt5.order_send, req)
+            latency.mark(f'fill_attempt_{FILLING_NAMES.get(m, m)}')
+            retcode = getattr(res, 'retcode', None)
+            tried.append((m, retcode))
+            if res and retcode in (RET_OK, mt5.TRADE_RETCODE_PLACED):
+                self.filling.learn(symbol, action, m)
+                self.account.invalidate()
                 return res
+            if m == learned and retcode == mt5.TRADE_RETCODE_INVALID_FILL:
+                # بروکر رفتارش را عوض کرده: مد یادگرفته‌شده دیگر پذیرفته نمی‌شود
+                self.filling.forget(symbol, action)
 
         print(f"[order_send] filling mode attempts: {tried}")
         return res  # آخرین نتیجه
 
     # ---------- Trading ----------
-    def open_buy_position(self, tick, sl, tp, comment="", volume=None, risk_pct=None):
+    def open_buy_position(self, tick, sl, tp, comment="", volume=None, risk_pct=None, symbol=None):
+        symbol = symbol or self.symbol
         if not tick:
             print("No tick data")
             return None
         entry = tick.ask
-        sl_adj, tp_adj = self.calculate_valid_stops(entry, sl, tp, mt5.ORDER_TYPE_BUY)
+        sl_adj, tp_adj = self.calculate_valid_stops(entry, sl, tp, mt5.ORDER_TYPE_BUY, symbol=symbol)
+        latency.mark('stops')
         if sl_adj is None:
             return None
-        vol = self._resolve_volume(volume, entry, sl_adj, tick, risk_pct)
+        vol = self._resolve_volume(volume, entry, sl_adj, tick, risk_pct, symbol=symbol)
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": self.symbol,
+            "symbol": symbol,
             "volume": vol,
             "type": mt5.ORDER_TYPE_BUY,
             "price": entry,
@@ -270,44 +449,46 @@ class MT5Connector:
             "comment": comment,
             "type_time": mt5.ORDER_TIME_GTC,
         }
-        print(f"📤 BUY {self.symbol} @ {entry} VOL={vol} SL={sl_adj} TP={tp_adj}")
+        print(f"📤 BUY {symbol} @ {entry} VOL={vol} SL={sl_adj} TP={tp_adj}")
         result = self.try_all_filling_modes(request)
-        try:
-            log_trade(self.symbol, "BUY", request, result, reason="strategy_signal")
-            if result and getattr(result, 'retcode', None) == RET_OK:
-                # ثبت رویداد باز شدن پوزیشن (خلاصه؛ مدیریت دقیق در main)
-                log_position_event(
-                    symbol=self.symbol,
-                    ticket=getattr(result, 'order', 0),
-                    event='open_order',
-                    direction='buy',
-                    entry=entry,
-                    current_price=entry,
-                    sl=sl_adj,
-                    tp=tp_adj,
-                    profit_R=0.0,
-                    stage=0,
-                    risk_abs=abs(entry - sl_adj),
-                    locked_R=None,
-                    volume=request.get('volume'),
-                    note='initial order'
-                )
-        except Exception:
-            pass
+        latency.mark('fill')
+        effects.submit(log_trade, symbol, "BUY", request, result, reason="strategy_signal", priority=HIGH, policy=BLOCK)
+        if result and getattr(result, 'retcode', None) == RET_OK:
+            # ثبت رویداد باز شدن پوزیشن (خلاصه؛ مدیریت دقیق در main)
+            effects.submit(
+                log_position_event,
+                symbol=symbol,
+                ticket=getattr(result, 'order', 0),
+                event='open_order',
+                direction='buy',
+                entry=entry,
+                current_price=entry,
+                sl=sl_adj,
+                tp=tp_adj,
+                profit_R=0.0,
+                stage=0,
+                risk_abs=abs(entry - sl_adj),
+                locked_R=None,
+                volume=request.get('volume'),
+                note='initial order',
+                priority=HIGH, policy=BLOCK,
+            )
         return result
 
-    def open_sell_position(self, tick, sl, tp, comment="", volume=None, risk_pct=None):
+    def open_sell_position(self, tick, sl, tp, comment="", volume=None, risk_pct=None, symbol=None):
+        symbol = symbol or self.symbol
         if not tick:
             print("No tick data")
             return None
         entry = tick.bid
-        sl_adj, tp_adj = self.calculate_valid_stops(entry, sl, tp, mt5.ORDER_TYPE_SELL)
+        sl_adj, tp_adj = self.calculate_valid_stops(entry, sl, tp, mt5.ORDER_TYPE_SELL, symbol=symbol)
+        latency.mark('stops')
         if sl_adj is None:
             return None
-        vol = self._resolve_volume(volume, entry, sl_adj, tick, risk_pct)
+        vol = self._resolve_volume(volume, entry, sl_adj, tick, risk_pct, symbol=symbol)
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": self.symbol,
+            "symbol": symbol,
             "volume": vol,
             "type": mt5.ORDER_TYPE_SELL,
             "price": entry,
@@ -318,62 +499,141 @@ class MT5Connector:
             "comment": comment,
             "type_time": mt5.ORDER_TIME_GTC,
         }
-        print(f"📤 SELL {self.symbol} @ {entry} VOL={vol} SL={sl_adj} TP={tp_adj}")
+        print(f"📤 SELL {symbol} @ {entry} VOL={vol} SL={sl_adj} TP={tp_adj}")
         result = self.try_all_filling_modes(request)
-        try:
-            log_trade(self.symbol, "SELL", request, result, reason="strategy_signal")
-            if result and getattr(result, 'retcode', None) == RET_OK:
-                log_position_event(
-                    symbol=self.symbol,
-                    ticket=getattr(result, 'order', 0),
-                    event='open_order',
-                    direction='sell',
-                    entry=entry,
-                    current_price=entry,
-                    sl=sl_adj,
-                    tp=tp_adj,
-                    profit_R=0.0,
-                    stage=0,
-                    risk_abs=abs(entry - sl_adj),
-                    locked_R=None,
-                    volume=request.get('volume'),
-                    note='initial order'
-                )
-        except Exception:
-            pass
+        latency.mark('fill')
+        effects.submit(log_trade, symbol, "SELL", request, result, reason="strategy_signal", priority=HIGH, policy=BLOCK)
+        if result and getattr(result, 'retcode', None) == RET_OK:
+            effects.submit(
+                log_position_event,
+                symbol=symbol,
+                ticket=getattr(result, 'order', 0),
+                event='open_order',
+                direction='sell',
+                entry=entry,
+                current_price=entry,
+                sl=sl_adj,
+                tp=tp_adj,
+                profit_R=0.0,
+                stage=0,
+                risk_abs=abs(entry - sl_adj),
+                locked_R=None,
+                volume=request.get('volume'),
+                note='initial order',
+                priority=HIGH, policy=BLOCK,
+            )
         return result
 
-    def close_all_positions(self):
-        positions = mt5.positions_get(symbol=self.symbol)
+    def close_all_positions(self, symbol=None):
+        """Flatten every position of ``symbol`` (see close_positions). Returns the per-ticket report."""
+        symbol = symbol or self.symbol
+        positions = self.watchdog.call(mt5.positions_get, symbol=symbol)
         if positions is None:
-            return
-        for pos in positions:
-            tick = mt5.symbol_info_tick(self.symbol)
-            if not tick:
-                continue
-            if pos.type == mt5.POSITION_TYPE_BUY:
-                price = tick.bid  # close BUY at bid with SELL
-                order_type = mt5.ORDER_TYPE_SELL
-            else:
-                price = tick.ask  # close SELL at ask with BUY
-                order_type = mt5.ORDER_TYPE_BUY
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": self.symbol,
-                "volume": pos.volume,
-                "type": order_type,
-                "position": pos.ticket,
-                "price": price,
-                "deviation": self.deviation,
-                "magic": self.magic,
-                "comment": "Close position",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
-            mt5.order_send(request)
-
-    def get_positions(self):
-        return mt5.positions_get(symbol=self.symbol)
+            return {}
+        return self.close_positions(positions, symbol=symbol)
+
+    def close_positions(self, positions, symbol=None, max_retries=2):
+        """
+        Close ``positions`` from one tick snapshot per symbol.
+
+        The MetaTrader5 API is not documented as thread-safe, so the close requests
+        are sent one after another on the watchdog's single call thread (the
+        simulator rejects overlapping order_send calls); the shared snapshot keeps
+        each round to one price read per symbol. Closes rejected with a retryable retcode (requote,
+        price changed/off, timeout, connection, invalid fill, no result) are sent
+        again at refreshed prices, up to ``max_retries`` times. A close that raises is
+        reported (and retried) like one without a result, with the exception as comment.
+        symbol: overrides pos.symbol (all positions belong to that symbol).
+        Returns {ticket: CloseResult}.
+        """
+        pending = list(positions or ())
+        report = {}
+        if not pending:
+            return report
+        symbol_of = (lambda pos: symbol) if symbol else (lambda pos: pos.symbol)
+        for attempt in range(1, max_retries + 2):
+            # یک snapshot قیمت برای هر نماد در هر دور (نه یک tick برای هر پوزیشن)
+            ticks = {}
+            for pos in pending:
+                sym = symbol_of(pos)
+                if sym not in ticks:
+                    try:
+                        ticks[sym] = self.watchdog.call(mt5.symbol_info_tick, sym)
+                    except Exception as e:
+                        print(f"⚠️ symbol_info_tick({sym}) raised during close: {e}")
+                        ticks[sym] = None
+            retry = []
+            for pos in pending:
+                try:
+                    retcode, result = self._close_one(pos, symbol_of(pos), ticks[symbol_of(pos)],
+                                                      report.get(pos.ticket))
+                    comment = getattr(result, 'comment', None)
+                except Exception as e:
+                    # یک تیکت خراب نباید بستن بقیه را متوقف کند
+                    retcode, result, comment = None, None, f"{type(e).__name__}: {e}"
+                report[pos.ticket] = CloseResult(pos.ticket, symbol_of(pos), pos.volume, retcode,
+                                                 getattr(result, 'price', None), attempt, comment)
+                if retcode != RET_OK and (retcode in RETRYABLE_CLOSE or result is None):
+                    retry.append(pos)
+            pending = retry
+            if not pending:
+                break
+        if any(r.ok for r in report.values()):
+            self.account.invalidate()
+        failed = [r for r in report.values() if not r.ok]
+        if failed:
+            print(f"⚠️ close failed for {len(failed)} position(s): "
+                  + ', '.join(f'{r.ticket}:{r.retcode}' for r in failed))
+        return report
+
+    def _close_one(self, pos, symbol, tick, previous=None):
+        if not tick:
+            return None, None
+        if pos.type == mt5.POSITION_TYPE_BUY:
+            price = tick.bid  # close BUY at bid with SELL
+            order_type = mt5.ORDER_TYPE_SELL
+        else:
+            price = tick.ask  # close SELL at ask with BUY
+            order_type = mt5.ORDER_TYPE_BUY
+        request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "volume": pos.volume,
+            "type": order_type,
+            "position": pos.ticket,
+            "price": price,
+            "deviation": self.deviation,
+            "magic": self.magic,
+            "comment": "Close position",
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC,
+        }
+        if previous is not None and previous.retcode == 10030:
+            # مد filling رد شد (INVALID_FILL): همه مدها امتحان و نتیجه یاد گرفته می‌شود
+            result = self.try_all_filling_modes(request)
+            return getattr(result, 'retcode', None), result
+        # مد filling یادگرفته‌شده برای معاملات این نماد، در غیر این صورت IOC
+        learned = self.filling.get(symbol, mt5.TRADE_ACTION_DEAL)
+        if learned == AUTO:
+            request.pop("type_filling")
+        elif learned is not None:
+            request["type_filling"] = learned
+        result = self.watchdog.call(mt5.order_send, request)
+        return getattr(result, 'retcode', None), result
+
+    def get_positions(self, symbol=None):
+        symbol = symbol or self.symbol
+        return self.watchdog.call(mt5.positions_get, symbol=symbol)
+
+    def get_positions_for(self, symbols):
+        """Open positions of several symbols with a single positions_get call (None on failure)."""
+        symbols = set(symbols)
+        if len(symbols) == 1:
+            return self.get_positions(next(iter(symbols)))
+        positions = self.watchdog.call(mt5.positions_get)
+        if positions is None:
+            return None
+        return tuple(p for p in positions if p.symbol in symbols)
 
     # ---------- Diagnostic stubs (used by main/tests) ----------
     def check_trading_limits(self):
@@ -385,97 +645,78 @@ class MT5Connector:
     def check_market_state(self):
         return True
 
-    def check_symbol_properties(self):
-        info = mt5.symbol_info(self.symbol)
+    def check_symbol_properties(self, symbol=None):
+        symbol = symbol or self.symbol
+        info = self.watchdog.call(mt5.symbol_info, symbol)
         if not info:
             print("Symbol info not found")
             return
         if not info.visible:
-            mt5.symbol_select(self.symbol, True)
+            self.watchdog.call(mt5.symbol_select, symbol, True)
+        self.specs.refresh(symbol)
 
     # ---------- Volume helpers ----------
-    def _normalize_volume(self, vol: float) -> float:
-        info = mt5.symbol_info(self.symbol)
-        if not info:
+    def _normalize_volume(self, vol: float, symbol=None) -> float:
+        symbol = symbol or self.symbol
+        spec = self.spec(symbol)
+        if not spec:
             return vol
-        step = info.volume_step or 0.01
-        vmin = info.volume_min or step
-        vmax = info.volume_max or 100.0
-        steps = round(vol / step)
-        vol_rounded = steps * step
-        return max(vmin, min(vmax, vol_rounded))
-
-    def _get_tick_specs(self, info):
-        """
-        Resolve tick_size and tick_value with safe fallbacks:
-        - Prefer trade_tick_size/trade_tick_value
-        - Fallback to tick_size/tick_value if broker exposes them
-        - Finally fallback to point and contract-size approximation
-        """
-        tick_size = getattr(info, 'trade_tick_size', None) or getattr(info, 'tick_size', None) or getattr(info, 'point', None)
-        tick_value = getattr(info, 'trade_tick_value', None) or getattr(info, 'tick_value', None)
-        if tick_value is None:
-            contract = getattr(info, 'trade_contract_size', None)
-            if contract and tick_size:
-                # Approximation: value of one tick_size move for 1 lot in account currency
-                # Accurate for USD-quoted pairs on USD accounts (e.g., EURUSD/USD account).
-                tick_value = contract * tick_size
-        return tick_size, tick_value
-
-    def calculate_volume_by_risk(self, entry: float, sl: float, tick, risk_pct: float = 0.01) -> float:
-        """Position sizing with price risk + current spread (commission removed)."""
-        acc = mt5.account_info()
-        info = mt5.symbol_info(self.symbol)
-        if not acc or not info:
-            return self.lot
+        return spec.normalize_volume(vol)
 
-        tick_size, tick_value = self._get_tick_specs(info)
-        if not tick_size or not tick_value:
+    def calculate_volume_by_risk(self, entry: float, sl: float, tick, risk_pct: float = 0.01, symbol=None) -> float:
+        """Position sizing with price risk + current spread (commission removed); see sizing.py."""
+        ctx = self.sizing_context(symbol)
+        if ctx is None:
             return self.lot
-
-        risk_money = acc.balance * float(risk_pct)
-
-        risk_points = abs(entry - sl) / float(tick_size)
-        price_risk_per_lot = risk_points * float(tick_value)
-
-        spread_points = abs(getattr(tick, 'ask', 0.0) - getattr(tick, 'bid', 0.0)) / float(tick_size)
-        spread_cost_per_lot = spread_points * float(tick_value)
-
-        # commission removed
-        total_cost_per_lot = price_risk_per_lot + spread_cost_per_lot
-        if total_cost_per_lot <= 0:
-            return self.lot
-
-        vol = risk_money / total_cost_per_lot
-
-        MAX_LEVERAGE_FACTOR = 0.02  # حداکثر 2% اکوییتی در ریسک قیمت
-        # اگر ریسک پولی هر 1 لات خیلی کوچک شده و vol بسیار بزرگ است، کلمپ کن
-        theoretical_loss_per_lot = price_risk_per_lot
-        if theoretical_loss_per_lot <= 0:
-            return self.lot
-        max_allowed_vol = (acc.balance * MAX_LEVERAGE_FACTOR) / theoretical_loss_per_lot
-        if vol > max_allowed_vol:
-            vol = max_allowed_vol
-
-        return self._normalize_volume(vol)
-
-    def _resolve_volume(self, volume, entry, sl, tick, risk_pct):
+        return ctx.volume_by_risk(entry, sl, tick, risk_pct)
+
+    def sizing_context(self, symbol=None):
+        """SizingContext of ``symbol`` built from the last account snapshot (no IPC once warmed up)."""
+        symbol = symbol or self.symbol
+        state = self.account.peek() or self.account.get()
+        ctx = self._sizing.get(symbol)
+        if ctx is None or ctx.fetched_at != state.fetched_at:
+            ctx = SizingContext.build(self.spec(symbol), state, self.lot)
+            if ctx is not None:
+                self._sizing[symbol] = ctx
+        return ctx
+
+    def refresh_sizing(self, symbols=None):
+        """
+        Re-read the account if stale/invalidated and rebuild the contexts (call off the order path).
+        On each new account snapshot the symbol specs are re-read too: tick_value of
+        symbols not quoted in the account currency (USDJPY, crosses) moves with price.
+        """
+        state = self.account.get()
+        if state.fetched_at != self._offset_at:
+            # offset سرور هم با هر snapshot تازه (مثلا بعد از تغییر DST) دوباره تخمین زده می‌شود
+            self._offset_at = state.fetched_at
+            self.measure_server_offset()
+        for symbol in symbols or [self.symbol]:
+            ctx = self._sizing.get(symbol)
+            if ctx is None or ctx.fetched_at != state.fetched_at:
+                self.specs.refresh(symbol)
+            self.sizing_context(symbol)
+
+    def _resolve_volume(self, volume, entry, sl, tick, risk_pct, symbol=None):
+        symbol = symbol or self.symbol
         if volume is not None:
-            return self._normalize_volume(volume)
+            return self._normalize_volume(volume, symbol=symbol)
         if risk_pct is not None:
-            return self.calculate_volume_by_risk(entry, sl, tick, risk_pct)
+            return self.calculate_volume_by_risk(entry, sl, tick, risk_pct, symbol=symbol)
         return self.lot
 
     # ---------- Modify SL/TP ----------
-    def modify_sl_tp(self, ticket: int, new_sl=None, new_tp=None):
+    def modify_sl_tp(self, ticket: int, new_sl=None, new_tp=None, symbol=None):
+        symbol = symbol or self.symbol
         req = {
             "action": mt5.TRADE_ACTION_SLTP,
             "position": ticket,
-            "symbol": self.symbol,
+            "symbol": symbol,
         }
         if new_sl is not None:
             req["sl"] = new_sl
         if new_tp is not None:
             req["tp"] = new_tp
-        res = mt5.order_send(req)
+        res = self.watchdog.call(mt5.order_send, req)
         return res
@@ -0,0 +1,546 @@
+"""
+Offline stand-in for the ``MetaTrader5`` package (Linux, no terminal).
+
+Put ``mt5sim/`` first on ``sys.path`` and ``import MetaTrader5`` resolves to
+this module; the bot's own code is unchanged (see ``mt5sim/run.py``). Prices
+come from M1 OHLC bars (``load_csv`` / ``add_symbol``) replayed on a virtual
+clock: ``sleep`` advances the clock instead of waiting, the newest bar is
+returned as still forming, and ticks follow the bar's path open -> low ->
+high -> close (bullish) or open -> high -> low -> close (bearish).
+
+order_send fills DEAL requests at the current bid/ask, closes/partially
+closes by ``position``, applies TRADE_ACTION_SLTP, and triggers SL/TP while
+the clock moves (SL first when both are touched). Filling behavior
+(``accepted_filling``, ``auto_filling``) and injected retcodes
+(``sim.script``) and terminal outages (``sim.outages``) are configurable per
+run. The real package is not documented as thread-safe, so overlapping
+``order_send`` calls raise here (``sim.send_latency`` widens each call in real
+time to make overlaps observable).
+
+Only what the bot uses is implemented; the M1 timeframe is the only one
+with data.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+
+# ---------- Constants (same values as the real package) ----------
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_CONNECTION = 10031
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+COPY_TICKS_ALL = 1
+TICK_FLAG_BID = 2
+TICK_FLAG_ASK = 4
+
+RES_S_OK = 1
+RES_E_INTERNAL_FAIL_INIT = -10003
+RES_E_INTERNAL_FAIL_CONNECT = -10004
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment',
+    'request_id', 'retcode_external', 'request',
+])
+BAR_SECONDS = 60
+
+
+class SimulationFinished(KeyboardInterrupt):
+    """Raised by ``sleep`` when the clock passes the last bar (the bot's Ctrl+C path flattens and exits)."""
+
+
+class _Symbol:
+    def __init__(self, name, rates, digits, spread_points, contract_size, stops_level,
+                 volume_min, volume_max, volume_step, filling_mode, accepted_filling, auto_filling):
+        self.name = name
+        self.rates = rates
+        self.times = rates['time']
+        self.digits = digits
+        self.point = 10.0 ** -digits
+        self.spread_points = spread_points
+        self.contract_size = contract_size
+        self.stops_level = stops_level
+        self.volume_min = volume_min
+        self.volume_max = volume_max
+        self.volume_step = volume_step
+        self.filling_mode = filling_mode
+        self.accepted_filling = set(accepted_filling)
+        self.auto_filling = auto_filling
+
+    @property
+    def spread(self):
+        return self.spread_points * self.point
+
+    def index(self, t):
+        """Index of the bar forming at time ``t`` (-1 before the first bar)."""
+        return int(np.searchsorted(self.times, int(t), side='right')) - 1
+
+    def vertices(self, k):
+        """(seconds into the bar, price) path points of bar ``k``."""
+        r = self.rates[k]
+        first, second = (r['low'], r['high']) if r['close'] >= r['open'] else (r['high'], r['low'])
+        return ((0.0, r['open']), (20.0, first), (40.0, second), (BAR_SECONDS, r['close']))
+
+    def bid_at(self, t):
+        k = self.index(t)
+        if k < 0:
+            return float(self.rates[0]['open'])
+        elapsed = t - self.times[k]
+        if elapsed >= BAR_SECONDS:
+            return float(self.rates[k]['close'])
+        pts = self.vertices(k)
+        for (t0, p0), (t1, p1) in zip(pts, pts[1:]):
+            if elapsed <= t1:
+                return round(float(p0 + (p1 - p0) * (elapsed - t0) / (t1 - t0)), self.digits)
+        return float(self.rates[k]['close'])
+
+    def partial_bar(self, k, t):
+        """Bar ``k`` as seen at time ``t`` (high/low/close so far)."""
+        bar = self.rates[k].copy()
+        elapsed = t - self.times[k]
+        if elapsed >= BAR_SECONDS:
+            return bar
+        prices = [p for s, p in self.vertices(k) if s <= elapsed] + [self.bid_at(t)]
+        bar['high'] = max(prices)
+        bar['low'] = min(prices)
+        bar['close'] = prices[-1]
+        return bar
+
+    def bid_range(self, t0, t1):
+        """Lowest and highest bid on the path in (t0, t1]."""
+        prices = [self.bid_at(t1)]
+        for k in range(max(self.index(t0), 0), self.index(t1) + 1):
+            start = self.times[k]
+            prices += [p for s, p in self.vertices(k) if t0 < start + s <= t1]
+        return min(prices), max(prices)
+
+
+class Simulator:
+    def __init__(self):
+        self.symbols = {}
+        self.reset()
+
+    def reset(self, balance=10000.0, leverage=100, currency='USD', trade_allowed=True):
+        self.now = 0.0
+        self.end = None
+        self.connected = False
+        self.trade_allowed = trade_allowed
+        self.balance = float(balance)
+        self.leverage = leverage
+        self.currency = currency
+        self.positions = {}
+        self.deals = []
+        self.script = deque()       # retcodes returned by the next order_send calls (then normal behavior)
+        self.send_latency = 0.0     # real seconds each order_send takes (to expose overlapping calls)
+        self.outages = []           # [(start, seconds)]: terminal unreachable in [start, start + seconds)
+        self.calls = 0              # API calls served (throughput benchmarks)
+        self._ticket = 100000
+        self._error = (RES_S_OK, 'Success')
+
+    # ---------- Setup ----------
+    def add_symbol(self, name, rates, digits=5, spread_points=10, contract_size=100000.0, stops_level=0,
+                   volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                   filling_mode=SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+                   accepted_filling=(ORDER_FILLING_FOK, ORDER_FILLING_IOC), auto_filling=True):
+        """rates: structured array with RATES_DTYPE fields (or a DataFrame with a DatetimeIndex and OHLC columns)."""
+        if not isinstance(rates, np.ndarray):
+            rates = _frame_to_rates(rates)
+        self.symbols[name] = _Symbol(name, rates, digits, spread_points, contract_size, stops_level,
+                                     volume_min, volume_max, volume_step, filling_mode,
+                                     accepted_filling, auto_filling)
+        last = max(int(s.times[-1]) for s in self.symbols.values()) + BAR_SECONDS
+        self.end = last if self.end is None else max(self.end, last)
+        return self.symbols[name]
+
+    def start(self, bars=0):
+        """Put the clock ``bars`` bars after the first bar of the earliest symbol (history before it)."""
+        first = min(int(s.times[0]) for s in self.symbols.values())
+        self.now = float(first + bars * BAR_SECONDS)
+
+    # ---------- Clock ----------
+    def advance(self, seconds):
+        t0, t1 = self.now, self.now + max(float(seconds), 0.0)
+        self.now = t1
+        if self.connected and self.in_outage():
+            self.connected = False
+        self._check_stops(t0, t1)
+        if self.end is not None and t1 >= self.end:
+            raise SimulationFinished()
+
+    def _check_stops(self, t0, t1):
+        for pos in list(self.positions.values()):
+            sym = self.symbols[pos.symbol]
+            lo, hi = sym.bid_range(t0, t1)
+            if pos.type == POSITION_TYPE_BUY:
+                hit_sl = pos.sl and lo <= pos.sl
+                hit_tp = pos.tp and hi >= pos.tp
+            else:
+                hit_sl = pos.sl and hi + sym.spread >= pos.sl
+                hit_tp = pos.tp and lo + sym.spread <= pos.tp
+            if hit_sl:
+                self._close(pos, pos.volume, pos.sl, 'sl')
+            elif hit_tp:
+                self._close(pos, pos.volume, pos.tp, 'tp')
+
+    def in_outage(self):
+        return any(start <= self.now < start + seconds for start, seconds in self.outages)
+
+    # ---------- Market ----------
+    def tick(self, name):
+        sym = self.symbols.get(name)
+        if sym is None or sym.index(self.now) < 0:
+            return None
+        bid = sym.bid_at(self.now)
+        return SimpleNamespace(time=int(self.now), bid=bid, ask=round(bid + sym.spread, sym.digits), last=0.0,
+                               volume=0, time_msc=int(self.now * 1000), flags=6, volume_real=0.0)
+
+    def rates_from_pos(self, name, timeframe, start_pos, count):
+        sym = self.symbols.get(name)
+        if sym is None or timeframe != TIMEFRAME_M1:
+            self._error = (-4, 'Terminal: Not found')
+            return None
+        last = sym.index(self.now) - start_pos
+        first = max(last - count + 1, 0)
+        if last < 0:
+            return np.empty(0, dtype=RATES_DTYPE)
+        out = sym.rates[first:last + 1].copy()
+        if start_pos == 0:
+            out[-1] = sym.partial_bar(last, self.now)
+        return out
+
+    def ticks_range(self, name, date_from, date_to):
+        """One tick per path point (open, first and second extreme, close 1 s before the bar ends)."""
+        sym = self.symbols.get(name)
+        if sym is None:
+            self._error = (-4, 'Terminal: Not found')
+            return None
+        t0, t1 = _epoch(date_from), min(_epoch(date_to), self.now)
+        rows = []
+        for k in range(max(sym.index(t0), 0), sym.index(t1) + 1):
+            start = int(sym.times[k])
+            for s, price in sym.vertices(k):
+                t = start + min(s, BAR_SECONDS - 1)
+                if t0 <= t <= t1:
+                    rows.append((t, price, round(price + sym.spread, sym.digits), 0.0, 0, t * 1000,
+                                 TICK_FLAG_BID | TICK_FLAG_ASK, 0.0))
+        return np.array(rows, dtype=TICKS_DTYPE)
+
+    def rates_range(self, name, timeframe, date_from, date_to):
+        sym = self.symbols.get(name)
+        if sym is None or timeframe != TIMEFRAME_M1:
+            self._error = (-4, 'Terminal: Not found')
+            return None
+        t0, t1 = _epoch(date_from), min(_epoch(date_to), self.now - BAR_SECONDS)
+        lo = int(np.searchsorted(sym.times, t0, side='left'))
+        hi = int(np.searchsorted(sym.times, t1, side='right'))
+        return sym.rates[lo:hi].copy()
+
+    # ---------- Trading ----------
+    def order_send(self, request):
+        if not self.connected:
+            return _offline()
+        if self.script:
+            return self._result(self.script.popleft(), request)
+        sym = self.symbols.get(request.get('symbol'))
+        action = request.get('action')
+        if action == TRADE_ACTION_SLTP:
+            return self._modify(request)
+        if action != TRADE_ACTION_DEAL or sym is None:
+            return self._result(TRADE_RETCODE_INVALID, request)
+        filling = request.get('type_filling')
+        if (filling is None and not sym.auto_filling) or (filling is not None and filling not in sym.accepted_filling):
+            return self._result(TRADE_RETCODE_INVALID_FILL, request, comment='Unsupported filling mode')
+        volume = float(request.get('volume') or 0)
+        steps = round(volume / sym.volume_step, 6)
+        if not sym.volume_min <= volume <= sym.volume_max or abs(steps - round(steps)) > 1e-6:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, comment='Invalid volume')
+        tick = self.tick(sym.name)
+        if tick is None:
+            return self._result(TRADE_RETCODE_INVALID, request, comment='No prices')
+        buy = request.get('type') == ORDER_TYPE_BUY
+        price = tick.ask if buy else tick.bid
+
+        if request.get('position'):
+            pos = self.positions.get(request['position'])
+            if pos is None:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment='Position doesn\'t exist')
+            deal = self._close(pos, min(volume, pos.volume), price, 'client')
+            return self._result(TRADE_RETCODE_DONE, request, deal=deal, order=deal, volume=volume,
+                                price=price, bid=tick.bid, ask=tick.ask, comment='Request executed')
+
+        sl, tp = float(request.get('sl') or 0), float(request.get('tp') or 0)
+        if not self._stops_ok(sym, buy, price, sl, tp):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, comment='Invalid stops')
+        self._ticket += 1
+        pos = SimpleNamespace(
+            ticket=self._ticket, symbol=sym.name, type=POSITION_TYPE_BUY if buy else POSITION_TYPE_SELL,
+            volume=volume, price_open=price, sl=sl, tp=tp, price_current=price, profit=0.0,
+            magic=request.get('magic', 0), comment=request.get('comment', ''), time=int(self.now),
+            identifier=self._ticket, swap=0.0,
+        )
+        self.positions[pos.ticket] = pos
+        self.deals.append(SimpleNamespace(ticket=pos.ticket, position_id=pos.ticket, symbol=sym.name, type=pos.type,
+                                          entry=0, volume=volume, price=price, profit=0.0, time=int(self.now),
+                                          reason='client'))
+        return self._result(TRADE_RETCODE_DONE, request, deal=pos.ticket, order=pos.ticket, volume=volume,
+                            price=price, bid=tick.bid, ask=tick.ask, comment='Request executed')
+
+    def _modify(self, request):
+        pos = self.positions.get(request.get('position'))
+        if pos is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment='Position doesn\'t exist')
+        sym = self.symbols[pos.symbol]
+        tick = self.tick(sym.name)
+        buy = pos.type == POSITION_TYPE_BUY
+        sl, tp = float(request.get('sl') or 0), float(request.get('tp') or 0)
+        if not self._stops_ok(sym, buy, tick.bid if buy else tick.ask, sl, tp):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, comment='Invalid stops')
+        pos.sl, pos.tp = sl, tp
+        return self._result(TRADE_RETCODE_DONE, request, comment='Request executed')
+
+    @staticmethod
+    def _stops_ok(sym, buy, price, sl, tp):
+        gap = sym.stops_level * sym.point
+        sign = 1 if buy else -1
+        if sl and sign * (price - sl) < gap:
+            return False
+        if tp and sign * (tp - price) < gap:
+            return False
+        return True
+
+    def _close(self, pos, volume, price, reason):
+        sign = 1 if pos.type == POSITION_TYPE_BUY else -1
+        profit = round(sign * (price - pos.price_open) * volume * self.symbols[pos.symbol].contract_size, 2)
+        self.balance += profit
+        self._ticket += 1
+        self.deals.append(SimpleNamespace(ticket=self._ticket, position_id=pos.ticket, symbol=pos.symbol,
+                                          type=1 - pos.type, entry=1, volume=volume, price=price, profit=profit,
+                                          time=int(self.now), reason=reason))
+        pos.volume = round(pos.volume - volume, 8)
+        if pos.volume <= 0:
+            del self.positions[pos.ticket]
+        return self._ticket
+
+    def _result(self, retcode, request, deal=0, order=0, volume=0.0, price=0.0, bid=0.0, ask=0.0, comment=''):
+        return OrderSendResult(retcode, deal, order, volume, price, bid, ask, comment, 0, 0, dict(request))
+
+    # ---------- Account ----------
+    def equity(self):
+        eq = self.balance
+        for pos in self.positions.values():
+            tick = self.tick(pos.symbol)
+            price = tick.bid if pos.type == POSITION_TYPE_BUY else tick.ask
+            sign = 1 if pos.type == POSITION_TYPE_BUY else -1
+            eq += sign * (price - pos.price_open) * pos.volume * self.symbols[pos.symbol].contract_size
+        return round(eq, 2)
+
+
+def _frame_to_rates(df):
+    rates = np.zeros(len(df), dtype=RATES_DTYPE)
+    idx = df.index
+    if getattr(idx, 'tz', None) is not None:
+        idx = idx.tz_convert('UTC').tz_localize(None)
+    rates['time'] = np.asarray(idx, dtype='datetime64[s]').astype('int64')
+    for col in ('open', 'high', 'low', 'close'):
+        rates[col] = df[col].to_numpy(dtype=float)
+    if 'volume' in df:
+        rates['tick_volume'] = df['volume'].to_numpy(dtype=float)
+    return rates
+
+
+def _offline():
+    sim._error = (RES_E_INTERNAL_FAIL_CONNECT, 'IPC connection failed')
+    return None
+
+
+def _epoch(value):
+    if hasattr(value, 'timestamp'):
+        return int(value.timestamp())
+    return int(value)
+
+
+sim = Simulator()
+
+
+# ---------- Simulation control ----------
+def load_csv(symbol, path, **spec):
+    """Replay ``path`` (a CSV or ``store:`` source of backtest.engine.load_ohlc, times taken as UTC) as ``symbol``."""
+    from backtest.engine import load_ohlc
+    return sim.add_symbol(symbol, load_ohlc(path), **spec)
+
+
+def clock():
+    return sim.now
+
+
+def sleep(seconds):
+    """Advance the virtual clock (replaces time.sleep in the bot)."""
+    sim.advance(seconds)
+
+
+# ---------- MetaTrader5 API ----------
+def initialize(*args, **kwargs):
+    sim.calls += 1
+    sim.connected = bool(sim.symbols) and not sim.in_outage()
+    if sim.connected:
+        sim._error = (RES_S_OK, 'Success')
+    else:
+        sim._error = (RES_E_INTERNAL_FAIL_INIT, 'IPC initialize failed')
+    return sim.connected
+
+
+def shutdown():
+    sim.connected = False
+    return True
+
+
+def last_error():
+    return sim._error
+
+
+def version():
+    return (500, 4000, 'mt5sim')
+
+
+def terminal_info():
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return SimpleNamespace(connected=True, trade_allowed=sim.trade_allowed, tradeapi_disabled=False,
+                           name='mt5sim', company='mt5sim', ping_last=0)
+
+
+def account_info():
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return SimpleNamespace(login=1, balance=round(sim.balance, 2), equity=sim.equity(), margin_free=sim.equity(),
+                           leverage=sim.leverage, currency=sim.currency, trade_allowed=True, trade_expert=True)
+
+
+def symbol_info(symbol):
+    sim.calls += 1
+    sym = sim.symbols.get(symbol)
+    if not sim.connected:
+        return _offline()
+    if sym is None:
+        return None
+    tick_value = sym.contract_size * sym.point
+    return SimpleNamespace(
+        name=symbol, visible=True, select=True, digits=sym.digits, point=sym.point,
+        spread=sym.spread_points, trade_stops_level=sym.stops_level, trade_contract_size=sym.contract_size,
+        trade_tick_size=sym.point, trade_tick_value=tick_value, volume_min=sym.volume_min,
+        volume_max=sym.volume_max, volume_step=sym.volume_step, filling_mode=sym.filling_mode,
+    )
+
+
+def symbol_select(symbol, enable=True):
+    return symbol in sim.symbols
+
+
+def symbol_info_tick(symbol):
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return sim.tick(symbol)
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return sim.rates_from_pos(symbol, timeframe, start_pos, count)
+
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return sim.rates_range(symbol, timeframe, date_from, date_to)
+
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    return sim.ticks_range(symbol, date_from, date_to)
+
+
+def positions_get(symbol=None, ticket=None, group=None):
+    sim.calls += 1
+    if not sim.connected:
+        return _offline()
+    out = []
+    for pos in sim.positions.values():
+        if (symbol is None or pos.symbol == symbol) and (ticket is None or pos.ticket == ticket):
+            tick = sim.tick(pos.symbol)
+            pos.price_current = tick.bid if pos.type == POSITION_TYPE_BUY else tick.ask
+            sign = 1 if pos.type == POSITION_TYPE_BUY else -1
+            pos.profit = round(sign * (pos.price_current - pos.price_open) * pos.volume
+                               * sim.symbols[pos.symbol].contract_size, 2)
+            out.append(SimpleNamespace(**vars(pos)))
+    return tuple(out)
+
+
+def positions_total():
+    return len(sim.positions)
+
+
+def orders_get(*args, **kwargs):
+    return ()
+
+
+_send_lock = threading.Lock()
+
+
+def order_send(request):
+    sim.calls += 1
+    if not _send_lock.acquire(blocking=False):
+        raise RuntimeError('overlapping order_send calls on one terminal connection')
+    try:
+        if sim.send_latency:
+            time.sleep(sim.send_latency)
+        return sim.order_send(request)
+    finally:
+        _send_lock.release()
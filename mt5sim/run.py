@@ -0,0 +1,108 @@
+"""
+Run the unmodified live bot (``main_metatrader.main``) against the offline
+MetaTrader5 stand-in, faster than real time.
+
+    python mt5sim/run.py EURUSD_M1.csv --symbol EURUSD --quiet
+    python mt5sim/run.py EURUSD_M1.csv --time-scale 20 --reject 10004,10004
+
+The fake module is put first on ``sys.path``, so every ``import MetaTrader5``
+in the bot gets it. The loop's ``sleep``, the session clock
+(``MT5Connector.get_iran_time``), the latency spans and the account-cache /
+watchdog timers run on the virtual clock; nothing else is patched. The run ends when the data is exhausted: the
+bot goes through its Ctrl+C path (flatten + shutdown) and a throughput
+summary is printed.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Replay M1 bars through the live bot with a fake MetaTrader5")
+    p.add_argument('csv', help='M1 OHLC file or bar store source, e.g. store:EURUSD (see backtest.engine.load_ohlc)')
+    p.add_argument('--symbol', default='EURUSD')
+    p.add_argument('--digits', type=int, default=5)
+    p.add_argument('--spread', type=float, default=10, help='spread in points')
+    p.add_argument('--stops-level', type=int, default=0)
+    p.add_argument('--balance', type=float, default=10000.0)
+    p.add_argument('--warmup', type=int, default=None, help='bars of history before the clock starts (default 2*window_size)')
+    p.add_argument('--time-scale', type=float, default=1.0, help='virtual seconds per second the bot sleeps')
+    p.add_argument('--filling', default='0,1', help='accepted ORDER_FILLING_* values (comma separated)')
+    p.add_argument('--no-auto-filling', action='store_true', help='reject requests without type_filling')
+    p.add_argument('--reject', default='', help='retcodes returned by the first order_send calls, e.g. 10004,10030')
+    p.add_argument('--outage', action='append', default=[], metavar='BAR:SECONDS',
+                   help='terminal unreachable for SECONDS starting BAR bars into the replay (repeatable)')
+    p.add_argument('--workdir', default=None, help='cwd for logs/state files (default mt5sim/runs/<timestamp>)')
+    p.add_argument('--quiet', action='store_true', help='no console log lines (files are still written)')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    csv_path = args.csv if args.csv.startswith('store:') else os.path.abspath(args.csv)
+    sys.path.insert(0, HERE)   # fake MetaTrader5 shadows the real package
+    sys.path.insert(1, ROOT)
+    import MetaTrader5 as mt5
+    if not hasattr(mt5, 'sim'):
+        raise SystemExit(f"MetaTrader5 resolved to {mt5.__file__}, not the simulator")
+
+    workdir = args.workdir or os.path.join(HERE, 'runs', datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    from metatrader5_config import MT5_CONFIG, TRADING_CONFIG
+    mt5.sim.reset(balance=args.balance)
+    mt5.load_csv(args.symbol, csv_path, digits=args.digits, spread_points=args.spread,
+                 stops_level=args.stops_level, auto_filling=not args.no_auto_filling,
+                 accepted_filling=[int(x) for x in args.filling.split(',') if x])
+    mt5.sim.script.extend(int(x) for x in args.reject.split(',') if x)
+    warmup = args.warmup if args.warmup is not None else TRADING_CONFIG['window_size'] * 2
+    mt5.sim.start(bars=warmup)
+    for spec in args.outage:
+        bar, seconds = spec.split(':')
+        mt5.sim.outages.append((mt5.clock() + int(bar) * mt5.BAR_SECONDS, float(seconds)))
+    MT5_CONFIG['symbol'] = args.symbol
+    MT5_CONFIG['symbols'] = [args.symbol]
+
+    import main_metatrader
+    import mt5_connector
+    import save_file
+    import account_state
+    import connection_watchdog
+    from analytics import latency
+    if args.quiet:
+        save_file.logger.console = False
+
+    # ساعت مجازی به‌جای زمان واقعی
+    main_metatrader.sleep = lambda seconds: mt5.sleep(seconds * args.time_scale)
+    mt5_connector.MT5Connector.get_iran_time = \
+        lambda self: datetime.fromtimestamp(mt5.clock(), timezone.utc).astimezone(self.iran_tz)
+    latency.time = SimpleNamespace(time=mt5.clock, perf_counter=time.perf_counter)
+    account_state.time = connection_watchdog.time = SimpleNamespace(monotonic=mt5.clock)
+
+    start_clock = mt5.clock()
+    wall = time.perf_counter()
+    try:
+        main_metatrader.main()
+    except mt5.SimulationFinished:
+        pass
+    wall = time.perf_counter() - wall
+    virtual = mt5.clock() - start_clock
+
+    closed = [d for d in mt5.sim.deals if d.entry == 1]
+    print("-" * 50)
+    print(f"📼 Replayed {virtual / 60:.0f} bars ({virtual / 3600:.1f} h virtual) in {wall:.1f} s "
+          f"-> {virtual / max(wall, 1e-9):.0f}x real time, {mt5.sim.calls / max(wall, 1e-9):.0f} API calls/s")
+    print(f"💼 Deals: {len(closed)} closed, balance {mt5.sim.balance:.2f} "
+          f"(P/L {sum(d.profit for d in closed):+.2f}), workdir {workdir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+On-disk snapshot of the live bot's ``position_states``.
+
+Only what cannot be recovered from the terminal is stored per ticket: entry,
+initial risk (the SL has moved since), direction and the stages already applied.
+The file is rewritten atomically (temp file + ``os.replace``) whenever that
+state changes, and reconciled against ``positions_get()`` at startup.
+"""
+import json
+import os
+import tempfile
+
+SNAPSHOT_VERSION = 1
+
+
+class PositionStore:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """{ticket: record} from the snapshot; empty when missing or unreadable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[position_store] ignoring unreadable snapshot {self.path}: {e}")
+            return {}
+        if data.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return {int(ticket): rec for ticket, rec in data.get('positions', {}).items()}
+
+    def save(self, states):
+        """Atomically replace the snapshot with ``states`` ({ticket: state dict with a 'ladder'})."""
+        payload = {
+            'version': SNAPSHOT_VERSION,
+            'positions': {str(ticket): encode_state(st) for ticket, st in states.items()},
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix='.positions-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                json.dump(payload, fh, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def reconcile(self, positions, restore):
+        """
+        Rebuild states for the currently open ``positions`` from the snapshot.
+
+        restore: callable(record, pos) -> state dict. Records of tickets that are no
+        longer open are dropped; open tickets without a record are left to the caller.
+        """
+        records = self.load()
+        states = {}
+        for pos in positions or ():
+            rec = records.get(pos.ticket)
+            if rec is not None:
+                states[pos.ticket] = restore(rec, pos)
+        return states
+
+
+def encode_state(st):
+    return {
+        'entry': st['entry'],
+        'risk': st['risk'],
+        'direction': st['direction'],
+        'done_stages': sorted(st['ladder'].done_stages),
+        'base_tp_R': st.get('base_tp_R'),
+        'commission_locked': st.get('commission_locked', False),
+    }
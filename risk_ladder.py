@@ -0,0 +1,109 @@
+"""
+Stage ladder for dynamic risk management (DYNAMIC_RISK_CONFIG['stages']).
+
+When a position is registered, every stage is turned into an absolute trigger
+price plus the (already rounded) SL/TP it moves to, sorted in the order price
+reaches them. A tick then only compares the current price with the next
+untriggered rung; a jump across several rungs is collapsed into one SL/TP
+modification.
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+
+@dataclass(frozen=True)
+class Rung:
+    stage_id: str
+    trigger: float              # bid (buy) / ask (sell) at which the stage fires
+    sl: float                   # rounded SL the stage locks
+    tp: Optional[float]         # rounded TP, or None to keep the position's TP
+    locked_R: Optional[float]
+
+
+class StageLadder:
+    def __init__(self, direction: str, entry: float, risk: float, rungs: List[Rung]):
+        self.direction = direction
+        self.entry = entry
+        self.risk = risk
+        # buy: prices rise through the triggers, sell: prices fall through them
+        self.rungs = sorted(rungs, key=lambda r: r.trigger, reverse=(direction == 'sell'))
+        self.next = 0           # index of the first untriggered rung
+
+    @classmethod
+    def build(cls, direction, entry, risk, volume, stages, commission_per_lot=0.0,
+              round_price: Callable[[float], float] = float):
+        """
+        Same trigger rules as the per-tick loop it replaces:
+        - 'commission' stage: price profit * volume >= commission_per_lot * volume,
+          SL locked at entry +/- commission_per_lot, TP unchanged
+        - R stage: profit_R >= trigger_R, SL at sl_lock_R (default trigger_R), TP at tp_R if given
+        """
+        sign = 1.0 if direction == 'buy' else -1.0
+        rungs = []
+        for stage in stages:
+            sid = stage.get('id')
+            if stage.get('type') == 'commission':
+                commission_total = commission_per_lot * volume if commission_per_lot else 0.0
+                if commission_total <= 0:
+                    continue
+                offset = commission_total / volume
+                rungs.append(Rung(sid, entry + sign * offset, round_price(entry + sign * offset), None, None))
+                continue
+            trigger_R = stage.get('trigger_R')
+            if trigger_R is None:
+                continue
+            sl_lock_R = stage.get('sl_lock_R', trigger_R)
+            tp_R = stage.get('tp_R')
+            rungs.append(Rung(
+                sid,
+                entry + sign * trigger_R * risk,
+                round_price(entry + sign * sl_lock_R * risk),
+                round_price(entry + sign * tp_R * risk) if tp_R else None,
+                sl_lock_R,
+            ))
+        return cls(direction, entry, risk, rungs)
+
+    # ---------- Per tick ----------
+    @property
+    def next_trigger(self):
+        return self.rungs[self.next].trigger if self.next < len(self.rungs) else None
+
+    def _reached(self, trigger, price):
+        return price >= trigger if self.direction == 'buy' else price <= trigger
+
+    def crossed(self, price) -> List[Rung]:
+        """Untriggered rungs reached by ``price`` (empty list in the common case, O(1))."""
+        end = self.next
+        while end < len(self.rungs) and self._reached(self.rungs[end].trigger, price):
+            end += 1
+        return self.rungs[self.next:end]
+
+    def collapse(self, rungs: List[Rung], current_sl) -> Optional[Rung]:
+        """
+        The single modification for a set of crossed rungs: the tightest SL among them
+        (with that rung's TP). None when it does not improve ``current_sl``.
+        """
+        if not rungs:
+            return None
+        if self.direction == 'buy':
+            best = max(rungs, key=lambda r: r.sl)
+            return best if best.sl > current_sl else None
+        best = min(rungs, key=lambda r: r.sl)
+        return best if best.sl < current_sl else None
+
+    def advance(self, n):
+        self.next = min(len(self.rungs), self.next + n)
+
+    def mark_done(self, stage_ids):
+        """Skip the leading rungs whose stage already ran (state restored after a restart)."""
+        done = set(stage_ids)
+        while self.next < len(self.rungs) and self.rungs[self.next].stage_id in done:
+            self.next += 1
+
+    @property
+    def done_stages(self):
+        return {r.stage_id for r in self.rungs[:self.next]}
+
+    def profit_R(self, price):
+        profit = price - self.entry if self.direction == 'buy' else self.entry - price
+        return profit / self.risk if self.risk else 0.0
@@ -1,17 +1,160 @@
+"""
+Console + file logging for the live bot.
+
+``log`` keeps its old signature. Records below ``LOG_CONFIG['log_level']`` are
+dropped before any formatting. ``msg`` may be a callable (e.g.
+``lambda: f"..."``), which is only called when the record is emitted, so an
+expensive f-string costs nothing when suppressed. Records for the file go to an
+in-memory buffer; a background thread appends them through one persistent
+handle to ``swing_logs_YYYY-MM-DD.txt`` (plain lines, or JSON lines with
+``LOG_CONFIG['format'] = 'json'``) and rotates the file past
+``max_log_size`` MB. The trading thread does no file I/O.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
+
 from colorama import init, Fore
 
+from metatrader5_config import LOG_CONFIG
+
 # راه‌اندازی colorama
 init(autoreset=True)
 
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+
+class BufferedLogger:
+    def __init__(self, level='INFO', save_to_file=True, max_log_size=10, fmt='text', directory='.',
+                 prefix='swing_logs', backup_count=5, flush_interval=0.5, console=True):
+        """
+        max_log_size: MB per file before it is rotated to <name>.1.txt, <name>.2.txt, ...
+        fmt: 'text' (the message only, as before) or 'json' (ts/level/msg per line)
+        """
+        self.threshold = LEVELS.get(str(level).upper(), LEVELS['INFO'])
+        self.save_to_file = save_to_file
+        self.max_bytes = int(max_log_size * 1024 * 1024) if max_log_size else 0
+        self.fmt = fmt
+        self.directory = directory
+        self.prefix = prefix
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.console = console
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._io_lock = threading.Lock()
+        self._fh = None
+        self._day = None
+        self._thread = None
+        self._closed = False
+
+    def enabled(self, level='info'):
+        return LEVELS.get(str(level).upper(), LEVELS['INFO']) >= self.threshold
+
+    def log(self, msg, level='info', color=None, save_to_file=True):
+        if not self.enabled(level):
+            return
+        if callable(msg):
+            msg = msg()
+        if self.console:
+            color_prefix = getattr(Fore, color.upper(), '') if color else ''
+            print(f"{color_prefix}{msg}")
+        if save_to_file and self.save_to_file and not self._closed:
+            self._pending.append((time.time(), level, str(msg)))
+            if self._thread is None:
+                self._start()
+
+    # ---------- Background writer ----------
+    def _start(self):
+        with self._io_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_pending()
+
+    def _write_pending(self):
+        with self._io_lock:
+            wrote = False
+            while self._pending:
+                ts, level, msg = self._pending.popleft()
+                try:
+                    fh = self._handle(ts)
+                    fh.write(self._format(ts, level, msg))
+                    wrote = True
+                    if self.max_bytes and fh.tell() >= self.max_bytes:
+                        self._rotate()
+                except Exception as e:
+                    print(f"خطا در ذخیره لاگ: {e}")
+            if wrote and self._fh is not None:
+                self._fh.flush()
+
+    def _format(self, ts, level, msg):
+        if self.fmt == 'json':
+            return json.dumps({'ts': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+                               'level': str(level).upper(), 'msg': msg}, ensure_ascii=False) + '\n'
+        return f"{msg}\n"
+
+    def _path(self, day, index=0):
+        suffix = f".{index}" if index else ''
+        ext = 'jsonl' if self.fmt == 'json' else 'txt'
+        return os.path.join(self.directory, f"{self.prefix}_{day}{suffix}.{ext}")
+
+    def _handle(self, ts):
+        day = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+        if self._fh is None or day != self._day:
+            if self._fh is not None:
+                self._fh.close()
+            self._day = day
+            self._fh = open(self._path(day), 'a', encoding='utf-8')
+        return self._fh
+
+    def _rotate(self):
+        self._fh.close()
+        self._fh = None
+        for index in range(self.backup_count - 1, 0, -1):
+            src = self._path(self._day, index)
+            if os.path.exists(src):
+                os.replace(src, self._path(self._day, index + 1))
+        if self.backup_count:
+            os.replace(self._path(self._day), self._path(self._day, 1))
+        else:
+            os.remove(self._path(self._day))
+
+    def flush(self):
+        """Write everything buffered so far (blocking)."""
+        self._write_pending()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._write_pending()
+        with self._io_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+logger = BufferedLogger(
+    level=LOG_CONFIG.get('log_level', 'INFO'),
+    save_to_file=LOG_CONFIG.get('save_to_file', True),
+    max_log_size=LOG_CONFIG.get('max_log_size', 10),
+    fmt=LOG_CONFIG.get('format', 'text'),
+    backup_count=LOG_CONFIG.get('backup_count', 5),
+    flush_interval=LOG_CONFIG.get('flush_interval', 0.5),
+)
+atexit.register(logger.close)
+
+
 def log(msg, level='info', color=None, save_to_file=True):
-    color_prefix = getattr(Fore, color.upper(), '') if color else ''
-    print(f"{color_prefix}{msg}")
-
-    if save_to_file:
-        log_filename = f"swing_logs_{datetime.now().strftime('%Y-%m-%d')}.txt"
-        try:
-            with open(log_filename, 'a', encoding='utf-8') as f:
-                f.write(f"{msg}\n")
-        except Exception as e:
-            print(f"خطا در ذخیره لاگ: {e}")
\ No newline at end of file
+    logger.log(msg, level=level, color=color, save_to_file=save_to_file)
@@ -0,0 +1,166 @@
+"""
+Run one SwingFibStrategy per symbol over a single MT5Connector.
+
+Each cycle ``poll`` asks the connector for new bars of every symbol (a 1-bar
+probe when nothing changed) and returns a ``BarEvent`` for each symbol that has
+something to process, using the same first-run / new-data / forced-wait rules
+the single-symbol loop had. ``dispatch`` then feeds the new bars to that
+symbol's strategy and returns its signal, if any.
+
+Every symbol has its own bar buffer (in the connector), strategy state and
+leg threshold scale (1 / pip size from its SymbolSpec), so EURUSD and USDJPY
+legs are both measured in pips.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from metatrader5_config import TRADING_CONFIG
+from strategy import SwingFibStrategy
+
+
+@dataclass
+class BarEvent:
+    symbol: str
+    new_bars: int           # bars appended in this cycle (0 = forming bar re-read)
+    epoch: int              # open time of the newest bar
+    reason: str             # 'first' | 'new' | 'forced'
+    time: Optional[pd.Timestamp] = None
+
+
+class SymbolFeed:
+    """Per-symbol scheduler state."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.strategy = None
+        self.last_time = None
+        self.wait_count = 0
+
+
+class StrategyScheduler:
+    def __init__(self, connector, symbols, threshold=None, window_size=None, timeframe=None,
+                 max_wait_cycles=120, log=None, strategy_factory=None):
+        """
+        connector: MT5Connector (one shared terminal connection)
+        symbols: symbols to trade; each gets its own strategy instance
+        strategy_factory: optional callable(symbol, price_scale, log) -> strategy
+        """
+        self.connector = connector
+        self.threshold = threshold if threshold else TRADING_CONFIG['threshold']
+        self.window_size = window_size or TRADING_CONFIG['window_size']
+        self.timeframe = timeframe
+        self.max_wait_cycles = max_wait_cycles
+        self._log_fn = log
+        self._factory = strategy_factory or self._default_strategy
+        self.feeds: Dict[str, SymbolFeed] = {s: SymbolFeed(s) for s in dict.fromkeys(symbols)}
+
+    @property
+    def symbols(self):
+        return list(self.feeds)
+
+    # ---------- Strategy instances ----------
+    def price_scale(self, symbol):
+        """Leg threshold scale of ``symbol``: price difference * scale = pips."""
+        spec = self.connector.spec(symbol)
+        if not spec or not spec.pip_size:
+            return 10000
+        return round(1.0 / spec.pip_size)
+
+    def _symbol_log(self, symbol):
+        if self._log_fn is None:
+            return None
+        if len(self.feeds) == 1:
+            return self._log_fn
+        log_fn = self._log_fn
+
+        def prefixed(msg, color=None):
+            # پیام lazy (callable) تا زمان چاپ رندر نمی‌شود
+            log_fn((lambda: f'[{symbol}] {msg()}') if callable(msg) else f'[{symbol}] {msg}', color=color)
+        return prefixed
+
+    def _default_strategy(self, symbol, price_scale, log):
+        return SwingFibStrategy(threshold=self.threshold, window_size=self.window_size,
+                                price_scale=price_scale, log=log, tz=self.connector.iran_tz)
+
+    def strategy(self, symbol):
+        feed = self.feeds[symbol]
+        if feed.strategy is None:
+            feed.strategy = self._factory(symbol, self.price_scale(symbol), self._symbol_log(symbol))
+        return feed.strategy
+
+    # ---------- Cycle ----------
+    def poll(self) -> Optional[List[BarEvent]]:
+        """
+        One pass over every symbol. Returns the events to process (possibly empty),
+        or None when no symbol could be read from the terminal.
+        """
+        events = []
+        any_ok = False
+        for feed in self.feeds.values():
+            ok, event = self._poll_symbol(feed)
+            any_ok = any_ok or ok
+            if event is not None:
+                events.append(event)
+        return events if any_ok else None
+
+    def _poll_symbol(self, feed):
+        conn = self.connector
+        symbol = feed.symbol
+        if conn.bars_of(symbol) is None:
+            kwargs = {'timeframe': self.timeframe} if self.timeframe is not None else {}
+            fetched = conn.init_history(count=self.window_size * 2, symbol=symbol, **kwargs)
+        else:
+            fetched = conn.update_history(symbol=symbol)
+        if fetched is None:
+            self._log(symbol, "❌ Failed to get data from MT5", color='red')
+            return False, None
+
+        current = conn.bars_of(symbol).last_time
+        if feed.last_time is None:
+            reason = 'first'
+            self._log(symbol, f"🔄 First run - processing data from {self.bar_time(current)}", color='cyan')
+        elif current != feed.last_time:
+            reason = 'new'
+            self._log(symbol, f"📊 New data received: {self.bar_time(current)} (previous: {self.bar_time(feed.last_time)})", color='cyan')
+        else:
+            feed.wait_count += 1
+            if feed.wait_count % 20 == 0:  # هر 10 ثانیه یک بار لاگ
+                self._log(symbol, f"⏳ Waiting for new data... Current: {self.bar_time(current)} (wait cycles: {feed.wait_count})", color='yellow')
+            if feed.wait_count < self.max_wait_cycles:
+                return True, None
+            # اگر خیلی زیاد انتظار کشیدیم، اجبار به پردازش: کندل در حال تشکیل دوباره خوانده می‌شود
+            self._log(symbol, f"⚠️ Force processing after {feed.wait_count} cycles without new data", color='magenta')
+            reason = 'forced'
+            fetched = conn.update_history(force=True, symbol=symbol) or 0
+            current = conn.bars_of(symbol).last_time
+
+        feed.last_time = current
+        feed.wait_count = 0
+        return True, BarEvent(symbol, fetched, current, reason, self.bar_time(current))
+
+    def dispatch(self, event: BarEvent):
+        """Feed ``event``'s bars (plus the re-read previous bar) to its strategy; returns a Signal or None."""
+        bars = self.connector.bars_of(event.symbol)
+        k = min(len(bars), event.new_bars + 1)
+        return self.strategy(event.symbol).feed(bars.bar(j) for j in range(-k, 0))
+
+    def collect(self, timeout=0.0):
+        """Order intents finished out of band (see sharding.ShardedScheduler); none in-process."""
+        return []
+
+    def close(self):
+        pass
+
+    # ---------- Helpers ----------
+    def bar_time(self, epoch):
+        """Open time ``epoch`` (UTC seconds) as a Timestamp in the connector's Iran timezone; None stays None."""
+        if epoch is None:
+            return None
+        return pd.Timestamp(epoch, unit='s', tz='UTC').tz_convert(self.connector.iran_tz)
+
+    def _log(self, symbol, msg, color=None):
+        log = self._symbol_log(symbol)
+        if log is not None:
+            log(msg, color=color)
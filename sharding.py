@@ -0,0 +1,317 @@
+"""
+Process-per-shard strategy execution with a shared-memory bar feed.
+
+The feeder process owns the MT5 connection (through ``StrategyScheduler.poll``).
+Bars of every symbol are mirrored into a ``SharedBarRing`` (an OHLCRingBuffer
+laid over ``multiprocessing.shared_memory``). Worker processes each run the
+SwingFibStrategy instances of a subset of symbols. They are woken by a small
+message per bar event, read the new bars straight from shared memory and send
+an ``OrderIntent`` back to the feeder, which executes orders through the
+connector. Strategy CPU scales across cores; terminal access stays in one process.
+
+Strategy decision logs are rendered in the worker and sent back on the same
+queue, ahead of the intent they explain, and written by the feeder's logger. A
+worker that exits is restarted and re-seeded from its shared rings; the events
+it had in flight are lost, so the fresh strategy is fed the kept window instead.
+"""
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from bar_buffer import COLUMNS, DTYPES, OHLCRingBuffer
+from scheduler import StrategyScheduler
+
+_HEADER = 2  # int64 slots: [sequence, count]
+
+
+class SharedBarRing:
+    """
+    OHLCRingBuffer whose storage lives in a shared memory block.
+
+    The writer wraps changes in ``begin_write``/``publish``; readers use
+    ``read`` which retries while a write is in progress (seqlock), so
+    they never see a half-written bar.
+    """
+
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity
+        size = _HEADER * 8 + sum(2 * capacity * np.dtype(DTYPES[c]).itemsize for c in COLUMNS)
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self._header = np.ndarray((_HEADER,), dtype=np.int64, buffer=self.shm.buf)
+        offset = _HEADER * 8
+        cols = {}
+        for col in COLUMNS:  # int8 'bullish' is last, so every float/int64 column stays aligned
+            dtype = np.dtype(DTYPES[col])
+            cols[col] = np.ndarray((2 * capacity,), dtype=dtype, buffer=self.shm.buf, offset=offset)
+            offset += 2 * capacity * dtype.itemsize
+        self.buffer = OHLCRingBuffer(capacity, buffers=cols)
+        if self._owner:
+            self._header[:] = 0
+        else:
+            self.buffer.count = int(self._header[1])
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # ---------- Writer ----------
+    def begin_write(self):
+        self._header[0] += 1        # odd: write in progress
+
+    def publish(self):
+        self._header[1] = self.buffer.count
+        self._header[0] += 1        # even: consistent
+
+    def mirror(self, bars, k):
+        """Copy the last ``k`` bars of ``bars`` (an OHLCRingBuffer): same time -> replace, newer -> append."""
+        buf = self.buffer
+        self.begin_write()
+        try:
+            for j in range(-k, 0):
+                b = bars.bar(j)
+                last = buf.last_time
+                if last is not None and b['time'] < last:
+                    continue
+                write = buf.replace_last if last is not None and b['time'] == last else buf.append
+                write(b['time'], b['open'], b['high'], b['low'], b['close'], b['volume'])
+        finally:
+            self.publish()
+
+    # ---------- Reader ----------
+    def read(self, start, stop):
+        """Bars numbered ``start``..``stop - 1`` (absolute, clipped to what is still kept) as dicts."""
+        while True:
+            seq = int(self._header[0])
+            if seq % 2:
+                time.sleep(0)
+                continue
+            count = int(self._header[1])
+            self.buffer.count = count
+            stop = min(stop, count)
+            first = max(start, count - min(count, self.capacity))
+            bars = [self.buffer.bar(k - count) for k in range(first, stop)]
+            if int(self._header[0]) == seq:
+                return bars
+
+    def close(self):
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+@dataclass
+class OrderIntent:
+    symbol: str
+    epoch: int                  # newest bar time the worker evaluated
+    count: int                  # ring bar count the worker has consumed up to
+    signal: Optional[object]    # strategy.Signal, or None (event processed without a signal)
+
+
+def _worker_main(rings, threshold, window_size, inbox, outbox, gen=0, tz=None, log=False):
+    """
+    Worker process: {symbol: (shm name, capacity, price_scale)} -> strategies fed from shared memory.
+    Puts (gen, 'intent', OrderIntent) and, when ``log``, (gen, 'log', (symbol, msg, color)) on ``outbox``.
+    """
+    from strategy import SwingFibStrategy
+
+    def strategy_log(symbol):
+        def put(msg, color=None):
+            outbox.put((gen, 'log', (symbol, msg() if callable(msg) else str(msg), color)))
+        return put if log else None
+
+    attached = {}
+    strategies = {}
+    seen = {}
+    for symbol, (name, capacity, price_scale) in rings.items():
+        attached[symbol] = SharedBarRing(capacity, name=name)
+        strategies[symbol] = SwingFibStrategy(threshold=threshold, window_size=window_size,
+                                              history_size=capacity, price_scale=price_scale,
+                                              log=strategy_log(symbol), tz=tz)
+        seen[symbol] = 0
+    try:
+        while True:
+            msg = inbox.get()
+            if msg is None:
+                break
+            symbol, count = msg
+            # the previously newest bar is re-read: it may have been replaced by its final values
+            bars = attached[symbol].read(max(0, seen[symbol] - 1), count)
+            seen[symbol] = count
+            signal = strategies[symbol].feed(bars) if bars else None
+            outbox.put((gen, 'intent', OrderIntent(symbol, bars[-1]['time'] if bars else 0, count, signal)))
+    finally:
+        for ring in attached.values():
+            ring.shm.close()
+
+
+class ShardedScheduler(StrategyScheduler):
+    """
+    StrategyScheduler whose strategies run in ``workers`` processes.
+
+    ``poll`` is inherited (the feeder still talks to MT5); ``dispatch`` mirrors the
+    event's bars into shared memory and wakes the owning worker instead of running
+    the strategy, and ``collect`` returns the order intents produced so far.
+
+    A worker that falls behind is never lapped: before bars it has not read yet
+    would be overwritten, ``dispatch`` waits for that symbol's acknowledgements.
+    ``dispatch`` and ``collect`` check that the workers are alive; a dead one is
+    restarted (at most ``max_restarts`` times per shard, then RuntimeError).
+    """
+
+    ack_timeout = 30.0  # seconds a lagging worker may take before dispatch gives up
+    max_restarts = 3    # per shard
+
+    def __init__(self, connector, symbols, workers=2, **kwargs):
+        super().__init__(connector, symbols, **kwargs)
+        self.workers = max(1, min(workers, len(self.feeds)))
+        self._ctx = mp.get_context('spawn')
+        self._rings = {}
+        self._inboxes = {}
+        self._procs = []
+        self._shards = []       # per worker: (symbols, {symbol: ring spec})
+        self._gen = []          # per worker: generation, bumped on restart (stale messages are ignored)
+        self._restarts = []
+        self._worker_of = {}
+        self._outbox = None
+        self._ready = []
+        self._inflight = {}
+        self._acked = {}
+        self.pending = 0
+
+    def start(self):
+        """Create shared rings and start the workers (symbols assigned round-robin)."""
+        if self._procs:
+            return
+        capacity = self.window_size * 2
+        self._outbox = self._ctx.Queue()
+        symbols = self.symbols
+        for w in range(self.workers):
+            shard = symbols[w::self.workers]
+            spec = {}
+            for symbol in shard:
+                ring = SharedBarRing(capacity)
+                self._rings[symbol] = ring
+                self._inflight[symbol] = 0
+                self._acked[symbol] = 0
+                self._worker_of[symbol] = w
+                spec[symbol] = (ring.name, capacity, self.price_scale(symbol))
+            self._shards.append((shard, spec))
+            self._gen.append(0)
+            self._restarts.append(0)
+            self._procs.append(self._spawn(w))
+
+    def _spawn(self, w):
+        """Start worker ``w`` with a fresh inbox for its shard."""
+        shard, spec = self._shards[w]
+        inbox = self._ctx.Queue()
+        for symbol in shard:
+            self._inboxes[symbol] = inbox
+        proc = self._ctx.Process(target=_worker_main, name=f'strategy-shard-{w}', daemon=True,
+                                 args=(spec, self.threshold, self.window_size, inbox, self._outbox,
+                                       self._gen[w], self.connector.iran_tz, self._log_fn is not None))
+        proc.start()
+        return proc
+
+    def _check_workers(self):
+        """Restart workers that have exited and re-seed their strategies from the shared rings."""
+        for w, proc in enumerate(self._procs):
+            if proc.is_alive():
+                continue
+            shard, _ = self._shards[w]
+            if self._restarts[w] >= self.max_restarts:
+                raise RuntimeError(f'strategy worker {proc.name} for {", ".join(shard)} exited '
+                                   f'(exitcode={proc.exitcode}) after {self._restarts[w]} restarts')
+            self._restarts[w] += 1
+            self._gen[w] += 1
+            for symbol in shard:
+                self._log(symbol, f"⚠️ Strategy worker {proc.name} exited (exitcode={proc.exitcode}); "
+                                  f"restarting, {self._inflight[symbol]} bar events lost", color='red')
+                self.pending -= self._inflight[symbol]
+                self._inflight[symbol] = 0
+                self._acked[symbol] = 0
+            self._procs[w] = self._spawn(w)
+            for symbol in shard:
+                count = self._rings[symbol].buffer.count
+                if count:
+                    self._inboxes[symbol].put((symbol, count))  # the fresh strategy reads the kept window
+                    self._inflight[symbol] += 1
+                    self.pending += 1
+
+    def dispatch(self, event):
+        """Publish ``event``'s bars to shared memory and notify its worker. Returns None (see collect)."""
+        self.start()
+        self._check_workers()
+        symbol = event.symbol
+        bars = self.connector.bars_of(symbol)
+        ring = self._rings[symbol]
+        # the worker re-reads from its last acknowledged bar - 1; keep that bar in the ring
+        deadline = time.monotonic() + self.ack_timeout
+        while self._inflight[symbol] and \
+                ring.buffer.count + event.new_bars - max(0, self._acked[symbol] - 1) > ring.capacity:
+            if not self._drain(timeout=min(0.5, max(0.0, deadline - time.monotonic()))):
+                self._check_workers()
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f'strategy worker for {symbol} is not responding')
+        ring.mirror(bars, min(len(bars), event.new_bars + 1))
+        self._inboxes[symbol].put((symbol, ring.buffer.count))
+        self._inflight[symbol] += 1
+        self.pending += 1
+        return None
+
+    def _drain(self, timeout=0.0):
+        """Move finished intents from the workers into ``_ready``; False when nothing arrived in time."""
+        try:
+            gen, kind, payload = self._outbox.get(timeout=timeout) if timeout > 0 else self._outbox.get_nowait()
+        except queue.Empty:
+            return False
+        symbol = payload[0] if kind == 'log' else payload.symbol
+        if gen != self._gen[self._worker_of[symbol]]:
+            return True     # from a worker that has since been restarted
+        if kind == 'log':
+            self._log(*payload)
+            return True
+        intent = payload
+        self.pending -= 1
+        self._inflight[intent.symbol] -= 1
+        self._acked[intent.symbol] = intent.count
+        if intent.signal is not None:
+            self._ready.append(intent)
+        return True
+
+    def collect(self, timeout=0.0):
+        """
+        Order intents with a signal returned by the workers. Waits up to ``timeout``
+        seconds for outstanding events and returns as soon as every dispatched
+        event has been answered (0 = only what is already there).
+        """
+        self._check_workers()
+        deadline = time.monotonic() + timeout
+        while self.pending:
+            if not self._drain(min(0.5, max(0.0, deadline - time.monotonic()))):
+                self._check_workers()
+                if time.monotonic() >= deadline:
+                    break
+        intents, self._ready = self._ready, []
+        return intents
+
+    def close(self):
+        for inbox in {id(q): q for q in self._inboxes.values()}.values():
+            inbox.put(None)
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for ring in self._rings.values():
+            ring.close()
+        self._procs = []
+        self._shards = []
+        self._gen = []
+        self._restarts = []
+        self._rings = {}
+        self._inboxes = {}
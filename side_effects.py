@@ -0,0 +1,191 @@
+"""
+Bounded background dispatcher for the trade path's side effects.
+
+Signal/trade CSV rows (analytics.hooks) and similar work are enqueued as
+small records (callable + raw fields) and run on one worker thread, so the
+time from signal to ``order_send`` never waits on disk. Order emails go to a
+separate dispatcher (``email_effects``) with its own worker, so a slow SMTP
+server never holds up the trade CSV writes either. Formatting (email bodies
+etc.) happens in the handlers, on the worker.
+
+Ordering is by priority (HIGH first), then submission order. The queue is
+bounded; when it is full a new record evicts a pending one of lower priority,
+otherwise the policy decides:
+    DROP      drop the new record (counted in ``stats``)
+    COALESCE  records with the same ``key`` replace the pending one in place,
+              e.g. only the latest market snapshot per symbol is written
+    BLOCK     wait up to ``block_timeout`` for room (back-pressure), then drop
+"""
+import atexit
+import heapq
+import itertools
+import threading
+
+HIGH, NORMAL, LOW = 0, 1, 2
+DROP, COALESCE, BLOCK = 'drop', 'coalesce', 'block'
+
+
+class SideEffectDispatcher:
+    def __init__(self, maxsize=1000, block_timeout=0.05, autostart=True, name='side-effects'):
+        self.maxsize = maxsize
+        self.block_timeout = block_timeout
+        self.name = name
+        self.autostart = autostart
+        self.stats = {'submitted': 0, 'done': 0, 'dropped': 0, 'coalesced': 0, 'evicted': 0, 'failed': 0}
+        self._heap = []                 # [priority, seq, (fn, args, kwargs) or None when removed, key]
+        self._keys = {}                 # key -> heap entry (COALESCE)
+        self._live = 0
+        self._busy = False
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    # ---------- Producer (hot path) ----------
+    def submit(self, fn, *args, priority=NORMAL, policy=DROP, key=None, **kwargs):
+        """
+        Enqueue ``fn(*args, **kwargs)``. Never raises and never blocks longer than
+        ``block_timeout`` (BLOCK). Returns False when the record was dropped.
+        ``priority``/``policy``/``key`` are reserved and not passed to ``fn``.
+        """
+        if self.autostart:
+            self.start()
+        with self._cond:
+            self.stats['submitted'] += 1
+            if policy == COALESCE and key is not None:
+                entry = self._keys.get(key)
+                if entry is not None and entry[2] is not None:
+                    entry[2] = (fn, args, kwargs)
+                    self.stats['coalesced'] += 1
+                    return True
+            if self._live >= self.maxsize and not self._evict_below(priority):
+                if policy == BLOCK:
+                    self._cond.wait_for(lambda: self._live < self.maxsize, timeout=self.block_timeout)
+                if self._live >= self.maxsize:
+                    self.stats['dropped'] += 1
+                    return False
+            entry = [priority, next(self._seq), (fn, args, kwargs), key]
+            heapq.heappush(self._heap, entry)
+            if policy == COALESCE and key is not None:
+                self._keys[key] = entry
+            self._live += 1
+            self._cond.notify_all()
+            return True
+
+    def _evict_below(self, priority):
+        """Remove the newest pending record with a lower priority than ``priority``; True if one was removed."""
+        victim = None
+        for entry in self._heap:
+            if entry[2] is not None and entry[0] > priority and (
+                    victim is None or (entry[0], entry[1]) > (victim[0], victim[1])):
+                victim = entry
+        if victim is None:
+            return False
+        self._discard(victim)
+        self.stats['evicted'] += 1
+        return True
+
+    def _discard(self, entry):
+        entry[2] = None
+        if entry[3] is not None and self._keys.get(entry[3]) is entry:
+            del self._keys[entry[3]]
+        self._live -= 1
+
+    # ---------- Worker ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    entry = heapq.heappop(self._heap)
+                    job = entry[2]
+                    self._discard(entry)
+                    self._busy = True
+                    self._cond.notify_all()
+                    return job
+                if self._stopping:
+                    return None
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            fn, args, kwargs = job
+            try:
+                fn(*args, **kwargs)
+                ok = True
+            except Exception as e:
+                ok = False
+                print(f"[side_effects] {getattr(fn, '__name__', fn)} failed: {e}")
+            with self._cond:
+                self.stats['done' if ok else 'failed'] += 1
+                self._busy = False
+                self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return self._live
+
+    def flush(self, timeout=None):
+        """Wait until every queued record has run. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._live == 0 and not self._busy, timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """Run what is queued (up to ``timeout``) and stop the worker."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+
+# ---------- Handlers (run on the worker) ----------
+def email_new_order(symbol, side, swing, entry, sl, tp, at):
+    from email_notifier import send_trade_email
+    send_trade_email(
+        subject=f"Ver2: NEW {side} ORDER {symbol}",
+        body=(
+            f"Time: {at}\n"
+            f"Symbol: {symbol}\n"
+            f"Type: {side} ({swing} Swing)\n"
+            f"Entry: {entry}\n"
+            f"SL: {sl}\n"
+            f"TP: {tp}\n"
+        ),
+    )
+
+
+def email_order_result(ticket, price, volume):
+    from email_notifier import send_trade_email
+    send_trade_email(
+        subject="Ver2: Last order result",
+        body=(
+            f"Ticket={ticket}\n"
+            f"Price={price}\n"
+            f"Volume={volume}\n"
+        ),
+    )
+
+
+# یک dispatcher مشترک برای main و connector؛ در خروج، کارهای باقیمانده اجرا می‌شوند
+effects = SideEffectDispatcher()
+atexit.register(effects.close)
+# ایمیل‌ها صف و worker جدا دارند تا SMTP کند، نوشتن CSV معاملات را متوقف نکند
+email_effects = SideEffectDispatcher(maxsize=100, name='side-effects-email')
+atexit.register(email_effects.close)
@@ -0,0 +1,74 @@
+"""
+Everything ``calculate_volume_by_risk`` needs, gathered before a signal fires.
+
+``SizingContext`` holds the account balance, the symbol's ``SymbolSpec`` (tick
+size/value, volume limits) and the leverage cap for one symbol. ``MT5Connector.refresh_sizing`` rebuilds the
+contexts from the account-state and symbol-spec caches once per loop
+iteration (the account cache re-reads the terminal on its TTL or after trade
+events, and each new account snapshot also re-reads the symbol's tick
+size/value, which moves with price for non-USD quotes), so sizing an order on
+the entry path is arithmetic only.
+"""
+from dataclasses import dataclass
+
+from symbol_spec import SymbolSpec
+
+MAX_LEVERAGE_FACTOR = 0.02  # حداکثر 2% اکوییتی در ریسک قیمت
+
+
+@dataclass(frozen=True)
+class SizingContext:
+    spec: SymbolSpec
+    balance: float
+    fallback_lot: float                  # returned when the risk cannot be computed
+    max_risk_fraction: float = MAX_LEVERAGE_FACTOR
+    fetched_at: float = 0.0              # AccountState.fetched_at it was built from
+
+    @classmethod
+    def build(cls, spec, state, fallback_lot, max_risk_fraction=MAX_LEVERAGE_FACTOR):
+        """From a SymbolSpec and an AccountState; None when either is unavailable."""
+        if spec is None or state is None or not state.account_ok:
+            return None
+        return cls(
+            spec=spec,
+            balance=state.balance,
+            fallback_lot=fallback_lot,
+            max_risk_fraction=max_risk_fraction,
+            fetched_at=state.fetched_at,
+        )
+
+    @property
+    def symbol(self):
+        return self.spec.symbol
+
+    def normalize_volume(self, vol):
+        return self.spec.normalize_volume(vol)
+
+    def volume_by_risk(self, entry, sl, tick, risk_pct=0.01):
+        """Position sizing with price risk + current spread (commission removed)."""
+        tick_size, tick_value = self.spec.tick_size, self.spec.tick_value
+        if not tick_size or not tick_value:
+            return self.fallback_lot
+
+        risk_money = self.balance * float(risk_pct)
+
+        risk_points = abs(entry - sl) / float(tick_size)
+        price_risk_per_lot = risk_points * float(tick_value)
+
+        spread_points = abs(getattr(tick, 'ask', 0.0) - getattr(tick, 'bid', 0.0)) / float(tick_size)
+        spread_cost_per_lot = spread_points * float(tick_value)
+
+        total_cost_per_lot = price_risk_per_lot + spread_cost_per_lot
+        if total_cost_per_lot <= 0:
+            return self.fallback_lot
+
+        vol = risk_money / total_cost_per_lot
+
+        # اگر ریسک پولی هر 1 لات خیلی کوچک شده و vol بسیار بزرگ است، کلمپ کن
+        if price_risk_per_lot <= 0:
+            return self.fallback_lot
+        max_allowed_vol = (self.balance * self.max_risk_fraction) / price_risk_per_lot
+        if vol > max_allowed_vol:
+            vol = max_allowed_vol
+
+        return self.normalize_volume(vol)
@@ -0,0 +1,365 @@
+"""
+Bar-driven swing/fib decision engine (strategy "swing_fib_v1").
+
+``SwingFibStrategy`` holds everything the live loop in ``main_metatrader.main``
+used to keep in local variables: the leg detector, the bar window, the fib
+state (phase 1 creation, phase 2 updates, first/second 0.705 touch) and the
+window reset. It has no MT5 or file dependencies, so the live bot and the
+backtester drive exactly the same logic: feed bars, get an optional ``Signal``.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from analytics import latency
+from bar_buffer import OHLCRingBuffer
+from fibo_calculate import fibonacci_retracement
+from get_legs import LegDetector
+from metatrader5_config import TRADING_CONFIG
+from swing import get_swing_points
+from utils import BotState
+
+
+@dataclass
+class Signal:
+    direction: str          # 'buy' | 'sell'
+    swing_type: str         # swing type at the time of the signal (for the order comment)
+    fib_levels: Dict[str, float]
+    time: int               # open time of the triggering bar (epoch seconds)
+    close: float            # close of the triggering bar
+
+
+class _BarTime:
+    """Epoch seconds rendered as a (tz-aware) timestamp only when formatted into a log line."""
+    __slots__ = ('epoch', 'tz')
+
+    def __init__(self, epoch, tz):
+        self.epoch = epoch
+        self.tz = tz
+
+    def __str__(self):
+        ts = pd.Timestamp(self.epoch, unit='s', tz='UTC')
+        return str(ts.tz_convert(self.tz) if self.tz is not None else ts)
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+
+class SwingFibStrategy:
+    def __init__(self, threshold=None, window_size=None, history_size=None, price_scale=10000,
+                 max_legs=50, log=None, tz=None):
+        """
+        threshold: leg threshold (pips, as in get_legs); default TRADING_CONFIG['threshold']
+        window_size: bars kept in the leg window after a reset; default TRADING_CONFIG['window_size']
+        history_size: bars kept in memory (default 2 * window_size, like the live fetch)
+        log: optional callable(msg, color=None) for decision traces; msg may be a
+             zero-argument callable, rendered only if the line is emitted (save_file.log)
+        tz: timezone used to render bar times in log lines
+        """
+        self.threshold = threshold if threshold else TRADING_CONFIG['threshold']
+        self.window_size = window_size or TRADING_CONFIG['window_size']
+        self.bars = OHLCRingBuffer(history_size or self.window_size * 2)
+        self.detector = LegDetector(threshold=self.threshold, price_scale=price_scale, max_legs=max_legs)
+        self._log_fn = log
+        self.tz = tz
+
+        self.state = BotState()
+        self.start_index = 0          # position of the leg window start inside the kept bars
+        self._anchor = 0              # absolute bar number (bars.count based) of the detector's bar 0
+        self.last_swing_type = None
+        self.swing_type = None
+        self.fib_index = None
+        self.fib0_point = None
+        self.last_leg1_value = None
+        self.start_price = None
+        self.end_price = None
+        self.fib_count = 1
+
+    # ---------- Feeding ----------
+    def on_bar(self, bar) -> Optional[Signal]:
+        """Consume one bar and evaluate. A bar with the same time as the newest one replaces it."""
+        return self.feed([bar])
+
+    def feed(self, bars: Iterable) -> Optional[Signal]:
+        """
+        Consume bars (oldest first) and evaluate once on the newest.
+
+        A bar with the time of the newest stored bar replaces it (a forming bar that
+        has since closed), older bars are ignored and newer ones are appended.
+        """
+        fed = False
+        for bar in bars:
+            fed = self._ingest(_as_bar(bar)) or fed
+        if not fed:
+            return None
+        return self._evaluate()
+
+    def warmup(self, bars: Iterable):
+        """Load bars without evaluating (e.g. history before the first live bar)."""
+        for bar in bars:
+            self._ingest(_as_bar(bar))
+
+    def _ingest(self, bar):
+        last_time = self.bars.last_time
+        if last_time is not None and bar['time'] < last_time:
+            return False
+        if last_time is not None and bar['time'] == last_time:
+            self.bars.replace_last(bar['time'], bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'])
+            if self.detector.bar_count and self.detector.last_time == bar['time']:
+                self.detector.replace_last(bar)
+            return True
+        self.bars.append(bar['time'], bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'])
+        if self.detector.bar_count:
+            self.detector.update(bar)
+        return True
+
+    # ---------- Window ----------
+    def reset_window(self):
+        """State reset + leg window restarted on the last ``window_size`` bars."""
+        self.state.reset()
+        self.start_index = max(0, len(self.bars) - self.window_size)
+        self._seed_detector()
+        self._log(f'Reset state -> new start_index={self.start_index} (slice len={len(self.bars) - self.start_index})', color='magenta')
+
+    def _seed_detector(self):
+        v = self.bars.view()
+        s = self.start_index
+        self.detector.seed_arrays(v.time[s:], v.open[s:], v.high[s:], v.low[s:], v.close[s:])
+        self._anchor = self.bars.count - len(self.bars) + s
+
+    def _sync_detector(self):
+        if self.detector.bar_count == 0:
+            self._seed_detector()
+            return
+        # swing check needs every bar of the last 3 legs inside the kept bars
+        recent = self.detector.last_legs()
+        oldest = self.bars.count - len(self.bars)
+        if recent and self._anchor + recent[0]['start_pos'] < oldest:
+            self._seed_detector()
+
+    # ---------- Decision ----------
+    def _evaluate(self) -> Optional[Signal]:
+        state = self.state
+        self._sync_detector()
+        latency.mark('legs')
+        bar = self.bars.bar(-1)
+        bar['status'] = 'bullish' if bar['bullish'] else 'bearish'
+        t = _BarTime(bar['time'], self.tz)
+
+        legs = self.detector.legs
+        self._log(f'First len legs: {len(legs)}', color='green')
+
+        if len(legs) > 2:
+            legs = legs[-3:]
+            v = self.bars.view()
+            data = {'status': np.where(v.bullish == 1, 'bullish', 'bearish'), 'close': v.close}
+            offset = self._anchor - (self.bars.count - len(self.bars))
+            swing_type, is_swing = get_swing_points(data=data, legs=legs, offset=offset)
+            latency.mark('swing')
+            self.swing_type = swing_type
+
+            if is_swing == False and state.fib_levels is None:
+                self._log(f'No swing or fib levels and legs>2', color='blue')
+                self._log(lambda: self._legs_line(legs), color='yellow')
+
+            if is_swing or state.fib_levels:
+                self._log(f'1- is_swing or fib_levels is not None code:411112', color='blue')
+                self._log(lambda: f'{swing_type} | {self._legs_line(legs)}', color='yellow')
+
+                # فاز 1: تشخیص اولیه swing
+                if is_swing and state.fib_levels is None:
+                    self._log(f'is_swing and fib_levels is None code:4113312', color='yellow')
+                    self.last_swing_type = swing_type
+                    if swing_type == 'bullish':
+                        if bar['close'] >= legs[0]['end_value']:
+                            self.start_price = bar['high']
+                            self.end_price = legs[1]['end_value']
+                            if bar['high'] >= legs[1]['end_value']:
+                                self._log(f'The {self.fib_count} of fib_levels value code:4116455 {t}', color='green')
+                                state.fib_levels = fibonacci_retracement(end_price=self.end_price, start_price=self.start_price)
+                                self._mark_fib0(legs, offset)
+                                legs = legs[-2:]
+                            elif state.fib_levels and bar['low'] < state.fib_levels['1.0']:
+                                self.reset_window()
+                                legs = []
+                            if state.fib_levels:
+                                self._log(f'fib_levels: {state.fib_levels}', color='yellow')
+                                self._log(f'fib_index: {self._time_str(self.fib_index)}', color='yellow')
+                    elif swing_type == 'bearish':
+                        if bar['close'] <= legs[0]['end_value']:
+                            self.start_price = bar['low']
+                            self.end_price = legs[1]['end_value']
+                            if bar['low'] <= legs[1]['end_value']:
+                                self._log(f'The {self.fib_count} of fib_levels value code:4126455 {t}', color='green')
+                                state.fib_levels = fibonacci_retracement(start_price=self.start_price, end_price=self.end_price)
+                                self._mark_fib0(legs, offset)
+                                legs = legs[-2:]
+                            elif state.fib_levels and bar['high'] > state.fib_levels['1.0']:
+                                self.reset_window()
+                                legs = []
+                            if state.fib_levels:
+                                self._log(f'fib_levels: {state.fib_levels}', color='yellow')
+                                self._log(f'fib_index: {self._time_str(self.fib_index)}', color='yellow')
+
+                # فاز 2: به‌روزرسانی در swing مشابه - تنها در صورت یکسان بودن جهت
+                elif is_swing and state.fib_levels and self.last_swing_type == swing_type:
+                    self._log(f'is_swing and state.fib_levels and last_swing_type == swing_type code:4213312', color='yellow')
+                    if swing_type == 'bullish':
+                        if bar['high'] >= legs[1]['end_value']:
+                            self._log(f'The {self.fib_count} of fib_levels value update code:9916455 {t}', color='green')
+                            self.start_price = bar['high']
+                            self.end_price = legs[1]['end_value']
+                            state.fib_levels = fibonacci_retracement(start_price=self.start_price, end_price=self.end_price)
+                            self._mark_fib0(legs, offset)
+                            legs = legs[-2:]
+                        elif bar['low'] <= state.fib_levels['0.705']:
+                            self._touch_705(bar, 'up', 'code:7318455', 'code:7218455', t)
+                        elif state.fib_levels and bar['low'] < state.fib_levels['1.0']:
+                            self.reset_window()
+                            legs = []
+                    elif swing_type == 'bearish':
+                        if bar['low'] <= legs[1]['end_value']:
+                            self._log(f'The {self.fib_count} of fib_levels value update code:9916455 {t}', color='green')
+                            self.start_price = bar['low']
+                            self.end_price = legs[1]['end_value']
+                            state.fib_levels = fibonacci_retracement(start_price=self.start_price, end_price=self.end_price)
+                            self._mark_fib0(legs, offset)
+                            legs = legs[-2:]
+                        elif bar['high'] >= state.fib_levels['0.705']:
+                            self._touch_705(bar, 'down', 'code:6328455', 'code:6228455', t)
+                        elif state.fib_levels and bar['high'] > state.fib_levels['1.0']:
+                            self.reset_window()
+                            legs = []
+
+                self.last_swing_type = swing_type
+
+        elif len(legs) < 3:
+            if state.fib_levels:
+                if self.last_swing_type == 'bullish' or self.swing_type == 'bullish':
+                    if state.fib_levels['0.0'] < bar['high']:
+                        self._log(f'update fib_levels value code:5117455 {t}', color='green')
+                        self.start_price = bar['high']
+                        state.fib_levels = fibonacci_retracement(start_price=self.start_price, end_price=self.end_price)
+                        self.fib0_point = len(self.bars) - 1
+                        self.fib_index = bar['time']
+                    elif bar['low'] <= state.fib_levels['0.705']:
+                        self._touch_705(bar, 'up', '', 'code:4118455', t)
+                if self.last_swing_type == 'bearish' or self.swing_type == 'bearish':
+                    if state.fib_levels['0.0'] > bar['low']:
+                        self._log(f'update fib_levels value code:5127455 {t}', color='green')
+                        self.start_price = bar['low']
+                        state.fib_levels = fibonacci_retracement(start_price=self.start_price, end_price=self.end_price)
+                        self.fib0_point = len(self.bars) - 1
+                        self.fib_index = bar['time']
+                    elif bar['high'] >= state.fib_levels['0.705']:
+                        self._touch_705(bar, 'down', '', 'code:5128455', t)
+            if len(legs) == 2:
+                self._log(f'leg0: {self._time_str(legs[0]["start"])}, {self._time_str(legs[0]["end"])}, '
+                          f'leg1: {self._time_str(legs[1]["start"])}, {self._time_str(legs[1]["end"])}', color='lightcyan_ex')
+            if len(legs) == 1:
+                self._log(f'leg0: {self._time_str(legs[0]["start"])}, {self._time_str(legs[0]["end"])}', color='lightcyan_ex')
+
+        signal = None
+        if state.true_position and (self.last_swing_type == 'bullish' or self.swing_type == 'bullish'):
+            signal = Signal('buy', self.swing_type, dict(state.fib_levels), bar['time'], bar['close'])
+        elif state.true_position and (self.last_swing_type == 'bearish' or self.swing_type == 'bearish'):
+            signal = Signal('sell', self.swing_type, dict(state.fib_levels), bar['time'], bar['close'])
+        if signal is not None:
+            latency.mark('signal')
+            # هر سیگنال (موفق یا ناموفق در اجرا) وضعیت و پنجره را ریست می‌کند
+            self.reset_window()
+            legs = []
+
+        self._log(f'len(legs): {len(legs)} | start_index: {self.start_index}', color='lightred_ex')
+        return signal
+
+    def _mark_fib0(self, legs, offset):
+        self.fib0_point = len(self.bars) - 1
+        self.fib_index = self.bars.last_time
+        self.last_leg1_value = legs[1]['end_pos'] + offset
+        self.fib_count += 1
+
+    def _touch_705(self, bar, side, first_code, second_code, t):
+        attr = 'last_touched_705_point_up' if side == 'up' else 'last_touched_705_point_down'
+        touched = getattr(self.state, attr)
+        if touched is None:
+            self._log(f'first touch 705 point {first_code}'.rstrip(), color='green' if side == 'up' else 'red')
+            setattr(self.state, attr, dict(bar))
+        elif bar['status'] != touched['status']:
+            self._log(f'Second touch 705 point {second_code} {t}', color='green')
+            self.state.true_position = True
+
+    # ---------- Logging helpers ----------
+    def _log(self, msg, color=None):
+        if self._log_fn is not None:
+            self._log_fn(msg, color=color)
+
+    def _time_str(self, epoch):
+        return _BarTime(epoch, self.tz) if epoch is not None else None
+
+    def _legs_line(self, legs):
+        return ' '.join(f"{self._time_str(leg['start'])} {self._time_str(leg['end'])}" for leg in legs)
+
+
+def _as_bar(bar):
+    """Normalize a bar (dict, Series row or namedtuple) to a dict with epoch-second 'time'."""
+    if isinstance(bar, dict):
+        time = bar.get('time', bar.get('timestamp'))
+        get = bar.get
+    elif hasattr(bar, 'index') and hasattr(bar, 'name') and not isinstance(bar, tuple):
+        time = bar.name
+        get = bar.get
+    else:
+        time = getattr(bar, 'Index', None)
+        if time is None:
+            time = getattr(bar, 'time', None)
+        get = lambda key, default=None: getattr(bar, key, default)
+    if isinstance(time, (pd.Timestamp, np.datetime64)) or hasattr(time, 'timestamp'):
+        time = int(pd.Timestamp(time).timestamp())
+    return {
+        'time': int(time),
+        'open': float(get('open')),
+        'high': float(get('high')),
+        'low': float(get('low')),
+        'close': float(get('close')),
+        'volume': float(get('volume', 0.0) or 0.0),
+    }
+
+
+def plan_stops(direction, entry, fib_levels, pip_size, min_stop_distance, win_ratio, min_pips=2.0):
+    """
+    SL/TP for a signal, as the live bot places them.
+
+    SL is fib 1.0 when price is within ``min_pips`` of fib 0.9, otherwise fib 0.9,
+    falling back to 1.0 when 0.9 is on the wrong side, then pushed to at least
+    max(min_pips, broker stop distance) away from entry. TP = entry +/- risk * win_ratio.
+    Returns (sl, tp), or None when no valid SL exists.
+    """
+    two_pips = min_pips * pip_size
+    min_abs_dist = max(min_pips * pip_size, min_stop_distance)
+    is_close_to_09 = abs(fib_levels['0.9'] - entry) <= two_pips
+    candidate_sl = fib_levels['1.0'] if is_close_to_09 else fib_levels['0.9']
+
+    if direction == 'buy':
+        if candidate_sl >= entry:
+            candidate_sl = float(fib_levels['1.0'])
+        if (entry - candidate_sl) < min_abs_dist:
+            adj = entry - min_abs_dist
+            if adj <= 0:
+                return None
+            candidate_sl = float(adj)
+        stop = float(candidate_sl)
+        if stop >= entry:
+            return None
+        return stop, entry + abs(entry - stop) * win_ratio
+
+    if candidate_sl <= entry:
+        candidate_sl = float(fib_levels['1.0'])
+    if (candidate_sl - entry) < min_abs_dist:
+        candidate_sl = float(entry + min_abs_dist)
+    stop = float(candidate_sl)
+    if stop <= entry:
+        return None
+    return stop, entry - abs(entry - stop) * win_ratio
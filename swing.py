@@ -1,7 +1,37 @@
+import numpy as np
 from colorama import Fore
 
 
-def get_swing_points(data, legs):
+def _pullback_arrays(data, s_index, e_index):
+    """status / close arrays of bars s_index..e_index (inclusive) without building row Series.
+
+    ``data`` is a DataFrame or any mapping of 'status'/'close' to arrays.
+    """
+    status = np.asarray(data['status'])[s_index:e_index + 1]
+    close = np.asarray(data['close'], dtype=np.float64)[s_index:e_index + 1]
+    return status, close
+
+
+def count_pullback_candles(mask, close, falling=True):
+    """
+    Count the pullback candles that confirm a swing.
+
+    Among the candles selected by ``mask`` (bearish for an up swing, bullish for a
+    down swing), the first one sets the reference close and every later one that
+    closes beyond it (lower if ``falling``, higher otherwise) counts and becomes
+    the new reference. The reference is therefore the running min/max of the
+    selected closes, which lets the count be done with one accumulate.
+    """
+    closes = close[mask]
+    if len(closes) < 2:
+        return 0
+    if falling:
+        return int(np.count_nonzero(closes[1:] < np.minimum.accumulate(closes)[:-1]))
+    return int(np.count_nonzero(closes[1:] > np.maximum.accumulate(closes)[:-1]))
+
+
+def get_swing_points(data, legs, offset=0):
+    # legs carry integer bar positions (start_pos/end_pos); offset = position of the legs' bar 0 inside data
     if len(legs) == 3:
         
         s_index = 0
@@ -11,26 +41,12 @@ def get_swing_points(data, legs):
         if legs[1]['end_value'] > legs[0]['start_value'] and legs[0]['end_value'] > legs[1]['end_value']:
             
             ### Chek true swing ###
-            s_index = data.index.tolist().index(legs[1]['start'])
-            e_index = data.index.tolist().index(legs[1]['end'])
-            true_candles = 0
-            first_candle = False
+            s_index = legs[1]['start_pos'] + offset
+            e_index = legs[1]['end_pos'] + offset
+            status, close = _pullback_arrays(data, s_index, e_index)
 
-            for k in range(s_index, e_index+1):  # Check the current poolback for have 3 bearish candles
-                
-                if data.iloc[k]['status'] == 'bearish':   # If current candle is bearish for check swing
-                    
-                    if first_candle:  # If first candle of poolback
-                        if data.iloc[k]['close'] < last_candle_close:  # If last close is less than current candle close
-                            true_candles += 1
-                            last_candle_close = data.iloc[k]['close']
-                            
-                    else:  # If not first candle of poolback give value
-                        last_candle_close = data.iloc[k]['close']
-                    
-                    first_candle = True
-            
-            if true_candles >= 3:
+            # Check the current poolback for have 3 bearish candles with lower closes
+            if count_pullback_candles(status == 'bearish', close, falling=True) >= 3:
                 swing_type = 'bullish'
                 is_swing = True
             
@@ -38,26 +54,12 @@ def get_swing_points(data, legs):
         elif legs[1]['end_value'] < legs[0]['start_value'] and legs[0]['end_value'] < legs[1]['end_value']:
 
             ### Chek true swing ###
-            s_index = data.index.tolist().index(legs[1]['start'])
-            e_index = data.index.tolist().index(legs[1]['end'])
-            true_candles = 0
-            first_candle = False
+            s_index = legs[1]['start_pos'] + offset
+            e_index = legs[1]['end_pos'] + offset
+            status, close = _pullback_arrays(data, s_index, e_index)
 
-            for k in range(s_index, e_index+1):  # Check the current poolback for have 3 bullish candles
-                
-                if data.iloc[k]['status'] == 'bullish':   # If current candle is bullish for check swing
-                    
-                    if first_candle:  # If first candle of poolback
-                        if data.iloc[k]['close'] > last_candle_close:  # If last close is more than current candle close
-                            true_candles += 1
-                            last_candle_close = data.iloc[k]['close']
-                            
-                    else:  # If not first candle of poolback give value
-                        last_candle_close = data.iloc[k]['close']
-                    
-                    first_candle = True
-                
-            if true_candles >= 3:
+            # Check the current poolback for have 3 bullish candles with higher closes
+            if count_pullback_candles(status == 'bullish', close, falling=False) >= 3:
                 swing_type = 'bearish'
                 is_swing = True
 
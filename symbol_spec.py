@@ -0,0 +1,105 @@
+"""
+Per-symbol contract metadata, read from the terminal once and reused.
+
+``mt5.symbol_info`` is an IPC round trip to the terminal; the values the bot needs
+from it (digits, point, stops level, volume limits, tick size/value, filling mode)
+only change on reconnect or when the broker edits the contract. ``SymbolSpecCache``
+loads a ``SymbolSpec`` on first use and keeps it until ``refresh``/``invalidate``.
+The exception is tick_value for symbols not quoted in the account currency, which
+follows price; ``MT5Connector.refresh_sizing`` re-reads it on the account-cache TTL.
+"""
+from dataclasses import dataclass
+from threading import Lock
+
+
+@dataclass(frozen=True)
+class SymbolSpec:
+    symbol: str
+    digits: int
+    point: float
+    pip_size: float          # 10 * point for 5/3-digit symbols, else point
+    stops_level: int         # broker minimum stop distance in points
+    volume_step: float
+    volume_min: float
+    volume_max: float
+    tick_size: float
+    tick_value: float
+    filling_mode: int
+    visible: bool = True
+
+    @classmethod
+    def from_info(cls, symbol, info):
+        """Build from an ``mt5.symbol_info`` result (same fallbacks the connector used inline)."""
+        point = float(info.point)
+        digits = int(info.digits)
+        step = getattr(info, 'volume_step', 0) or 0.01
+        tick_size = getattr(info, 'trade_tick_size', None) or getattr(info, 'tick_size', None) or point
+        tick_value = getattr(info, 'trade_tick_value', None) or getattr(info, 'tick_value', None)
+        if tick_value is None:
+            contract = getattr(info, 'trade_contract_size', None)
+            # Approximation: value of one tick_size move for 1 lot (USD-quoted pairs on USD accounts)
+            tick_value = contract * tick_size if contract and tick_size else None
+        return cls(
+            symbol=symbol,
+            digits=digits,
+            point=point,
+            pip_size=point * (10.0 if digits in (3, 5) else 1.0),
+            stops_level=int(getattr(info, 'trade_stops_level', 0) or 0),
+            volume_step=step,
+            volume_min=getattr(info, 'volume_min', 0) or step,
+            volume_max=getattr(info, 'volume_max', 0) or 100.0,
+            tick_size=tick_size,
+            tick_value=tick_value,
+            filling_mode=getattr(info, 'filling_mode', 0),
+            visible=bool(getattr(info, 'visible', True)),
+        )
+
+    @property
+    def min_stop_distance(self):
+        """Broker stops_level in price, with 3 points as the floor."""
+        return max(self.stops_level * self.point, 3 * self.point)
+
+    def round_price(self, price):
+        return float(f"{price:.{self.digits}f}")
+
+    def normalize_volume(self, vol):
+        vol_rounded = round(vol / self.volume_step) * self.volume_step
+        return max(self.volume_min, min(self.volume_max, vol_rounded))
+
+
+class SymbolSpecCache:
+    def __init__(self, loader):
+        """
+        loader: callable(symbol) -> symbol_info object or None (normally ``mt5.symbol_info``)
+        """
+        self._loader = loader
+        self._specs = {}
+        self._lock = Lock()
+
+    def get(self, symbol):
+        """Cached spec for ``symbol``; loaded on first use. None if the terminal has no info."""
+        spec = self._specs.get(symbol)
+        if spec is None:
+            spec = self.refresh(symbol)
+        return spec
+
+    def refresh(self, symbol):
+        """Re-read ``symbol`` from the terminal (keeps the old spec if the read fails)."""
+        info = self._loader(symbol)
+        if not info:
+            return self._specs.get(symbol)
+        spec = SymbolSpec.from_info(symbol, info)
+        with self._lock:
+            self._specs[symbol] = spec
+        return spec
+
+    def invalidate(self, symbol=None):
+        """Drop one symbol, or everything (e.g. after a reconnect)."""
+        with self._lock:
+            if symbol is None:
+                self._specs.clear()
+            else:
+                self._specs.pop(symbol, None)
+
+    def __contains__(self, symbol):
+        return symbol in self._specs
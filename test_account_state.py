@@ -0,0 +1,63 @@
+import unittest
+from types import SimpleNamespace
+
+from account_state import (AUTOTRADING_OFF, AUTOTRADING_ON, BALANCE_ABOVE_MIN, BALANCE_BELOW_MIN,
+                           AccountStateCache)
+
+
+class TestAccountStateCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.reads = 0
+        self.terminal = SimpleNamespace(trade_allowed=True)
+        self.account = SimpleNamespace(balance=100.0, equity=100.0, margin_free=100.0, currency='USD')
+        self.events = []
+
+        def terminal_loader():
+            self.reads += 1
+            return self.terminal
+
+        self.cache = AccountStateCache(terminal_loader, lambda: self.account, ttl=5.0, min_balance=50.0,
+                                       clock=lambda: self.now)
+        self.cache.subscribe(lambda event, old, new: self.events.append((event, new.balance)))
+
+    def test_served_from_memory_until_ttl(self):
+        self.assertEqual(self.cache.get().balance, 100.0)
+        self.account = SimpleNamespace(balance=90.0)
+        self.now = 4.9
+        self.assertEqual(self.cache.get().balance, 100.0)
+        self.assertEqual(self.reads, 1)
+        self.now = 5.0
+        self.assertEqual(self.cache.get().balance, 90.0)
+        self.assertEqual(self.reads, 2)
+
+    def test_invalidate_forces_read(self):
+        self.cache.get()
+        self.account = SimpleNamespace(balance=120.0)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get().balance, 120.0)
+        self.assertEqual(self.reads, 2)
+
+    def test_change_notifications(self):
+        self.cache.get()
+        self.terminal = SimpleNamespace(trade_allowed=False)
+        self.account = SimpleNamespace(balance=40.0)
+        self.cache.refresh()
+        self.terminal = SimpleNamespace(trade_allowed=True)
+        self.account = SimpleNamespace(balance=60.0)
+        self.cache.refresh()
+        self.cache.refresh()  # unchanged: no events
+        self.assertEqual(self.events, [(AUTOTRADING_OFF, 40.0), (BALANCE_BELOW_MIN, 40.0),
+                                       (AUTOTRADING_ON, 60.0), (BALANCE_ABOVE_MIN, 60.0)])
+
+    def test_unavailable_info(self):
+        self.terminal = None
+        self.account = None
+        state = self.cache.get()
+        self.assertFalse(state.terminal_ok)
+        self.assertFalse(state.account_ok)
+        self.assertEqual(self.events, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from bar_buffer import OHLCRingBuffer
+
+
+def fill(buf, n, start=0):
+    for k in range(start, start + n):
+        buf.append(1_700_000_000 + 60 * k, 1.0 + k, 2.0 + k, 0.5 + k, 1.5 + k if k % 2 else 0.9 + k, k)
+
+
+class TestOHLCRingBuffer(unittest.TestCase):
+    def test_view_is_contiguous_after_wraparound(self):
+        buf = OHLCRingBuffer(5)
+        fill(buf, 13)
+        self.assertEqual(len(buf), 5)
+        self.assertEqual(buf.count, 13)
+        v = buf.view(4)
+        self.assertTrue(all(a.flags['C_CONTIGUOUS'] for a in v))
+        np.testing.assert_array_equal(v.open, [10.0, 11.0, 12.0, 13.0])
+        self.assertEqual(buf.last_time, 1_700_000_000 + 60 * 12)
+
+    def test_view_shares_memory(self):
+        buf = OHLCRingBuffer(4)
+        fill(buf, 6)
+        v = buf.view()
+        buf.replace_last(v.time[-1], 7.0, 8.0, 6.0, 7.5)
+        self.assertEqual(v.close[-1], 7.5)
+
+    def test_bar_and_status(self):
+        buf = OHLCRingBuffer(3)
+        fill(buf, 4)
+        self.assertEqual(buf.bar(-1)['open'], 4.0)
+        self.assertEqual(buf.bar(0)['open'], 2.0)
+        frame = buf.to_frame(tz='Asia/Tehran')
+        self.assertEqual(list(frame['status']), ['bullish', 'bearish', 'bullish'])
+        self.assertEqual(str(frame.index.tz), 'Asia/Tehran')
+        with self.assertRaises(IndexError):
+            buf.bar(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from bar_store import DAY, BarStore
+
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                        ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+T0 = 1_704_067_200  # 2024-01-01 00:00 UTC
+
+
+def bars(start, count, price=1.1, step=60):
+    rates = np.zeros(count, dtype=RATES_DTYPE)
+    rates['time'] = start + step * np.arange(count)
+    rates['open'] = rates['high'] = rates['low'] = rates['close'] = price
+    return rates
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = BarStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_day_partitions_and_range_read(self):
+        # 2 bars before midnight, 3 after
+        self.assertEqual(self.store.write('EURUSD', 'M1', bars(T0 + DAY - 120, 5)), 5)
+        parts = self.store.partitions('EURUSD', 'M1')
+        self.assertEqual([p.name for _, p in parts], ['2024-01-01.npz', '2024-01-02.npz'])
+        self.assertEqual(self.store.last_time('EURUSD', 'M1'), T0 + DAY + 120)
+
+        got = self.store.read('EURUSD', 'M1', start='2024-01-02')
+        self.assertEqual(list(got['time']), [T0 + DAY, T0 + DAY + 60, T0 + DAY + 120])
+        self.assertEqual(got.dtype, RATES_DTYPE)
+        frame = self.store.read_frame('EURUSD', 'M1', end='2024-01-02')
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(list(frame.columns), ['open', 'high', 'low', 'close', 'volume'])
+        self.assertIsNone(self.store.read('GBPUSD', 'M1'))
+
+    def test_overlap_is_deduplicated_newest_wins(self):
+        self.store.write('EURUSD', 'M1', bars(T0, 3, price=1.1))
+        self.assertEqual(self.store.write('EURUSD', 'M1', bars(T0 + 120, 3, price=1.2)), 2)
+        got = self.store.read('EURUSD', 'M1')
+        self.assertEqual(list(got['time']), [T0 + 60 * i for i in range(5)])
+        self.assertEqual(list(got['close']), [1.1, 1.1, 1.2, 1.2, 1.2])
+
+    def test_download_pages_and_resumes(self):
+        source = bars(T0, 10 * 24 * 60)   # 10 days of M1
+        calls = []
+
+        def fetch(date_from, date_to):
+            calls.append((int(date_from.timestamp()), int(date_to.timestamp())))
+            t = source['time']
+            return source[(t >= date_from.timestamp()) & (t <= date_to.timestamp())]
+
+        added = self.store.download('EURUSD', 'M1', fetch, T0, T0 + 6 * DAY, chunk_days=2, log=lambda m: None)
+        self.assertEqual(added, 6 * 24 * 60 + 1)  # date_to is inclusive
+        self.assertEqual(calls[0], (T0, T0 + 2 * DAY))
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        added = self.store.download('EURUSD', 'M1', fetch, T0, T0 + 10 * DAY, chunk_days=2, log=lambda m: None)
+        self.assertEqual(calls[0][0], T0 + 6 * DAY)  # resumed from the last stored bar
+        self.assertEqual(added, 4 * 24 * 60 - 1)
+        self.assertEqual(len(self.store.read('EURUSD', 'M1')), len(source))
+
+    def test_download_stops_at_failed_chunk(self):
+        replies = [bars(T0, 10), None]
+        added = self.store.download('EURUSD', 'M1', lambda a, b: replies.pop(0), T0, T0 + 4 * DAY,
+                                    chunk_days=1, log=lambda m: None)
+        self.assertEqual(added, 10)
+        self.assertEqual(replies, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
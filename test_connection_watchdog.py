@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+
+from connection_watchdog import CONNECTED, DEGRADED, DOWN, ConnectionWatchdog, classify
+
+IPC_FAIL = (-10004, 'IPC connection failed')
+
+
+class TestConnectionWatchdog(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.error = IPC_FAIL
+        self.reconnect_results = []
+        self.reconnects = 0
+        self.restarts = []
+
+        def reconnect():
+            self.reconnects += 1
+            return self.reconnect_results.pop(0)
+
+        self.wd = ConnectionWatchdog(reconnect, lambda: self.error, call_timeout=0.2, down_after=3,
+                                     backoff_base=1.0, backoff_max=8.0, jitter=0.5, max_stuck=3,
+                                     on_stuck=lambda: self.restarts.append(self.now),
+                                     clock=lambda: self.now, rand=lambda: 0.5, log=lambda msg: None)
+
+    def test_classify(self):
+        self.assertEqual(classify((1, 'Success')), 'ok')
+        self.assertEqual(classify(IPC_FAIL), 'connection')
+        self.assertEqual(classify((-6, 'Authorization failed')), 'connection')
+        self.assertEqual(classify((-2, 'Invalid params')), 'request')
+
+    def test_request_errors_do_not_degrade(self):
+        self.error = (-4, 'Not found')
+        self.assertEqual(self.wd.report_failure(), 'request')
+        self.assertEqual(self.wd.state, CONNECTED)
+
+    def test_degraded_then_down_then_recovered(self):
+        self.wd.report_failure()
+        self.assertEqual(self.wd.state, DEGRADED)
+        self.wd.report_success()
+        self.assertEqual(self.wd.state, CONNECTED)
+
+        for _ in range(3):
+            self.wd.report_failure()
+        self.assertEqual(self.wd.state, DOWN)
+
+        # first attempt immediately, then 1 * 0.75, 2 * 0.75 ... with rand() = 0.5
+        self.reconnect_results = [False, False, True]
+        self.assertFalse(self.wd.ensure_connected())
+        self.assertAlmostEqual(self.wd.retry_in(), 0.75)
+        self.now = 0.5
+        self.assertFalse(self.wd.ensure_connected())
+        self.assertEqual(self.reconnects, 1)
+        self.now = 0.75
+        self.assertFalse(self.wd.ensure_connected())
+        self.assertAlmostEqual(self.wd.retry_in(), 1.5)
+        self.now = 2.25
+        self.assertTrue(self.wd.ensure_connected())
+        self.assertEqual((self.wd.state, self.reconnects, self.wd.failures), (CONNECTED, 3, 0))
+
+    def test_backoff_is_capped(self):
+        self.wd.attempts = 10
+        self.assertAlmostEqual(self.wd.backoff(), 8.0 * 0.75)
+
+    def wait_unstuck(self):
+        deadline = time.monotonic() + 2
+        while self.wd.stuck() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_call_timeout_marks_down(self):
+        release = threading.Event()
+        self.assertIsNone(self.wd.call(release.wait, 5))
+        self.assertEqual(self.wd.state, DOWN)
+        release.set()
+        self.wait_unstuck()
+        # a fresh worker serves the next call
+        self.assertEqual(self.wd.call(lambda x: x * 2, 21), 42)
+        self.assertEqual(self.wd.timeouts, 0)
+
+    def test_no_mt5_access_while_a_call_is_stuck(self):
+        release = threading.Event()
+        calls = []
+        self.assertIsNone(self.wd.call(release.wait, 5))
+        self.assertEqual(self.wd.stuck(), 1)
+        self.assertIsNone(self.wd.call(calls.append, 'x'))  # refused, never runs
+        self.reconnect_results = [True]
+        self.now = 100.0
+        self.assertFalse(self.wd.ensure_connected())        # no reconnect under a stuck call
+        self.assertEqual(self.reconnects, 0)
+        release.set()
+        self.wait_unstuck()
+        self.assertTrue(self.wd.ensure_connected())
+        self.assertEqual(self.reconnects, 1)
+        self.assertEqual(calls, [])
+
+    def test_escalates_when_calls_keep_timing_out(self):
+        for _ in range(3):
+            release = threading.Event()
+            self.assertIsNone(self.wd.call(release.wait, 5))
+            release.set()
+            self.wait_unstuck()
+        self.assertEqual(len(self.restarts), 1)
+
+    def test_escalates_when_one_call_never_returns(self):
+        release = threading.Event()
+        self.wd.call(release.wait, 5)
+        self.now = 0.5
+        self.wd.call(lambda: None)
+        self.assertEqual(self.restarts, [])
+        self.now = 1.0  # > max_stuck * call_timeout
+        self.wd.call(lambda: None)
+        self.assertEqual(self.restarts, [1.0])
+        release.set()
+
+    def test_call_reraises(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.wd.call(lambda: 1 / 0)
+        self.assertEqual(self.wd.state, CONNECTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
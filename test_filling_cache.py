@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from filling_cache import AUTO, FillingModeCache
+
+
+class TestFillingModeCache(unittest.TestCase):
+    def test_persisted_across_instances(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'filling_modes.json')
+            cache = FillingModeCache(path)
+            self.assertIsNone(cache.get('EURUSD', 1))
+            cache.learn('EURUSD', 1, 2)
+            cache.learn('USDJPY', 1, AUTO)
+
+            reloaded = FillingModeCache(path)
+            self.assertEqual(reloaded.get('EURUSD', 1), 2)
+            self.assertEqual(reloaded.get('USDJPY', 1), AUTO)
+            self.assertIsNone(reloaded.get('EURUSD', 6))
+
+            reloaded.forget('EURUSD', 1)
+            self.assertIsNone(FillingModeCache(path).get('EURUSD', 1))
+
+    def test_unreadable_file_starts_empty(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'filling_modes.json')
+            with open(path, 'w') as fh:
+                fh.write('{not json')
+            cache = FillingModeCache(path)
+            self.assertIsNone(cache.get('EURUSD', 1))
+            cache.learn('EURUSD', 1, 0)
+            self.assertEqual(FillingModeCache(path).get('EURUSD', 1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from get_legs import get_legs, get_legs_multi, detect_legs, ohlc_arrays, LegDetector
+
+
+def make_ohlc(n, seed=0, vol=0.0003):
+    """Random-walk M1 bars rounded to 5 digits (EURUSD-like)."""
+    rng = np.random.default_rng(seed)
+    close = np.round(1.1 + np.cumsum(rng.normal(0, vol, n)), 5)
+    open_ = np.round(np.r_[close[0], close[:-1]] + rng.normal(0, vol / 4, n), 5)
+    high = np.round(np.maximum(open_, close) + np.abs(rng.normal(0, vol / 2, n)), 5)
+    low = np.round(np.minimum(open_, close) - np.abs(rng.normal(0, vol / 2, n)), 5)
+    index = pd.date_range('2025-01-01', periods=n, freq='min', tz='Asia/Tehran')
+    data = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}, index=index)
+    data['status'] = np.where(data['open'] > data['close'], 'bearish', 'bullish')
+    return data
+
+
+def reference_get_legs(data, threshold):
+    """Row-by-row pandas walk that get_legs used before the array engine (test oracle)."""
+    legs = []
+    start_index = data.index[0]
+    j = 0
+    i = 1
+    direction = None
+    while i < len(data):
+        current_is_bullish = data['close'].iloc[i] >= data['open'].iloc[i]
+        if j > 0 and legs[j-1]['direction'] == 'up' and data['high'].iloc[i] >= data['high'].iloc[i-1]:
+            current_price = data['high'].iloc[i]
+        elif j > 0 and legs[j-1]['direction'] == 'down' and data['low'].iloc[i] <= data['low'].iloc[i-1]:
+            current_price = data['low'].iloc[i]
+        else:
+            current_price = data['high'].iloc[i] if current_is_bullish else data['low'].iloc[i]
+        start_is_bullish = data['close'].loc[start_index] >= data['open'].loc[start_index]
+        start_price = data['high'].loc[start_index] if start_is_bullish else data['low'].loc[start_index]
+        price_diff = abs(current_price - start_price) * 10000
+
+        if price_diff >= threshold and price_diff < threshold * 5:
+            direction = 'up' if data['close'].iloc[i] > data['close'].loc[start_index] or data['high'].iloc[i] > data['high'].iloc[i-1] else 'down'
+            if j > 0 and legs[j-1]['direction'] == direction:
+                price_diff += legs[j-1]['length']
+                legs[j-1].update(end=data.index[i], end_value=current_price, length=price_diff, direction=direction)
+                start_index = data.index[i]
+            elif len(data.loc[start_index:data.index[i]]) >= 3:
+                if legs:
+                    row = data.loc[legs[-1]['end']]
+                    start_price = row['high'] if legs[-1]['direction'] == 'up' else row['low']
+                price_diff = abs(current_price - start_price) * 10000
+                legs.append({'start': start_index, 'start_value': start_price, 'end': data.index[i],
+                             'end_value': current_price, 'length': price_diff, 'direction': direction})
+                j += 1
+                start_index = data.index[i]
+        elif j > 0 and legs[j-1]['direction'] == 'up' and data['high'].iloc[i] >= data['high'].loc[start_index] and price_diff < threshold:
+            if j > 1:
+                price_diff = reference_pullback_diff(data, legs[j-2], current_price)
+            else:
+                price_diff += legs[j-1]['length']
+            start_index = data.index[i]
+            legs[j-1].update(end=data.index[i], end_value=current_price, length=price_diff, direction=direction)
+        elif j > 0 and legs[j-1]['direction'] == 'down' and data['low'].iloc[i] <= data['low'].loc[start_index] and price_diff < threshold:
+            if j > 1:
+                price_diff = reference_pullback_diff(data, legs[j-2], current_price)
+            else:
+                price_diff += legs[j-1]['length']
+            start_index = data.index[i]
+            legs[j-1].update(end=data.index[i], end_value=current_price, length=price_diff)
+        i += 1
+    return legs
+
+
+def reference_pullback_diff(data, prev_leg, current_price):
+    row = data.loc[prev_leg['end']]
+    ref = row['high'] if prev_leg['direction'] == 'up' else row['low']
+    return abs(current_price - ref) * 10000
+
+
+def quiet_get_legs(data, threshold):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return get_legs(data, custom_threshold=threshold)
+
+
+def public_keys(legs):
+    keys = ('start', 'start_value', 'end', 'end_value', 'length', 'direction')
+    return [{k: leg[k] for k in keys} for leg in legs]
+
+
+class TestGetLegs(unittest.TestCase):
+    def test_matches_reference_walk(self):
+        for seed in range(6):
+            for vol in (0.0001, 0.0003, 0.001):
+                data = make_ohlc(250, seed=seed, vol=vol)
+                for threshold in (3, 6, 10):
+                    with self.subTest(seed=seed, vol=vol, threshold=threshold):
+                        self.assertEqual(public_keys(quiet_get_legs(data, threshold)),
+                                         reference_get_legs(data, threshold))
+
+    def test_detect_legs_positions(self):
+        data = make_ohlc(300, seed=3)
+        legs = detect_legs(*ohlc_arrays(data), threshold=6)
+        self.assertTrue(legs)
+        for leg in legs:
+            self.assertLess(leg['start_pos'], leg['end_pos'])
+            self.assertLess(leg['end_pos'], len(data))
+
+    def test_multi_threshold_single_pass(self):
+        data = make_ohlc(300, seed=5, vol=0.0005)
+        by_threshold = get_legs_multi(data, [3, 6, 10])
+        for threshold in (3, 6, 10):
+            self.assertEqual(by_threshold[threshold], quiet_get_legs(data, threshold))
+
+    def test_short_input(self):
+        data = make_ohlc(1)
+        self.assertEqual(quiet_get_legs(data, 6), [])
+
+
+class TestLegDetector(unittest.TestCase):
+    def test_streaming_matches_batch(self):
+        data = make_ohlc(300, seed=7, vol=0.0004)
+        detector = LegDetector(threshold=6)
+        for k in range(len(data)):
+            detector.update(data.iloc[k])
+            if k in (60, 180, 299):
+                self.assertEqual(public_keys(detector.legs), public_keys(quiet_get_legs(data.iloc[:k + 1], 6)))
+
+    def test_replace_last_uses_final_prices(self):
+        data = make_ohlc(200, seed=11, vol=0.0004)
+        detector = LegDetector(threshold=6)
+        for k in range(len(data)):
+            row = data.iloc[k]
+            forming = {'time': data.index[k], 'open': row['open'], 'high': row['open'],
+                       'low': row['open'], 'close': row['open']}
+            detector.update(forming)
+            detector.replace_last(row)
+        self.assertEqual(detector.legs, LegDetector(threshold=6).seed(data).legs)
+        self.assertEqual(public_keys(detector.last_legs()), public_keys(quiet_get_legs(data, 6))[-3:])
+
+
+if __name__ == '__main__':
+    unittest.main()
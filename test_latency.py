@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from analytics import latency
+from analytics.latency import LatencyTracker, summarize_spans
+from side_effects import effects
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_spans_and_percentiles(self):
+        tracker = LatencyTracker(window=3, persist=False)
+        tracker.set_server_offset(3 * 3600)  # broker server time = UTC+3
+        tracker.mark('legs')  # no active trace -> ignored
+        self.assertIsNone(tracker.end())
+        for _ in range(5):
+            tracker.begin('EURUSD', int(time.time()) + 3 * 3600 - 2)
+            tracker.mark('legs')
+            tracker.mark('fill_attempt_ioc')
+            tracker.mark('fill')
+            trace = tracker.end()
+        self.assertIsNone(tracker.active)
+
+        stages = [s for s, _, _ in trace.spans()]
+        self.assertEqual(stages, ['bar_detected', 'legs', 'fill_attempt_ioc', 'fill'])
+        since = [t for _, _, t in trace.spans()]
+        self.assertEqual(since, sorted(since))
+        self.assertGreaterEqual(since[0], 1000.0)
+
+        summary = tracker.summary()
+        self.assertEqual(summary['fill']['count'], 3)  # rolling window
+        self.assertLessEqual(summary['total']['p50_ms'], summary['total']['p99_ms'])
+        self.assertGreaterEqual(summary['total']['max_ms'], since[-1])
+
+    def test_summary_csv_round_trip(self):
+        tracker = LatencyTracker(persist=False)
+        tracker.begin('EURUSD', int(time.time()))
+        tracker.mark('signal')
+        tracker.end()
+        with tempfile.TemporaryDirectory() as d:
+            path = tracker.dump(os.path.join(d, 'summary.csv'))
+            with open(path, encoding='utf-8') as fh:
+                self.assertEqual(fh.readline().strip(), 'stage,count,p50_ms,p95_ms,p99_ms,max_ms')
+
+            spans = os.path.join(d, 'spans.csv')
+            with open(spans, 'w', encoding='utf-8') as fh:
+                fh.write('dt_utc,symbol,bar_time,stage,ms,since_close_ms\n')
+                for ms in (1, 2, 3, 4, 100):
+                    fh.write(f'x,EURUSD,x,fill,{ms},{ms}\n')
+            st = summarize_spans(spans)['fill']
+            self.assertEqual(st['count'], 5)
+            self.assertEqual(st['p50_ms'], 3.0)
+            self.assertEqual(st['max_ms'], 100.0)
+
+    def test_spans_are_persisted_in_the_background(self):
+        tracker = LatencyTracker()
+        with tempfile.TemporaryDirectory() as d, mock.patch.object(latency, '_latency_dir', return_value=Path(d)):
+            for _ in range(2):
+                tracker.begin('EURUSD', int(time.time()))
+                tracker.mark('signal')
+                tracker.end()
+            self.assertTrue(effects.flush(timeout=5))
+            files = os.listdir(d)
+            self.assertEqual(len(files), 1)
+            stats = summarize_spans(os.path.join(d, files[0]))
+        # server offset unknown: no close-anchored stages; no order_send: tagged _no_order
+        self.assertEqual({stage: st['count'] for stage, st in stats.items()},
+                         {'signal': 2, 'decision_no_order': 2})
+
+    def test_total_only_for_traces_that_sent_an_order(self):
+        tracker = LatencyTracker(persist=False)
+        tracker.set_server_offset(0)
+        tracker.begin('EURUSD', int(time.time()))
+        tracker.mark('legs')
+        tracker.end()
+        tracker.begin('EURUSD', int(time.time()))
+        tracker.mark('signal')
+        tracker.mark('fill_attempt_ioc')
+        tracker.mark('fill')
+        tracker.end()
+        counts = {stage: st['count'] for stage, st in tracker.summary().items()}
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual(counts['total_no_order'], 1)
+        self.assertEqual(counts['decision'], 1)
+        self.assertEqual(counts['bar_detected'], 2)
+
+    def test_server_offset_from_tick(self):
+        now = 1_700_000_000.0
+        self.assertEqual(latency.server_offset_from_tick(int(now) + 2 * 3600 - 3, now), 2 * 3600)
+        self.assertEqual(latency.server_offset_from_tick(int(now) - 1, now), 0)
+        self.assertIsNone(latency.server_offset_from_tick(int(now) + 3600 - 400, now))  # stale tick
+        self.assertIsNone(latency.server_offset_from_tick(int(now) - 400 * 86400, now))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from analytics.market_aggregator import BUCKET_HEADERS, MarketAggregator
+
+T0 = 1_704_067_200  # 2024-01-01 00:00 UTC
+POINT = 0.00001
+
+
+class TestMarketAggregator(unittest.TestCase):
+    def setUp(self):
+        self.rows, self.raw = [], []
+        self.agg = MarketAggregator(self.rows.append, bucket_seconds=1.0)
+
+    def test_bucket_ohlc_and_spread(self):
+        self.agg.add('EURUSD', 1.10000, 1.10010, POINT, 5, ts=T0 + 0.1)
+        self.agg.add('EURUSD', 1.10020, 1.10026, POINT, 5, ts=T0 + 0.5)
+        self.agg.add('EURUSD', 1.09990, 1.10004, POINT, 5, ts=T0 + 0.9)
+        self.assertEqual(self.rows, [])  # bucket still open
+
+        self.agg.add('EURUSD', 1.10000, 1.10010, POINT, 5, ts=T0 + 1.2)
+        self.assertEqual(len(self.rows), 1)
+        row = self.rows[0]
+        self.assertEqual(list(row), BUCKET_HEADERS)
+        self.assertEqual(row['dt_utc'], '2024-01-01 00:00:00')
+        self.assertEqual(row['ticks'], 3)
+        self.assertEqual((row['bid_open'], row['bid_high'], row['bid_low'], row['bid_close']),
+                         (1.10000, 1.10020, 1.09990, 1.09990))
+        self.assertEqual((row['ask_high'], row['ask_low']), (1.10026, 1.10004))
+        self.assertEqual((row['spread_min'], row['spread_max'], row['spread_mean']), (6.0, 14.0, 10.0))
+
+    def test_symbols_are_bucketed_separately_and_flushed(self):
+        self.agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0)
+        self.agg.add('GBPUSD', 1.27, 1.2702, POINT, 5, ts=T0 + 5)
+        self.agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + 0.5)
+        self.assertEqual(self.rows, [])
+        self.agg.flush()
+        self.assertEqual(sorted((r['symbol'], r['ticks']) for r in self.rows), [('EURUSD', 2), ('GBPUSD', 1)])
+        self.agg.flush()
+        self.assertEqual(len(self.rows), 2)
+
+    def test_repeated_poll_of_the_same_tick_is_skipped(self):
+        for i in range(5):  # polled five times, same quote (wall-clock ts moves on)
+            self.agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + 0.1 * i, tick_msc=1000)
+        self.agg.add('EURUSD', 1.1, 1.1003, POINT, 5, ts=T0 + 0.6, tick_msc=1250)
+        self.agg.add('EURUSD', 1.1, 1.1003, POINT, 5, ts=T0 + 0.7, tick_msc=1250)
+        self.agg.flush()
+        self.assertEqual(self.rows[0]['ticks'], 2)
+        self.assertEqual(self.rows[0]['spread_mean'], 20.0)
+
+    def test_late_tick_folds_into_open_bucket(self):
+        self.agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + 2)
+        self.agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + 1)
+        self.assertEqual(self.rows, [])
+        self.agg.flush()
+        self.assertEqual(self.rows[0]['ticks'], 2)
+
+    def test_raw_sampling(self):
+        agg = MarketAggregator(self.rows.append, raw_sample_rate=0.25,
+                               raw_sink=lambda *tick: self.raw.append(tick))
+        for i in range(20):
+            agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + i * 0.01, last=0.0)
+        self.assertEqual(len(self.raw), 5)
+        self.assertEqual(self.raw[0], ('EURUSD', 1.1, 1.1001, 0.0, POINT, 5, T0 + 0.03))
+
+        MarketAggregator(self.rows.append, raw_sink=lambda *tick: self.raw.append(tick)).add(
+            'EURUSD', 1.1, 1.1001, POINT, 5, ts=T0)
+        self.assertEqual(len(self.raw), 5)  # rate 0: off
+
+    def test_refused_raw_rows_are_counted(self):
+        agg = MarketAggregator(self.rows.append, raw_sample_rate=1.0, raw_sink=lambda *tick: False)
+        for i in range(3):
+            agg.add('EURUSD', 1.1, 1.1001, POINT, 5, ts=T0 + i)
+        self.assertEqual(agg.raw_dropped, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import importlib.util
+import os
+import threading
+import time
+import unittest
+
+import numpy as np
+
+# ماژول شبیه‌ساز با نام دیگری بارگذاری می‌شود تا MetaTrader5 واقعی/تست‌ها را نپوشاند
+_spec = importlib.util.spec_from_file_location(
+    'mt5sim_fake', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mt5sim', 'MetaTrader5.py'))
+sim_mt5 = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sim_mt5)
+
+T0 = 1_735_689_600  # 2025-01-01 00:00 UTC
+
+
+def make_rates(bars):
+    """bars: [(open, high, low, close), ...] one minute apart."""
+    rates = np.zeros(len(bars), dtype=sim_mt5.RATES_DTYPE)
+    rates['time'] = T0 + 60 * np.arange(len(bars))
+    for i, (o, h, l, c) in enumerate(bars):
+        rates[i]['open'], rates[i]['high'], rates[i]['low'], rates[i]['close'] = o, h, l, c
+    return rates
+
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        sim_mt5.sim.symbols.clear()
+        sim_mt5.sim.reset()
+        sim_mt5.sim.end = None
+        sim_mt5.sim.add_symbol('EURUSD', make_rates([
+            (1.1000, 1.1010, 1.0990, 1.1005),
+            (1.1005, 1.1020, 1.1000, 1.1015),
+            (1.1015, 1.1016, 1.0950, 1.0960),
+            (1.0960, 1.0970, 1.0955, 1.0965),
+        ]), spread_points=10)
+        sim_mt5.sim.start(bars=1)
+        self.assertTrue(sim_mt5.initialize())
+
+    def deal(self, order_type, **extra):
+        request = {'action': sim_mt5.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1,
+                   'type': order_type, 'type_filling': sim_mt5.ORDER_FILLING_IOC}
+        request.update(extra)
+        return sim_mt5.order_send(request)
+
+    def test_last_bar_is_forming(self):
+        sim_mt5.sleep(30)  # bar 1 is bullish: open -> low (20s) -> high (40s) -> close
+        rates = sim_mt5.copy_rates_from_pos('EURUSD', sim_mt5.TIMEFRAME_M1, 0, 10)
+        self.assertEqual(len(rates), 2)
+        self.assertEqual(rates[0]['close'], 1.1005)
+        self.assertAlmostEqual(rates[-1]['close'], 1.1010, places=5)
+        self.assertAlmostEqual(rates[-1]['high'], 1.1010, places=5)
+        self.assertAlmostEqual(sim_mt5.symbol_info_tick('EURUSD').bid, 1.1010, places=5)
+
+        closed = sim_mt5.copy_rates_range('EURUSD', sim_mt5.TIMEFRAME_M1, T0, T0 + 3600)
+        self.assertEqual(list(closed['time']), [T0])
+
+    def test_open_and_close_by_position(self):
+        result = self.deal(sim_mt5.ORDER_TYPE_BUY)
+        self.assertEqual(result.retcode, sim_mt5.TRADE_RETCODE_DONE)
+        self.assertAlmostEqual(result.price, 1.1006, places=5)  # bid 1.1005 + 10 points
+        ticket = result.order
+        self.assertEqual(len(sim_mt5.positions_get(symbol='EURUSD')), 1)
+
+        sim_mt5.sleep(60)
+        close = self.deal(sim_mt5.ORDER_TYPE_SELL, position=ticket)
+        self.assertEqual(close.retcode, sim_mt5.TRADE_RETCODE_DONE)
+        self.assertEqual(sim_mt5.positions_get(symbol='EURUSD'), ())
+        self.assertAlmostEqual(sim_mt5.sim.deals[-1].profit, 9.0, places=2)  # closed at bid 1.1015
+        self.assertEqual(self.deal(sim_mt5.ORDER_TYPE_SELL, position=ticket).retcode,
+                         sim_mt5.TRADE_RETCODE_POSITION_CLOSED)
+
+    def test_stop_loss_triggers_while_clock_moves(self):
+        ticket = self.deal(sim_mt5.ORDER_TYPE_BUY, sl=1.0980, tp=1.1100).order
+        sim_mt5.sleep(120)  # bar 2 falls to 1.0950
+        self.assertEqual(sim_mt5.positions_total(), 0)
+        exit_deal = sim_mt5.sim.deals[-1]
+        self.assertEqual((exit_deal.position_id, exit_deal.reason, exit_deal.price), (ticket, 'sl', 1.0980))
+        self.assertLess(sim_mt5.sim.balance, 10000.0)
+
+    def test_filling_and_scripted_retcodes(self):
+        sim_mt5.sim.symbols['EURUSD'].accepted_filling = {sim_mt5.ORDER_FILLING_FOK}
+        self.assertEqual(self.deal(sim_mt5.ORDER_TYPE_BUY).retcode, sim_mt5.TRADE_RETCODE_INVALID_FILL)
+        self.assertEqual(self.deal(sim_mt5.ORDER_TYPE_BUY, type_filling=sim_mt5.ORDER_FILLING_FOK).retcode,
+                         sim_mt5.TRADE_RETCODE_DONE)
+
+        sim_mt5.sim.script.extend([sim_mt5.TRADE_RETCODE_REQUOTE])
+        self.assertEqual(self.deal(sim_mt5.ORDER_TYPE_BUY, type_filling=sim_mt5.ORDER_FILLING_FOK).retcode,
+                         sim_mt5.TRADE_RETCODE_REQUOTE)
+        self.assertEqual(sim_mt5.positions_total(), 1)
+
+    def test_overlapping_order_send_is_rejected(self):
+        sim_mt5.sim.send_latency = 0.2
+        errors = []
+
+        def send():
+            try:
+                self.deal(sim_mt5.ORDER_TYPE_BUY)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        first = threading.Thread(target=send)
+        first.start()
+        time.sleep(0.05)
+        send()
+        first.join()
+        self.assertEqual(len(errors), 1)
+        self.assertIn('overlapping order_send', errors[0])
+        self.assertEqual(sim_mt5.positions_total(), 1)
+
+    def test_end_of_data_finishes_simulation(self):
+        with self.assertRaises(sim_mt5.SimulationFinished):
+            sim_mt5.sleep(10 * 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from position_store import PositionStore
+from risk_ladder import StageLadder
+
+STAGES = [
+    {'id': 'half_R', 'trigger_R': 0.5, 'sl_lock_R': 0.5, 'tp_R': 1.2},
+    {'id': 'one_R', 'trigger_R': 1.0, 'sl_lock_R': 1.0, 'tp_R': 1.5},
+]
+
+
+def make_state(direction='buy', entry=1.1, risk=0.001, done=0):
+    ladder = StageLadder.build(direction, entry, risk, 0.1, STAGES)
+    ladder.advance(done)
+    return {'entry': entry, 'risk': risk, 'direction': direction, 'ladder': ladder,
+            'base_tp_R': 1.2, 'commission_locked': False}
+
+
+def restore(rec, pos):
+    ladder = StageLadder.build(rec['direction'], rec['entry'], rec['risk'], pos.volume, STAGES)
+    ladder.mark_done(rec['done_stages'])
+    return {'entry': rec['entry'], 'risk': rec['risk'], 'direction': rec['direction'], 'ladder': ladder}
+
+
+class TestPositionStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'states.json')
+        self.store = PositionStore(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_or_corrupt_file_loads_empty(self):
+        self.assertEqual(self.store.load(), {})
+        with open(self.path, 'w') as fh:
+            fh.write('{not json')
+        self.assertEqual(self.store.load(), {})
+
+    def test_round_trip_and_reconcile(self):
+        self.store.save({11: make_state(done=1), 12: make_state('sell', 1.2, 0.002)})
+        self.assertEqual(os.listdir(self.dir.name), ['states.json'])  # no temp file left behind
+        self.assertEqual(self.store.load()[11]['done_stages'], ['half_R'])
+
+        open_positions = [SimpleNamespace(ticket=11, volume=0.1), SimpleNamespace(ticket=13, volume=0.1)]
+        states = self.store.reconcile(open_positions, restore)
+        self.assertEqual(list(states), [11])  # 12 closed -> dropped, 13 unknown -> caller registers it
+        ladder = states[11]['ladder']
+        self.assertEqual(ladder.done_stages, {'half_R'})
+        self.assertAlmostEqual(ladder.next_trigger, 1.101)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from risk_ladder import StageLadder
+
+STAGES = [
+    {'id': 'commission_cover', 'type': 'commission', 'sl_lock': 'commission', 'tp_R': 1.2},
+    {'id': 'half_R', 'trigger_R': 0.5, 'sl_lock_R': 0.5, 'tp_R': 1.2},
+    {'id': 'one_R', 'trigger_R': 1.0, 'sl_lock_R': 1.0, 'tp_R': 1.5},
+    {'id': 'one_half_R', 'trigger_R': 1.5, 'sl_lock_R': 1.5, 'tp_R': 2.0},
+]
+
+
+def round5(p):
+    return float(f"{p:.5f}")
+
+
+class TestStageLadder(unittest.TestCase):
+    def test_buy_triggers_in_price_order(self):
+        ladder = StageLadder.build('buy', 1.1000, 0.0010, 0.5, STAGES, commission_per_lot=0.0007, round_price=round5)
+        self.assertEqual([r.stage_id for r in ladder.rungs], ['half_R', 'commission_cover', 'one_R', 'one_half_R'])
+        self.assertEqual(ladder.crossed(1.1004), [])
+        crossed = ladder.crossed(1.1005)
+        self.assertEqual([r.stage_id for r in crossed], ['half_R'])
+        rung = ladder.collapse(crossed, 1.0990)
+        self.assertEqual((rung.sl, rung.tp, rung.locked_R), (1.1005, 1.1012, 0.5))
+
+    def test_jump_collapses_to_one_modification(self):
+        ladder = StageLadder.build('sell', 1.1000, 0.0010, 1.0, STAGES, commission_per_lot=0.0, round_price=round5)
+        self.assertEqual(len(ladder.rungs), 3)  # no commission -> no commission rung
+        crossed = ladder.crossed(1.0989)
+        self.assertEqual([r.stage_id for r in crossed], ['half_R', 'one_R'])
+        rung = ladder.collapse(crossed, 1.1010)
+        self.assertEqual((rung.stage_id, rung.sl, rung.tp), ('one_R', 1.099, 1.0985))
+        ladder.advance(len(crossed))
+        self.assertEqual(ladder.done_stages, {'half_R', 'one_R'})
+        self.assertAlmostEqual(ladder.next_trigger, 1.0985)
+        self.assertEqual(ladder.crossed(1.0989), [])
+
+    def test_no_improvement_keeps_stage_pending(self):
+        ladder = StageLadder.build('buy', 1.1000, 0.0010, 1.0, STAGES, round_price=round5)
+        crossed = ladder.crossed(1.1006)
+        self.assertIsNone(ladder.collapse(crossed, 1.1008))
+        self.assertEqual(ladder.crossed(1.1006), crossed)
+        self.assertEqual(ladder.done_stages, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
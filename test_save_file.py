@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+from save_file import BufferedLogger
+
+
+class TestBufferedLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make(self, **kwargs):
+        logger = BufferedLogger(directory=self.tmp.name, console=False, flush_interval=60, **kwargs)
+        self.addCleanup(logger.close)
+        return logger
+
+    def files(self):
+        return sorted(os.listdir(self.tmp.name))
+
+    def test_suppressed_levels_are_not_formatted(self):
+        logger = self.make(level='WARNING')
+        calls = []
+        logger.log(lambda: calls.append('debug') or 'debug line', level='debug')
+        logger.log('info line')
+        logger.log(lambda: calls.append('error') or 'error line', level='error')
+        self.assertEqual(self.files(), [])  # nothing written on the calling thread
+        logger.flush()
+        self.assertEqual(calls, ['error'])
+        [name] = self.files()
+        with open(os.path.join(self.tmp.name, name), encoding='utf-8') as fh:
+            self.assertEqual(fh.read(), 'error line\n')
+
+    def test_rotation_and_json_lines(self):
+        logger = self.make(fmt='json', max_log_size=200 / (1024 * 1024), backup_count=2)
+        for k in range(13):  # ~68 bytes per record -> rotated every 3 records
+            logger.log(f'line {k}', color='red')
+        logger.flush()
+        files = self.files()
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(f.startswith('swing_logs_') and f.endswith('.jsonl') for f in files))
+        current = [f for f in files if f.count('.') == 1][0]
+        with open(os.path.join(self.tmp.name, current), encoding='utf-8') as fh:
+            records = [json.loads(line) for line in fh]
+        self.assertEqual(records[-1]['msg'], 'line 12')
+        self.assertEqual(records[-1]['level'], 'INFO')
+
+
+if __name__ == '__main__':
+    unittest.main()
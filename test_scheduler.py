@@ -0,0 +1,95 @@
+import unittest
+from types import SimpleNamespace
+
+import pytz
+
+from bar_buffer import OHLCRingBuffer
+from scheduler import StrategyScheduler
+from strategy import SwingFibStrategy
+from test_get_legs import make_ohlc
+from test_strategy import bars_of
+
+
+def jpy_ohlc(n, seed):
+    # same random walk around 110.0 with 3 digits: 1 pip = 0.01
+    data = make_ohlc(n, seed=seed, vol=0.0003)
+    for col in ('open', 'high', 'low', 'close'):
+        data[col] = (data[col] * 100).round(3)
+    return data
+
+
+class FakeConnector:
+    """Serves pre-generated bars per symbol, one new bar per update (no terminal)."""
+
+    def __init__(self, data, pip_sizes):
+        self.iran_tz = pytz.timezone('Asia/Tehran')
+        self.data = data
+        self.pip_sizes = pip_sizes
+        self.visible = {s: 0 for s in data}
+        self.buffers = {}
+
+    def spec(self, symbol=None):
+        return SimpleNamespace(pip_size=self.pip_sizes[symbol])
+
+    def bars_of(self, symbol):
+        return self.buffers.get(symbol)
+
+    def _push(self, symbol, upto):
+        buf = self.buffers[symbol]
+        for bar in self.data[symbol][self.visible[symbol]:upto]:
+            buf.append(bar['time'], bar['open'], bar['high'], bar['low'], bar['close'])
+        new = upto - self.visible[symbol]
+        self.visible[symbol] = upto
+        return new
+
+    def init_history(self, count=500, symbol=None, timeframe=None):
+        self.buffers[symbol] = OHLCRingBuffer(count)
+        return self._push(symbol, count)
+
+    def update_history(self, force=False, symbol=None):
+        return self._push(symbol, min(len(self.data[symbol]), self.visible[symbol] + 1))
+
+
+class TestStrategyScheduler(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            'EURUSD': bars_of(make_ohlc(1500, seed=3, vol=0.0003)),
+            'USDJPY': bars_of(jpy_ohlc(1500, seed=10)),
+        }
+        self.conn = FakeConnector(self.data, {'EURUSD': 0.0001, 'USDJPY': 0.01})
+
+    def test_independent_strategies_per_symbol(self):
+        scheduler = StrategyScheduler(self.conn, ['EURUSD', 'USDJPY'], threshold=4, window_size=60)
+        got = {s: [] for s in scheduler.symbols}
+        for _ in range(1350):
+            events = scheduler.poll()
+            self.assertEqual(sorted(e.symbol for e in events), ['EURUSD', 'USDJPY'])
+            for event in events:
+                sig = scheduler.dispatch(event)
+                if sig:
+                    got[event.symbol].append((sig.direction, sig.time))
+
+        self.assertTrue(got['EURUSD'] and got['USDJPY'])
+        self.assertEqual(scheduler.strategy('EURUSD').detector.price_scale, 10000)
+        self.assertEqual(scheduler.strategy('USDJPY').detector.price_scale, 100)
+        for symbol, scale in (('EURUSD', 10000), ('USDJPY', 100)):
+            ref = SwingFibStrategy(threshold=4, window_size=60, price_scale=scale)
+            ref.warmup(self.data[symbol][:119])
+            expected = []
+            for bar in self.data[symbol][119:self.conn.visible[symbol]]:
+                sig = ref.on_bar(bar)
+                if sig:
+                    expected.append((sig.direction, sig.time))
+            self.assertEqual(got[symbol], expected)
+
+    def test_forced_processing_after_wait(self):
+        scheduler = StrategyScheduler(self.conn, ['EURUSD'], threshold=4, window_size=60, max_wait_cycles=3)
+        self.conn.data['EURUSD'] = self.data['EURUSD'][:120]
+        self.assertEqual([e.reason for e in scheduler.poll()], ['first'])
+        self.assertEqual(scheduler.poll(), [])
+        self.assertEqual(scheduler.poll(), [])
+        self.assertEqual([e.reason for e in scheduler.poll()], ['forced'])
+
+
+if __name__ == '__main__':
+    unittest.main()
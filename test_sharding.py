@@ -0,0 +1,87 @@
+import unittest
+
+from bar_buffer import OHLCRingBuffer
+from scheduler import StrategyScheduler
+from sharding import SharedBarRing, ShardedScheduler
+from test_get_legs import make_ohlc
+from test_scheduler import FakeConnector, jpy_ohlc
+from test_strategy import bars_of
+
+
+class TestSharedBarRing(unittest.TestCase):
+    def test_attached_reader_sees_published_bars(self):
+        src = OHLCRingBuffer(8)
+        for k in range(12):
+            src.append(1_700_000_000 + 60 * k, 1.0 + k, 2.0 + k, 0.5 + k, 1.5 + k)
+        ring = SharedBarRing(5)
+        try:
+            ring.mirror(src, 5)
+            src.replace_last(src.last_time, 20.0, 21.0, 19.0, 20.5)
+            ring.mirror(src, 1)
+            reader = SharedBarRing(5, name=ring.name)
+            bars = reader.read(0, 5)
+            self.assertEqual([b['open'] for b in bars], [8.0, 9.0, 10.0, 11.0, 20.0])
+            self.assertEqual([b['open'] for b in reader.read(3, 5)], [11.0, 20.0])
+            reader.shm.close()
+        finally:
+            ring.close()
+
+
+class TestShardedScheduler(unittest.TestCase):
+    def make_connector(self):
+        data = {
+            'EURUSD': bars_of(make_ohlc(1500, seed=3, vol=0.0003)),
+            'USDJPY': bars_of(jpy_ohlc(1500, seed=10)),
+            'GBPUSD': bars_of(make_ohlc(1500, seed=6, vol=0.0003)),
+        }
+        return FakeConnector(data, {'EURUSD': 0.0001, 'USDJPY': 0.01, 'GBPUSD': 0.0001})
+
+    def test_workers_match_in_process_scheduler(self):
+        symbols = ['EURUSD', 'USDJPY', 'GBPUSD']
+        local = StrategyScheduler(self.make_connector(), symbols, threshold=4, window_size=60)
+        expected = []
+        for _ in range(1300):
+            for event in local.poll():
+                sig = local.dispatch(event)
+                if sig:
+                    expected.append((event.symbol, sig.direction, sig.time))
+
+        sharded = ShardedScheduler(self.make_connector(), symbols, workers=2, threshold=4, window_size=60)
+        got = []
+        try:
+            for _ in range(1300):
+                for event in sharded.poll():
+                    sharded.dispatch(event)
+                got += [(i.symbol, i.signal.direction, i.signal.time) for i in sharded.collect()]
+            got += [(i.symbol, i.signal.direction, i.signal.time) for i in sharded.collect(timeout=30)]
+        finally:
+            sharded.close()
+        self.assertEqual(sharded.pending, 0)
+        self.assertTrue(expected)
+        self.assertEqual(sorted(got), sorted(expected))
+
+    def test_dead_worker_is_restarted_and_logs_come_back(self):
+        lines = []
+        sharded = ShardedScheduler(self.make_connector(), ['EURUSD', 'USDJPY', 'GBPUSD'], workers=2, threshold=4,
+                                   window_size=60, log=lambda msg, color=None: lines.append(msg))
+        try:
+            for step in range(400):
+                if step == 200:
+                    sharded.collect(timeout=30)
+                    sharded._procs[0].terminate()
+                    sharded._procs[0].join(5)
+                for event in sharded.poll():
+                    sharded.dispatch(event)
+                sharded.collect()
+            sharded.collect(timeout=30)
+        finally:
+            sharded.close()
+        self.assertEqual(sharded.pending, 0)
+        self.assertTrue(any('exited' in line and 'restarting' in line for line in lines))
+        # strategy decision traces from the workers, prefixed with the symbol like in-process logs
+        self.assertTrue(any(line.startswith('[EURUSD] First len legs') for line in lines))
+        self.assertTrue(any(line.startswith('[USDJPY] First len legs') for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import unittest
+
+from side_effects import SideEffectDispatcher, HIGH, LOW, COALESCE, BLOCK
+
+
+class TestSideEffectDispatcher(unittest.TestCase):
+    def make(self, maxsize=3):
+        # worker started by hand so the queue can be inspected first
+        return SideEffectDispatcher(maxsize=maxsize, block_timeout=0.01, autostart=False)
+
+    def test_priority_order_and_flush(self):
+        d = self.make(maxsize=10)
+        done = []
+        d.submit(done.append, 'low', priority=LOW)
+        d.submit(done.append, 'normal-1')
+        d.submit(done.append, 'high', priority=HIGH)
+        d.submit(done.append, 'normal-2')
+        d.start()
+        self.assertTrue(d.flush(timeout=5))
+        d.close()
+        self.assertEqual(done, ['high', 'normal-1', 'normal-2', 'low'])
+        self.assertEqual(d.stats['done'], 4)
+
+    def test_full_queue_evicts_lower_priority_then_drops(self):
+        d = self.make()
+        done = []
+        for k in range(3):
+            self.assertTrue(d.submit(done.append, f'low-{k}', priority=LOW))
+        self.assertTrue(d.submit(done.append, 'trade', priority=HIGH, policy=BLOCK))
+        self.assertFalse(d.submit(done.append, 'low-3', priority=LOW))
+        self.assertEqual(d.pending(), 3)
+        d.start()
+        d.close()
+        self.assertEqual(done, ['trade', 'low-0', 'low-1'])
+        self.assertEqual((d.stats['evicted'], d.stats['dropped']), (1, 1))
+
+    def test_coalesce_keeps_latest_per_key(self):
+        d = self.make()
+        done = []
+        for bid in (1.1, 1.2, 1.3):
+            d.submit(done.append, ('EURUSD', bid), priority=LOW, policy=COALESCE, key=('market', 'EURUSD'))
+        d.submit(done.append, ('USDJPY', 150.0), priority=LOW, policy=COALESCE, key=('market', 'USDJPY'))
+        self.assertEqual(d.pending(), 2)
+        d.start()
+        d.close()
+        self.assertEqual(done, [('EURUSD', 1.3), ('USDJPY', 150.0)])
+        self.assertEqual(d.stats['coalesced'], 2)
+
+    def test_handler_error_does_not_stop_worker(self):
+        d = SideEffectDispatcher(maxsize=10)
+        ran = threading.Event()
+
+        def boom():
+            raise OSError('disk full')
+
+        d.submit(boom)
+        d.submit(ran.set)
+        self.assertTrue(ran.wait(5))
+        d.close()
+        self.assertEqual((d.stats['failed'], d.stats['done']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
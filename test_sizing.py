@@ -0,0 +1,45 @@
+import unittest
+from types import SimpleNamespace
+
+from account_state import AccountState
+from sizing import SizingContext
+from symbol_spec import SymbolSpec
+
+
+def eurusd_spec():
+    info = SimpleNamespace(point=0.00001, digits=5, trade_stops_level=10, volume_step=0.01, volume_min=0.01,
+                           volume_max=50.0, trade_tick_size=0.00001, trade_tick_value=1.0, filling_mode=3)
+    return SymbolSpec.from_info('EURUSD', info)
+
+
+def account(balance):
+    return AccountState(trade_allowed=True, balance=balance, equity=balance, margin_free=balance,
+                        currency='USD', fetched_at=1.0)
+
+
+class TestSizingContext(unittest.TestCase):
+    def test_risk_volume(self):
+        ctx = SizingContext.build(eurusd_spec(), account(10000.0), fallback_lot=0.01)
+        tick = SimpleNamespace(bid=1.10000, ask=1.10010)
+        # 1% of 10000 = 100; risk 200 points + spread 10 points at 1.0/point -> 100 / 210
+        self.assertAlmostEqual(ctx.volume_by_risk(1.10010, 1.09810, tick, 0.01), 0.48)
+        self.assertEqual(ctx.fetched_at, 1.0)
+
+    def test_leverage_cap_and_limits(self):
+        ctx = SizingContext.build(eurusd_spec(), account(10000.0), fallback_lot=0.01)
+        tick = SimpleNamespace(bid=1.1, ask=1.1)
+        # 10% risk asks for 50 lots; the 2% cap allows 200 / 20 points = 10 lots
+        self.assertAlmostEqual(ctx.volume_by_risk(1.10020, 1.10000, tick, 0.10), 10.0)
+        self.assertAlmostEqual(ctx.normalize_volume(0.004), 0.01)
+        self.assertEqual(ctx.normalize_volume(80), 50.0)
+
+    def test_fallbacks(self):
+        self.assertIsNone(SizingContext.build(None, account(100.0), fallback_lot=0.01))
+        self.assertIsNone(SizingContext.build(eurusd_spec(), account(None), fallback_lot=0.01))
+        ctx = SizingContext.build(eurusd_spec(), account(100.0), fallback_lot=0.05)
+        tick = SimpleNamespace(bid=1.1, ask=1.1)
+        self.assertEqual(ctx.volume_by_risk(1.1, 1.1, tick, 0.01), 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from strategy import SwingFibStrategy, plan_stops
+from test_get_legs import make_ohlc
+
+
+FIB = {'0.0': 1.1050, '0.705': 1.1015, '0.9': 1.1005, '1.0': 1.1000}
+
+
+def bars_of(data):
+    return [{'time': int(ts.timestamp()), 'open': r.open, 'high': r.high, 'low': r.low, 'close': r.close}
+            for ts, r in zip(data.index, data.itertuples())]
+
+
+class TestSwingFibStrategy(unittest.TestCase):
+    def test_emits_signals_and_resets(self):
+        bars = bars_of(make_ohlc(3000, seed=1, vol=0.0003))
+        strategy = SwingFibStrategy(threshold=4, window_size=60)
+        signals = 0
+        for bar in bars:
+            sig = strategy.on_bar(bar)
+            if sig:
+                signals += 1
+                self.assertIn(sig.direction, ('buy', 'sell'))
+                self.assertIsNone(strategy.state.fib_levels)
+                self.assertFalse(strategy.state.true_position)
+        self.assertGreater(signals, 0)
+
+    def test_batch_feed_matches_bar_by_bar(self):
+        bars = bars_of(make_ohlc(2000, seed=4, vol=0.0003))
+        one = SwingFibStrategy(threshold=4, window_size=60)
+        batched = SwingFibStrategy(threshold=4, window_size=60)
+        for k, bar in enumerate(bars):
+            a = one.on_bar(bar)
+            # previous bar re-sent with the new one, as the live loop does after each fetch
+            b = batched.feed(bars[max(0, k - 1):k + 1])
+            self.assertEqual(a, b)
+
+    def test_small_history_reseeds(self):
+        # history barely larger than the window: legs keep falling out of the kept bars
+        bars = bars_of(make_ohlc(2000, seed=2, vol=0.0003))
+        strategy = SwingFibStrategy(threshold=4, window_size=60, history_size=70)
+        for bar in bars:
+            strategy.on_bar(bar)
+            recent = strategy.detector.last_legs()
+            if recent:
+                oldest = strategy.bars.count - len(strategy.bars)
+                self.assertGreaterEqual(strategy._anchor + recent[0]['start_pos'], oldest)
+
+    def test_older_bars_are_ignored(self):
+        bars = bars_of(make_ohlc(10, seed=0))
+        strategy = SwingFibStrategy(threshold=4, window_size=60)
+        strategy.feed(bars)
+        self.assertIsNone(strategy.feed(bars[:5]))
+        self.assertEqual(len(strategy.bars), 10)
+
+
+class TestPlanStops(unittest.TestCase):
+    def test_buy_uses_09_unless_close(self):
+        self.assertEqual(plan_stops('buy', 1.1020, FIB, 0.0001, 0.00003, 2.0)[0], 1.1005)
+        sl, tp = plan_stops('buy', 1.1006, FIB, 0.0001, 0.00003, 2.0)
+        self.assertEqual(sl, 1.1000)
+        self.assertAlmostEqual(tp, 1.1006 + 2 * 0.0006)
+
+    def test_min_distance(self):
+        sl, _ = plan_stops('buy', 1.10005, FIB, 0.0001, 0.00003, 1.0)
+        self.assertAlmostEqual(sl, 1.10005 - 0.0002)
+
+    def test_sell(self):
+        fib = {'0.0': 1.0950, '0.705': 1.0985, '0.9': 1.0995, '1.0': 1.1000}
+        sl, tp = plan_stops('sell', 1.0990, fib, 0.0001, 0.00003, 1.0)
+        self.assertEqual(sl, 1.0995)
+        self.assertAlmostEqual(tp, 1.0985)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+
+from get_legs import get_legs
+from swing import get_swing_points, count_pullback_candles
+from test_get_legs import make_ohlc
+
+
+def reference_count(status, close, wanted, falling):
+    """Candle-by-candle loop get_swing_points used before the array version (test oracle)."""
+    true_candles = 0
+    first_candle = False
+    last_candle_close = None
+    for k in range(len(status)):
+        if status[k] == wanted:
+            if first_candle:
+                if (close[k] < last_candle_close) if falling else (close[k] > last_candle_close):
+                    true_candles += 1
+                    last_candle_close = close[k]
+            else:
+                last_candle_close = close[k]
+            first_candle = True
+    return true_candles
+
+
+class TestPullbackCount(unittest.TestCase):
+    def test_matches_reference_loop(self):
+        rng = np.random.default_rng(0)
+        for _ in range(300):
+            n = int(rng.integers(0, 30))
+            close = np.round(1.1 + rng.normal(0, 0.0005, n), 5)
+            status = np.where(rng.random(n) < 0.5, 'bearish', 'bullish')
+            for wanted, falling in (('bearish', True), ('bullish', False)):
+                self.assertEqual(count_pullback_candles(status == wanted, close, falling=falling),
+                                 reference_count(status, close, wanted, falling))
+
+    def test_equal_close_does_not_count(self):
+        status = np.array(['bearish', 'bearish', 'bullish', 'bearish'])
+        close = np.array([1.1, 1.1, 1.0, 1.09])
+        self.assertEqual(count_pullback_candles(status == 'bearish', close, falling=True), 1)
+
+
+class TestGetSwingPoints(unittest.TestCase):
+    def test_offset_matches_window_positions(self):
+        data = make_ohlc(400, seed=2, vol=0.0004)
+        checked = 0
+        for start in range(0, 300, 5):
+            window = data.iloc[start:start + 100]
+            with contextlib.redirect_stdout(io.StringIO()):
+                legs = get_legs(window, custom_threshold=6)
+            if len(legs) < 3:
+                continue
+            self.assertEqual(get_swing_points(window, legs[-3:]),
+                             get_swing_points(data, legs[-3:], offset=start))
+            checked += 1
+        self.assertGreater(checked, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from types import SimpleNamespace
+
+from symbol_spec import SymbolSpec, SymbolSpecCache
+
+
+def eurusd_info(**kw):
+    fields = dict(point=0.00001, digits=5, trade_stops_level=10, volume_step=0.01, volume_min=0.01,
+                  volume_max=50.0, trade_tick_size=0.00001, trade_tick_value=1.0, filling_mode=3, visible=True)
+    fields.update(kw)
+    return SimpleNamespace(**fields)
+
+
+class TestSymbolSpec(unittest.TestCase):
+    def test_from_info(self):
+        spec = SymbolSpec.from_info('EURUSD', eurusd_info())
+        self.assertAlmostEqual(spec.pip_size, 0.0001)
+        self.assertAlmostEqual(spec.min_stop_distance, 0.0001)
+        self.assertEqual(spec.round_price(1.1234567), 1.12346)
+        self.assertAlmostEqual(spec.normalize_volume(0.123), 0.12)
+        self.assertEqual(spec.normalize_volume(80), 50.0)
+
+    def test_fallbacks(self):
+        info = eurusd_info(trade_stops_level=0, trade_tick_value=None, trade_contract_size=100000,
+                           volume_step=0, volume_min=0, volume_max=0)
+        spec = SymbolSpec.from_info('EURUSD', info)
+        self.assertAlmostEqual(spec.min_stop_distance, 0.00003)
+        self.assertAlmostEqual(spec.tick_value, 1.0)
+        self.assertEqual((spec.volume_step, spec.volume_min, spec.volume_max), (0.01, 0.01, 100.0))
+
+
+class TestSymbolSpecCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.info = eurusd_info()
+
+        def loader(symbol):
+            self.calls += 1
+            return self.info
+
+        self.cache = SymbolSpecCache(loader)
+
+    def test_loads_once(self):
+        for _ in range(5):
+            self.assertEqual(self.cache.get('EURUSD').digits, 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_and_refresh(self):
+        self.cache.get('EURUSD')
+        self.info = eurusd_info(digits=3, point=0.001)
+        self.assertEqual(self.cache.get('EURUSD').digits, 5)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get('EURUSD').digits, 3)
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_refresh_keeps_spec(self):
+        self.cache.get('EURUSD')
+        self.info = None
+        self.assertEqual(self.cache.refresh('EURUSD').digits, 5)
+        self.cache.invalidate('EURUSD')
+        self.assertIsNone(self.cache.get('EURUSD'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from tick_store import DAY_MS, HEADER, RECORD_DTYPE, TickStore
+
+TICKS_DTYPE = np.dtype([('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+                        ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')])
+T0 = 1_704_067_200_000  # 2024-01-01 00:00 UTC in ms
+POINT = 0.00001
+
+
+def ticks(times, bid=1.10000):
+    out = np.zeros(len(times), dtype=TICKS_DTYPE)
+    out['time_msc'] = times
+    out['time'] = out['time_msc'] // 1000
+    out['bid'] = bid + POINT * np.arange(len(times))
+    out['ask'] = out['bid'] + 12 * POINT
+    out['flags'] = 6
+    return out
+
+
+class TestTickStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TickStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_range(self):
+        times = [T0 + 5, T0 + 250, T0 + DAY_MS - 1, T0 + DAY_MS, T0 + DAY_MS + 999]
+        self.assertEqual(self.store.append('EURUSD', ticks(times), POINT), 5)
+        self.assertEqual(len(self.store.days('EURUSD')), 2)
+        path = self.store.days('EURUSD')[0][1]
+        self.assertEqual(path.stat().st_size, HEADER.size + 3 * RECORD_DTYPE.itemsize)
+
+        got = self.store.read('EURUSD')
+        self.assertEqual(list(got['time_msc']), times)
+        np.testing.assert_allclose(got['bid'], ticks(times)['bid'])
+        np.testing.assert_allclose(got['ask'] - got['bid'], 12 * POINT)
+        self.assertEqual(list(got['flags']), [6] * 5)
+
+        window = self.store.read('EURUSD', T0 + 250, T0 + DAY_MS)
+        self.assertEqual(list(window['time_msc']), [T0 + 250, T0 + DAY_MS - 1])
+        self.assertEqual(self.store.last_time_msc('EURUSD'), T0 + DAY_MS + 999)
+
+    def test_refetch_from_last_millisecond_adds_nothing_twice(self):
+        self.store.append('EURUSD', ticks([T0, T0 + 10, T0 + 10]), POINT)
+        added = self.store.append('EURUSD', ticks([T0 + 10, T0 + 10, T0 + 10, T0 + 20]), POINT)
+        self.assertEqual(added, 2)  # one more tick at +10 and the one at +20
+        self.assertEqual(list(self.store.read('EURUSD')['time_msc']), [T0, T0 + 10, T0 + 10, T0 + 10, T0 + 20])
+
+    def test_torn_record_is_dropped_before_append(self):
+        self.store.append('EURUSD', ticks([T0, T0 + 1]), POINT)
+        path = self.store.days('EURUSD')[0][1]
+        with open(path, 'ab') as fh:
+            fh.write(b'\x01\x02\x03')
+        self.store.append('EURUSD', ticks([T0 + 2]), POINT)
+        self.assertEqual(list(self.store.read('EURUSD')['time_msc']), [T0, T0 + 1, T0 + 2])
+
+    def test_download_pages_and_resumes(self):
+        source = ticks(list(range(T0, T0 + 3 * 3_600_000, 60_000)))  # a tick per minute for 3 hours
+        calls = []
+
+        def fetch(date_from, date_to):
+            lo, hi = date_from.timestamp() * 1000, date_to.timestamp() * 1000
+            calls.append(lo)
+            return source[(source['time_msc'] >= lo) & (source['time_msc'] <= hi)]
+
+        self.assertEqual(self.store.download('EURUSD', fetch, POINT, T0, T0 + 2 * 3_600_000, chunk_minutes=30,
+                                             log=lambda m: None), 121)
+        self.assertEqual(len(calls), 4)
+        calls.clear()
+        self.assertEqual(self.store.download('EURUSD', fetch, POINT, T0, T0 + 3 * 3_600_000, chunk_minutes=30,
+                                             log=lambda m: None), 59)
+        self.assertEqual(calls[0], T0 + 2 * 3_600_000)
+        self.assertEqual(len(self.store.read('EURUSD')), len(source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Compact on-disk tick history (bid/ask/flags/time), readable through memory maps.
+
+    <root>/EURUSD/2024/2024-03-05.ticks
+
+One file per symbol and UTC day: a 32-byte header (magic, day start in epoch
+milliseconds, point) followed by fixed 13-byte records
+
+    t     int32   milliseconds since the day start
+    bid   int32   price in points (round(price / point))
+    ask   int32
+    flags uint8   TICK_FLAG_* bits
+
+i.e. ~13 bytes per tick against ~100 for a CSV row. Times are offsets from the
+header's base (not deltas between ticks) so a time range is located with a
+binary search directly on the memory map, without decoding the file. Files are
+append-only: ``append`` only adds ticks newer than the last stored one, and
+``download`` pages ``copy_ticks_range`` in ``chunk_minutes`` windows from the
+last stored tick (``capture_ticks.py``).
+"""
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from metatrader5_config import HISTORY_CONFIG
+
+ROOT = Path(__file__).resolve().parent
+DAY_MS = 86_400_000
+MAGIC = b'MT5TICK1'
+HEADER = struct.Struct('<8sqd8x')      # magic, base_ms, point, padding -> 32 bytes
+RECORD_DTYPE = np.dtype([('t', '<i4'), ('bid', '<i4'), ('ask', '<i4'), ('flags', 'u1')])
+TICK_DTYPE = np.dtype([('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('flags', '<u4')])
+
+
+def _msc(value):
+    """datetime / date string / epoch milliseconds -> epoch milliseconds (naive values are UTC)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    if isinstance(value, datetime):
+        ts = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return int(round(ts.timestamp() * 1000))
+    ts = datetime.fromisoformat(str(value))
+    return _msc(ts)
+
+
+class TickStore:
+    def __init__(self, root=None):
+        """root: store directory (default HISTORY_CONFIG['tick_dir'], relative to the repo)."""
+        root = Path(root or HISTORY_CONFIG.get('tick_dir') or 'data/ticks')
+        self.root = root if root.is_absolute() else ROOT / root
+
+    # ---------- Layout ----------
+    def _path(self, symbol, day):
+        name = datetime.fromtimestamp(day * 86400, timezone.utc).strftime('%Y-%m-%d')
+        return self.root / symbol / name[:4] / f"{name}.ticks"
+
+    def days(self, symbol):
+        """Sorted [(day number, path)] of the stored files."""
+        out = []
+        for path in (self.root / symbol).glob('*/*.ticks'):
+            day = int(datetime.strptime(path.stem, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()) // 86400
+            out.append((day, path))
+        return sorted(out)
+
+    @staticmethod
+    def open_day(path):
+        """(base_ms, point, read-only memmap of RECORD_DTYPE) for one day file."""
+        with open(path, 'rb') as fh:
+            magic, base_ms, point = HEADER.unpack(fh.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tick file")
+        count = (path.stat().st_size - HEADER.size) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return base_ms, point, np.empty(0, dtype=RECORD_DTYPE)
+        return base_ms, point, np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(count,))
+
+    # ---------- Read ----------
+    def last_time_msc(self, symbol):
+        """time_msc of the newest stored tick, or None."""
+        for _, path in reversed(self.days(symbol)):
+            base_ms, _, records = self.open_day(path)
+            if len(records):
+                return base_ms + int(records['t'][-1])
+        return None
+
+    def read(self, symbol, start=None, end=None):
+        """Decoded ticks (TICK_DTYPE) with start <= time_msc < end; only the matching slices are read."""
+        t0, t1 = _msc(start), _msc(end)
+        chunks = []
+        for day, path in self.days(symbol):
+            if (t0 is not None and (day + 1) * DAY_MS <= t0) or (t1 is not None and day * DAY_MS >= t1):
+                continue
+            base_ms, point, records = self.open_day(path)
+            lo = 0 if t0 is None else int(np.searchsorted(records['t'], t0 - base_ms, side='left'))
+            hi = len(records) if t1 is None else int(np.searchsorted(records['t'], t1 - base_ms, side='left'))
+            part = records[lo:hi]
+            ticks = np.empty(len(part), dtype=TICK_DTYPE)
+            ticks['time_msc'] = base_ms + part['t'].astype(np.int64)
+            ticks['bid'] = np.round(part['bid'] * point, 10)
+            ticks['ask'] = np.round(part['ask'] * point, 10)
+            ticks['flags'] = part['flags']
+            chunks.append(ticks)
+        if not chunks:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.concatenate(chunks)
+
+    # ---------- Write ----------
+    def append(self, symbol, ticks, point):
+        """
+        Append ``ticks`` (copy_ticks_* array: time_msc, bid, ask, flags) newer than
+        the stored ones. Ticks at the last stored millisecond are matched by count,
+        so re-fetching from that millisecond adds nothing twice. Returns the number added.
+        """
+        if ticks is None or len(ticks) == 0:
+            return 0
+        ticks = ticks[np.argsort(ticks['time_msc'], kind='stable')]
+        last = self.last_time_msc(symbol)
+        if last is not None:
+            stored_at_last = len(self.read(symbol, last, last + 1))
+            same = np.flatnonzero(ticks['time_msc'] == last)
+            ticks = np.concatenate([ticks[same[stored_at_last:]], ticks[ticks['time_msc'] > last]])
+        msc = ticks['time_msc'].astype(np.int64)
+        days = msc // DAY_MS
+        for day in np.unique(days):
+            part = ticks[days == day]
+            records = np.empty(len(part), dtype=RECORD_DTYPE)
+            records['t'] = msc[days == day] - day * DAY_MS
+            records['bid'] = np.round(part['bid'] / point)
+            records['ask'] = np.round(part['ask'] / point)
+            records['flags'] = part['flags']
+            self._append_records(self._path(symbol, int(day)), int(day) * DAY_MS, point, records)
+        return len(ticks)
+
+    @staticmethod
+    def _append_records(path, base_ms, point, records):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            with open(path, 'wb') as fh:
+                fh.write(HEADER.pack(MAGIC, base_ms, point))
+        else:
+            _, stored_point, stored = TickStore.open_day(path)
+            if abs(stored_point - point) > 1e-12:
+                raise ValueError(f"{path}: point changed from {stored_point} to {point}")
+            size = HEADER.size + len(stored) * RECORD_DTYPE.itemsize
+            del stored
+            if path.stat().st_size != size:
+                # رکورد نیمه‌کاره (قطع شدن وسط نوشتن) حذف می‌شود تا رکوردهای بعدی هم‌تراز بمانند
+                with open(path, 'r+b') as fh:
+                    fh.truncate(size)
+        with open(path, 'ab') as fh:
+            fh.write(records.tobytes())
+
+    # ---------- Download ----------
+    def download(self, symbol, fetch, point, start, end=None, chunk_minutes=60, log=print):
+        """
+        Page ``fetch(date_from, date_to)`` (normally ``mt5.copy_ticks_range`` bound to
+        the symbol with COPY_TICKS_ALL) from max(start, last stored tick) to ``end``
+        (default now). Stops at the first failed chunk (None) so the next run resumes
+        there. Returns the number of ticks added.
+        """
+        last = self.last_time_msc(symbol)
+        begin = max(_msc(start), last) if last is not None else _msc(start)
+        stop_at = _msc(end) if end is not None else int(datetime.now(timezone.utc).timestamp() * 1000)
+        added = 0
+        while begin < stop_at:
+            stop = min(begin + chunk_minutes * 60_000, stop_at)
+            ticks = fetch(datetime.fromtimestamp(begin / 1000, timezone.utc),
+                          datetime.fromtimestamp(stop / 1000, timezone.utc))
+            if ticks is None:
+                log(f"❌ {symbol}: tick fetch failed for chunk starting "
+                    f"{datetime.fromtimestamp(begin / 1000, timezone.utc):%Y-%m-%d %H:%M}")
+                break
+            added += self.append(symbol, ticks, point)
+            begin = stop
+        return added